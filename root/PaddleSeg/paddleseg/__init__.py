@@ -12,6 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from . import models, datasets, transforms, optimizers
+import importlib
+
+# The heavy subpackages are imported on first access. Components are looked up through
+# `cvlibs.manager`, which imports only the module that defines the requested component.
+_SUBPACKAGES = ('models', 'datasets', 'transforms', 'optimizers')
+
+
+def __getattr__(name):
+    if name in _SUBPACKAGES:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__,
+                                                                    name))
+
 
 __version__ = '0.0.0.dev0'
@@ -131,13 +131,143 @@ def slide_inference(model, im, crop_size, stride):
     return final_logit
 
 
+def slide_windows(h_im, w_im, crop_size, stride):
+    """
+    Get the sliding window positions of an image.
+
+    Args:
+        h_im (int): The height of image.
+        w_im (int): The width of image.
+        crop_size (tuple|list). The size of sliding window, (w, h).
+        stride (tuple|list). The size of stride, (w, h).
+
+    Returns:
+        list: List of (h1, h2, w1, w2). All windows have the same size.
+    """
+    w_crop, h_crop = crop_size
+    w_stride, h_stride = stride
+    rows = int(np.ceil(1.0 * (h_im - h_crop) / h_stride)) + 1
+    cols = int(np.ceil(1.0 * (w_im - w_crop) / w_stride)) + 1
+    rows = 1 if h_im <= h_crop else rows
+    cols = 1 if w_im <= w_crop else cols
+    windows = []
+    for r in range(rows):
+        for c in range(cols):
+            h1 = r * h_stride
+            w1 = c * w_stride
+            h2 = min(h1 + h_crop, h_im)
+            w2 = min(w1 + w_crop, w_im)
+            h1 = max(h2 - h_crop, 0)
+            w1 = max(w2 - w_crop, 0)
+            windows.append((h1, h2, w1, w2))
+    return windows
+
+
+def blend_weight(h, w, blend=None):
+    """
+    Get the weight map used to blend overlapping sliding windows.
+
+    Args:
+        h (int): The height of window.
+        w (int): The width of window.
+        blend (str, optional): None for uniform weights, 'gaussian' or 'cosine' to
+            down-weight the window borders. Default: None.
+
+    Returns:
+        np.ndarray: Weight map with shape (h, w) and dtype float32. All weights are positive.
+    """
+
+    def _weight_1d(n):
+        x = np.arange(n, dtype='float64') + 0.5
+        if blend == 'gaussian':
+            sigma = n / 8.0
+            weight = np.exp(-0.5 * ((x - n / 2.0) / sigma)**2)
+        elif blend == 'cosine':
+            weight = 0.5 - 0.5 * np.cos(2 * np.pi * x / n)
+        else:
+            raise ValueError(
+                "`blend` should be None, 'gaussian' or 'cosine', but received {}".
+                format(blend))
+        # Keep border weights positive so that image borders are still predicted
+        return np.maximum(weight / weight.max(), 1e-3)
+
+    if blend is None:
+        return np.ones([h, w], dtype='float32')
+    return np.outer(_weight_1d(h), _weight_1d(w)).astype('float32')
+
+
+def batch_slide_inference(model,
+                          im,
+                          crop_size,
+                          stride,
+                          batch_size=4,
+                          blend=None):
+    """
+    Infer by sliding window, running `batch_size` crops per forward pass.
+
+    Crops of all the images in `im` are gathered into one queue, so several images can
+    be inferred in one call. The logits are accumulated on device in float32 and divided
+    by a count map computed once from the window positions.
+
+    Args:
+        model (paddle.nn.Layer): model to get logits of image.
+        im (Tensor): the input images with shape (N, C, H, W).
+        crop_size (tuple|list). The size of sliding window, (w, h).
+        stride (tuple|list). The size of stride, (w, h).
+        batch_size (int, optional): The number of crops in a forward pass. Default: 4.
+        blend (str, optional): Blending weights of overlapping windows, None, 'gaussian'
+            or 'cosine'. Default: None.
+
+    Return:
+        Tensor: The logits of input images with shape (N, num_classes, H, W).
+    """
+    n_im = im.shape[0]
+    h_im, w_im = im.shape[-2:]
+    windows = slide_windows(h_im, w_im, crop_size, stride)
+    h1, h2, w1, w2 = windows[0]
+    weight = blend_weight(h2 - h1, w2 - w1, blend)
+
+    count = np.zeros([h_im, w_im], dtype='float32')
+    for h1, h2, w1, w2 in windows:
+        count[h1:h2, w1:w2] += weight
+    if np.sum(count == 0) != 0:
+        raise RuntimeError(
+            'There are pixel not predicted. It is possible that stride is greater than crop_size'
+        )
+    weight = paddle.to_tensor(weight[np.newaxis, np.newaxis])
+    inv_count = paddle.to_tensor((1.0 / count)[np.newaxis, np.newaxis])
+
+    jobs = [(i, win) for i in range(n_im) for win in windows]
+    final_logit = None
+    for start in range(0, len(jobs), batch_size):
+        batch = jobs[start:start + batch_size]
+        im_crop = paddle.concat(
+            [im[i:i + 1, :, h1:h2, w1:w2] for i, (h1, h2, w1, w2) in batch])
+        logits = model(im_crop)
+        if not isinstance(logits, collections.abc.Sequence):
+            raise TypeError(
+                "The type of logits must be one of collections.abc.Sequence, e.g. list, tuple. But received {}"
+                .format(type(logits)))
+        logit = logits[0].astype('float32')
+        if blend is not None:
+            logit = logit * weight
+        if final_logit is None:
+            final_logit = paddle.zeros(
+                [n_im, logit.shape[1], h_im, w_im], dtype='float32')
+        for k, (i, (h1, h2, w1, w2)) in enumerate(batch):
+            final_logit[i:i + 1, :, h1:h2, w1:w2] += logit[k:k + 1]
+    return final_logit * inv_count
+
+
 def inference(model,
               im,
               trans_info=None,
               is_slide=False,
               stride=None,
               crop_size=None,
-              use_multilabel=False):
+              use_multilabel=False,
+              slide_batch_size=None,
+              slide_blend=None):
     """
     Inference for image.
 
@@ -149,6 +279,10 @@ def inference(model,
         crop_size (tuple|list). The size of sliding window, (w, h). It should be probided if is_slide is True.
         stride (tuple|list). The size of stride, (w, h). It should be probided if is_slide is True.
         use_multilabel (bool, optional): Whether to enable multilabel mode. Default: False.
+        slide_batch_size (int, optional): If set, infer `slide_batch_size` sliding windows per forward
+            pass with `batch_slide_inference`. Default: None.
+        slide_blend (str, optional): Blending weights of sliding windows, None, 'gaussian' or 'cosine'.
+            Default: None.
 
     Returns:
         Tensor: If ori_shape is not None, a prediction with shape (1, 1, h, w) is returned.
@@ -163,6 +297,14 @@ def inference(model,
                 "The type of logits must be one of collections.abc.Sequence, e.g. list, tuple. But received {}"
                 .format(type(logits)))
         logit = logits[0]
+    elif slide_batch_size is not None or slide_blend is not None:
+        logit = batch_slide_inference(
+            model,
+            im,
+            crop_size=crop_size,
+            stride=stride,
+            batch_size=slide_batch_size or 1,
+            blend=slide_blend)
     else:
         logit = slide_inference(model, im, crop_size=crop_size, stride=stride)
     if hasattr(model, 'data_format') and model.data_format == 'NHWC':
@@ -187,7 +329,9 @@ def aug_inference(model,
                   is_slide=False,
                   stride=None,
                   crop_size=None,
-                  use_multilabel=False):
+                  use_multilabel=False,
+                  slide_batch_size=None,
+                  slide_blend=None):
     """
     Infer with augmentation.
 
@@ -202,6 +346,8 @@ def aug_inference(model,
         crop_size (tuple|list). The size of sliding window, (w, h). It should be probided if is_slide is True.
         stride (tuple|list). The size of stride, (w, h). It should be probided if is_slide is True.
         use_multilabel (bool, optional): Whether to enable multilabel mode. Default: False.
+        slide_batch_size (int, optional): The number of sliding windows per forward pass. Default: None.
+        slide_blend (str, optional): Blending weights of sliding windows. Default: None.
 
     Returns:
         Tensor: Prediction of image with shape (1, 1, h, w) is returned.
@@ -227,7 +373,9 @@ def aug_inference(model,
                 im_flip,
                 is_slide=is_slide,
                 crop_size=crop_size,
-                stride=stride)
+                stride=stride,
+                slide_batch_size=slide_batch_size,
+                slide_blend=slide_blend)
             logit = tensor_flip(logit, flip)
             logit = F.interpolate(logit, [h_input, w_input], mode='bilinear')
             # Accumulate final logits in place
@@ -0,0 +1,394 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import glob
+import json
+import math
+import time
+import collections
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import paddle
+
+from paddleseg import utils
+from paddleseg.core import infer
+from paddleseg.utils import logger, progbar, visualize
+
+
+def mkdir(path):
+    sub_dir = os.path.dirname(path)
+    if not os.path.exists(sub_dir):
+        os.makedirs(sub_dir, exist_ok=True)
+
+
+def partition_list(arr, m):
+    """split the list 'arr' into m pieces"""
+    n = int(math.ceil(len(arr) / float(m)))
+    return [arr[i:i + n] for i in range(0, len(arr), n)]
+
+
+def get_saved_name(im_path, image_dir=None):
+    """Get the saved name of image, which keeps the sub directory relative to `image_dir`."""
+    if image_dir is not None:
+        im_file = im_path.replace(image_dir, '')
+    else:
+        im_file = os.path.basename(im_path)
+    if im_file[0] == '/' or im_file[0] == '\\':
+        im_file = im_file[1:]
+    return im_file
+
+
+class StageTimer(object):
+    """Accumulate the wall time and the number of samples of each pipeline stage."""
+
+    def __init__(self, stages):
+        self.seconds = collections.OrderedDict((s, 0.) for s in stages)
+        self.samples = collections.OrderedDict((s, 0) for s in stages)
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, num_samples=1):
+        with self._lock:
+            self.seconds[stage] += seconds
+            self.samples[stage] += num_samples
+
+    def summary(self):
+        lines = []
+        for stage, seconds in self.seconds.items():
+            n = self.samples[stage]
+            lines.append('{}: {:.3f}s total, {:.4f}s/img'.format(
+                stage, seconds, seconds / n if n else 0.))
+        return ', '.join(lines)
+
+
+class PredictRecord(object):
+    """
+    The size and modification time of the predicted images, saved in `save_dir` so that a later
+    run only predicts new or changed images.
+
+    Args:
+        save_dir (str): The directory of the prediction results.
+        rank (int, optional): The rank of this process, every rank saves its own record. Default: 0.
+        save_interval (int, optional): Save the record every `save_interval` new images. Default: 500.
+    """
+
+    def __init__(self, save_dir, rank=0, save_interval=500):
+        self.path = os.path.join(save_dir,
+                                 'predict_record_rank{}.json'.format(rank))
+        self.save_interval = save_interval
+        self.records = {}
+        for path in sorted(
+                glob.glob(os.path.join(save_dir, 'predict_record_rank*.json'))):
+            try:
+                with open(path, 'r') as f:
+                    self.records.update(json.load(f))
+            except ValueError:
+                logger.warning(
+                    'The record {} is broken and ignored.'.format(path))
+        self._num_new = 0
+        self._lock = threading.Lock()
+
+    def is_done(self, im_file, info):
+        return self.records.get(im_file) == list(info)
+
+    def add(self, im_file, info):
+        with self._lock:
+            self.records[im_file] = list(info)
+            self._num_new += 1
+            if self._num_new % self.save_interval == 0:
+                self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.records, f)
+        os.replace(tmp_path, self.path)
+
+
+def _file_info(im_path):
+    stat = os.stat(im_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _decode(im_path, transforms, timer):
+    start = time.time()
+    # Keep the decoded image for visualization instead of reading it again
+    im = transforms.read_image(im_path)
+    data = transforms({'img': im})
+    data['ori_img'] = im
+    timer.record('decode', time.time() - start)
+    return im_path, data
+
+
+def _prefetch(executor, fn, items, max_in_flight):
+    """Submit `fn(item)` to `executor` with at most `max_in_flight` pending jobs, yield results in order."""
+    pending = collections.deque()
+    items = iter(items)
+    while True:
+        while len(pending) < max_in_flight:
+            item = next(items, None)
+            if item is None:
+                break
+            pending.append(executor.submit(fn, item))
+        if not pending:
+            return
+        yield pending.popleft().result()
+
+
+def _batches(samples, batch_size):
+    """Group consecutive samples with the same input shape into batches."""
+    batch = []
+    for im_path, data in samples:
+        if batch and (len(batch) >= batch_size
+                      or batch[0][1]['img'].shape != data['img'].shape):
+            yield batch
+            batch = []
+        batch.append((im_path, data))
+    if batch:
+        yield batch
+
+
+def _save(pred,
+          im,
+          im_file,
+          color_map,
+          palette,
+          added_saved_dir,
+          pred_saved_dir,
+          use_multilabel,
+          timer,
+          record=None,
+          info=None):
+    start = time.time()
+    # save added image
+    added_image = visualize.visualize(im,
+                                      pred,
+                                      palette,
+                                      weight=0.6,
+                                      use_multilabel=use_multilabel)
+    added_image_path = os.path.join(added_saved_dir, im_file)
+    mkdir(added_image_path)
+    cv2.imwrite(added_image_path, added_image)
+
+    # save pseudo color prediction
+    pred_mask = visualize.get_pseudo_color_map(pred, color_map, use_multilabel)
+    pred_saved_path = os.path.join(pred_saved_dir,
+                                   os.path.splitext(im_file)[0] + ".png")
+    mkdir(pred_saved_path)
+    pred_mask.save(pred_saved_path)
+    if record is not None:
+        record.add(im_file, info)
+    timer.record('write', time.time() - start)
+
+
+def predict(model,
+            model_path,
+            transforms,
+            image_list,
+            image_dir=None,
+            save_dir='output',
+            aug_pred=False,
+            scales=1.0,
+            flip_horizontal=True,
+            flip_vertical=False,
+            is_slide=False,
+            stride=None,
+            crop_size=None,
+            custom_color=None,
+            use_multilabel=False,
+            batch_size=1,
+            num_workers=2,
+            num_writers=2,
+            queue_size=8,
+            skip_existing=False,
+            slide_batch_size=None,
+            slide_blend=None,
+            incremental=False,
+            image_info=None):
+    """
+    predict and visualize the image_list.
+
+    Decoding and transforms run in a pool of `num_workers` threads, forward passes run on
+    batches of same-size images, and argmax, `reverse_transform`, pseudo-color encoding and
+    image writing run in a pool of `num_writers` threads. At most `queue_size` images are
+    pending between two stages, so the memory stays bounded on large image lists.
+
+    Args:
+        model (nn.Layer): Used to predict for input image.
+        model_path (str): The path of pretrained model.
+        transforms (transform.Compose): Preprocess for input image.
+        image_list (list): A list of image path to be predicted.
+        image_dir (str, optional): The root directory of the images predicted. Default: None.
+        save_dir (str, optional): The directory to save the visualized results. Default: 'output'.
+        aug_pred (bool, optional): Whether to use mulit-scales and flip augment for predition. Default: False.
+        scales (list|float, optional): Scales for augment. It is valid when `aug_pred` is True. Default: 1.0.
+        flip_horizontal (bool, optional): Whether to use flip horizontally augment. It is valid when `aug_pred` is True. Default: True.
+        flip_vertical (bool, optional): Whether to use flip vertically augment. It is valid when `aug_pred` is True. Default: False.
+        is_slide (bool, optional): Whether to predict by sliding window. Default: False.
+        stride (tuple|list, optional): The stride of sliding window, the first is width and the second is height.
+            It should be provided when `is_slide` is True.
+        crop_size (tuple|list, optional):  The crop size of sliding window, the first is width and the second is height.
+            It should be provided when `is_slide` is True.
+        custom_color (list, optional): Save images with a custom color map. Default: None, use paddleseg's default color map.
+        use_multilabel (bool, optional): Whether to enable multilabel mode. Default: False.
+        batch_size (int, optional): The number of images in a forward pass. Images of different input
+            shapes are never batched together, and `aug_pred` always uses 1. Default: 1.
+        num_workers (int, optional): The number of threads decoding and transforming images. Default: 2.
+        num_writers (int, optional): The number of threads encoding and writing results. Default: 2.
+        queue_size (int, optional): The maximum number of images pending between two stages. Default: 8.
+        skip_existing (bool, optional): Skip the images whose pseudo color prediction already exists,
+            so that an interrupted run can be resumed. Default: False.
+        slide_batch_size (int, optional): The number of sliding windows per forward pass. Default: None.
+        slide_blend (str, optional): Blending weights of sliding windows, None, 'gaussian' or 'cosine'. Default: None.
+        incremental (bool, optional): Only predict the images which are new or changed since the last
+            incremental run into `save_dir`, by the size and modification time recorded in
+            `save_dir/predict_record_rank*.json`. Default: False.
+        image_info (dict, optional): {image path: (size, modification time in ns)} of the images, e.g.
+            from `utils.scan_images`. The images are stat-ed in `num_workers` threads if it is not
+            given. Default: None.
+
+    Returns:
+        dict: The total seconds of each stage and the number of predicted images.
+    """
+    utils.utils.load_entire_model(model, model_path)
+    model.eval()
+    nranks = paddle.distributed.get_world_size()
+    local_rank = paddle.distributed.get_rank()
+    if nranks > 1:
+        img_lists = partition_list(image_list, nranks)
+    else:
+        img_lists = [image_list]
+
+    added_saved_dir = os.path.join(save_dir, 'added_prediction')
+    pred_saved_dir = os.path.join(save_dir, 'pseudo_color_prediction')
+
+    img_list = img_lists[local_rank] if local_rank < len(img_lists) else []
+    if skip_existing:
+        todo = [
+            im_path for im_path in img_list if not os.path.exists(
+                os.path.join(
+                    pred_saved_dir,
+                    os.path.splitext(get_saved_name(im_path, image_dir))[0] +
+                    ".png"))
+        ]
+        logger.info("Skip {} images which have been predicted.".format(
+            len(img_list) - len(todo)))
+        img_list = todo
+    record = None
+    infos = {}
+    if incremental:
+        record = PredictRecord(save_dir, local_rank)
+        image_info = image_info or {}
+        missing = [p for p in img_list if p not in image_info]
+        with ThreadPoolExecutor(max_workers=max(1, num_workers)) as pool:
+            infos = dict(zip(missing, pool.map(_file_info, missing)))
+        infos.update((p, image_info[p]) for p in img_list if p in image_info)
+        todo = [
+            im_path for im_path in img_list if not record.is_done(
+                get_saved_name(im_path, image_dir), infos[im_path])
+        ]
+        logger.info(
+            "Skip {} images which are unchanged since the last run.".format(
+                len(img_list) - len(todo)))
+        img_list = todo
+
+    logger.info("Start to predict...")
+    progbar_pred = progbar.Progbar(target=len(img_list), verbose=1)
+    color_map = visualize.get_color_map_list(256, custom_color=custom_color)
+    palette = visualize.get_palette(color_map)
+    timer = StageTimer(['decode', 'wait', 'infer', 'write'])
+    batch_size = 1 if aug_pred else max(1, batch_size)
+    if is_slide and batch_size > 1 and slide_batch_size is None:
+        # slide_inference only supports one image per call
+        slide_batch_size = batch_size
+    queue_size = max(queue_size, batch_size)
+
+    start = time.time()
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, num_workers)) as decoder, \
+            visualize.AsyncImageWriter(num_writers, queue_size) as writer, \
+            paddle.no_grad():
+        samples = _prefetch(decoder, lambda p: _decode(p, transforms, timer),
+                            img_list, queue_size)
+        wait_start = time.time()
+        for batch in _batches(samples, batch_size):
+            timer.record('wait', time.time() - wait_start, len(batch))
+            infer_start = time.time()
+            im = paddle.to_tensor(np.stack([data['img'] for _, data in batch]))
+            if aug_pred:
+                pred, _ = infer.aug_inference(
+                    model,
+                    im,
+                    trans_info=batch[0][1]['trans_info'],
+                    scales=scales,
+                    flip_horizontal=flip_horizontal,
+                    flip_vertical=flip_vertical,
+                    is_slide=is_slide,
+                    stride=stride,
+                    crop_size=crop_size,
+                    use_multilabel=use_multilabel,
+                    slide_batch_size=slide_batch_size,
+                    slide_blend=slide_blend)
+                preds = [pred]
+            else:
+                logits = infer.inference(model,
+                                         im,
+                                         is_slide=is_slide,
+                                         stride=stride,
+                                         crop_size=crop_size,
+                                         slide_batch_size=slide_batch_size,
+                                         slide_blend=slide_blend)
+                preds = []
+                for k, (_, data) in enumerate(batch):
+                    logit = infer.reverse_transform(logits[k:k + 1],
+                                                    data['trans_info'],
+                                                    mode='bilinear')
+                    if not use_multilabel:
+                        pred = paddle.argmax(logit,
+                                             axis=1,
+                                             keepdim=True,
+                                             dtype='int32')
+                    else:
+                        pred = (paddle.nn.functional.sigmoid(logit) >
+                                0.5).astype('int32')
+                    preds.append(pred)
+            preds = [paddle.squeeze(p).numpy().astype('uint8') for p in preds]
+            timer.record('infer', time.time() - infer_start, len(batch))
+
+            for (im_path, data), pred in zip(batch, preds):
+                im_file = get_saved_name(im_path, image_dir)
+                writer.submit(_save, pred, data['ori_img'], im_file, color_map,
+                              palette, added_saved_dir, pred_saved_dir,
+                              use_multilabel, timer, record, infos.get(im_path))
+
+            done += len(batch)
+            progbar_pred.update(done)
+            wait_start = time.time()
+
+    if record is not None:
+        record.save()
+    elapsed = time.time() - start
+    stats = dict(timer.seconds)
+    stats.update({'images': done, 'seconds': elapsed})
+    logger.info("Predicted {} images in {:.2f}s ({:.2f} img/s). {}".format(
+        done, elapsed, done / elapsed if elapsed > 0 else 0., timer.summary()))
+    return stats
@@ -13,18 +13,122 @@
 # limitations under the License.
 
 import os
+import queue
+import threading
+import contextlib
+import collections
 
 import numpy as np
 import time
 import paddle
 import paddle.nn.functional as F
+from PIL import Image
 
 from paddleseg.utils import metrics, TimeAverager, calculate_eta, logger, progbar
+from paddleseg.transforms import profiler as transforms_profiler
 from paddleseg.core import infer
 
 np.set_printoptions(suppress=True)
 
 
+def _image_size(dataset, idx):
+    """Read the image size from the file header without decoding the image."""
+    try:
+        with Image.open(dataset.file_list[idx][0]) as im:
+            return im.size
+    except (AttributeError, IndexError, TypeError, OSError):
+        return None
+
+
+class EvalBatchSampler(paddle.io.BatchSampler):
+    """
+    Batch sampler for evaluation.
+
+    Every rank gets every `nranks`-th sample and no sample is padded, so the metrics can be
+    all-reduced once at the end without removing duplicated samples. When `batch_size` > 1,
+    the samples are bucketed by the image size read from the file header, so that a batch
+    only contains images of the same size.
+
+    Args:
+        dataset (paddle.io.Dataset): The evaluation dataset.
+        batch_size (int, optional): The batch size. Default: 1.
+        nranks (int, optional): The number of ranks. Default: 1.
+        local_rank (int, optional): The rank of current process. Default: 0.
+    """
+
+    def __init__(self, dataset, batch_size=1, nranks=1, local_rank=0):
+        self.batch_size = batch_size
+        indices = list(range(local_rank, len(dataset), nranks))
+        buckets = collections.OrderedDict()
+        for idx in indices:
+            key = _image_size(dataset, idx) if batch_size > 1 else None
+            buckets.setdefault(key, []).append(idx)
+        self.batches = [
+            bucket[i:i + batch_size]
+            for bucket in buckets.values()
+            for i in range(0, len(bucket), batch_size)
+        ]
+
+    def __iter__(self):
+        return iter(self.batches)
+
+    def __len__(self):
+        return len(self.batches)
+
+
+def eval_collate_fn(samples):
+    """
+    Stack the samples of the same image and label shape, and keep `trans_info` of every sample.
+
+    Returns:
+        list: The sub-batches, each is a dict of 'img', 'label' and 'trans_info'.
+    """
+    groups = collections.OrderedDict()
+    for sample in samples:
+        key = (sample['img'].shape, sample['label'].shape)
+        groups.setdefault(key, []).append(sample)
+    return [{
+        'img': np.stack([s['img'] for s in group]),
+        'label': np.stack([s['label'] for s in group]),
+        'trans_info': [s['trans_info'] for s in group]
+    } for group in groups.values()]
+
+
+def prefetch(iterable, size=2):
+    """Iterate `iterable` in a background thread, keeping at most `size` items ready."""
+    q = queue.Queue(maxsize=size)
+    end = object()
+
+    def _worker():
+        try:
+            for item in iterable:
+                q.put(item)
+        except Exception as e:
+            q.put(e)
+        q.put(end)
+
+    thread = threading.Thread(target=_worker, daemon=True)
+    thread.start()
+    while True:
+        item = q.get()
+        if item is end:
+            break
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+def amp_context(precision='fp32', amp_level='O1'):
+    """The auto mixed precision context used in evaluation, or a null context if precision is fp32."""
+    if precision != 'fp16':
+        return contextlib.nullcontext()
+    return paddle.amp.auto_cast(
+        level=amp_level,
+        enable=True,
+        custom_white_list={"elementwise_add", "batch_norm", "sync_batch_norm"},
+        custom_black_list={'bilinear_interp_v2'})
+
+
 def evaluate(model,
              eval_dataset,
              aug_eval=False,
@@ -34,12 +138,16 @@ def evaluate(model,
              is_slide=False,
              stride=None,
              crop_size=None,
+             slide_batch_size=None,
+             slide_blend=None,
              precision='fp32',
              amp_level='O1',
              num_workers=0,
              print_detail=True,
              auc_roc=False,
-             use_multilabel=False):
+             use_multilabel=False,
+             batch_size=1,
+             prefetch_size=2):
     """
     Launch evalution.
 
@@ -55,12 +163,19 @@ def evaluate(model,
             It should be provided when `is_slide` is True.
         crop_size (tuple|list, optional):  The crop size of sliding window, the first is width and the second is height.
             It should be provided when `is_slide` is True.
+        slide_batch_size (int, optional): The number of sliding windows per forward pass. Default: None.
+        slide_blend (str, optional): Blending weights of sliding windows, None, 'gaussian' or 'cosine'. Default: None.
         precision (str, optional): Use AMP if precision='fp16'. If precision='fp32', the evaluation is normal.
         amp_level (str, optional): Auto mixed precision level. Accepted values are “O1” and “O2”: O1 represent mixed precision, the input data type of each operator will be casted by white_list and black_list; O2 represent Pure fp16, all operators parameters and input data will be casted to fp16, except operators in black_list, don’t support fp16 kernel and batchnorm. Default is O1(amp)
         num_workers (int, optional): Num workers for data loader. Default: 0.
         print_detail (bool, optional): Whether to print detailed information about the evaluation process. Default: True.
-        auc_roc(bool, optional): whether add auc_roc metric
+        auc_roc(bool, optional): whether add auc_roc metric. It is computed from streaming score histograms,
+            see `metrics.StreamingAUC`.
         use_multilabel (bool, optional): Whether to enable multilabel mode. Default: False.
+        batch_size (int, optional): The number of images evaluated in a forward pass. Images are bucketed
+            by size so that a batch only contains images of the same size. Default: 1.
+        prefetch_size (int, optional): The number of batches loaded ahead in a background thread. 0 disables
+            prefetching. Default: 2.
 
     Returns:
         float: The mIoU of validation datasets.
@@ -74,20 +189,26 @@ def evaluate(model,
         if not paddle.distributed.parallel.parallel_helper._is_parallel_ctx_initialized(
         ):
             paddle.distributed.init_parallel_env()
-    batch_sampler = paddle.io.DistributedBatchSampler(
-        eval_dataset, batch_size=1, shuffle=False, drop_last=False)
+    batch_sampler = EvalBatchSampler(
+        eval_dataset,
+        batch_size=batch_size,
+        nranks=nranks,
+        local_rank=local_rank)
     loader = paddle.io.DataLoader(
         eval_dataset,
         batch_sampler=batch_sampler,
         num_workers=num_workers,
+        collate_fn=eval_collate_fn,
         return_list=True, )
 
     total_iters = len(loader)
-    intersect_area_all = paddle.zeros([1], dtype='int64')
-    pred_area_all = paddle.zeros([1], dtype='int64')
-    label_area_all = paddle.zeros([1], dtype='int64')
-    logits_all = None
-    label_all = None
+    confusion_matrix = metrics.ConfusionMatrix(
+        eval_dataset.num_classes,
+        ignore_index=eval_dataset.ignore_index,
+        use_multilabel=use_multilabel)
+    auc_meter = metrics.StreamingAUC(
+        eval_dataset.num_classes,
+        ignore_index=eval_dataset.ignore_index) if auc_roc else None
 
     if print_detail:
         logger.info("Start evaluating (total_samples: {}, total_iters: {})...".
@@ -98,118 +219,67 @@ def evaluate(model,
     reader_cost_averager = TimeAverager()
     batch_cost_averager = TimeAverager()
     batch_start = time.time()
+    if is_slide and batch_size > 1 and slide_batch_size is None:
+        # slide_inference only supports one image per call
+        slide_batch_size = batch_size
+    batches = prefetch(loader, prefetch_size) if prefetch_size > 0 else loader
     with paddle.no_grad():
-        for iter, data in enumerate(loader):
+        for iter, sub_batches in enumerate(batches):
             reader_cost_averager.record(time.time() - batch_start)
-            label = data['label'].astype('int64')
-
-            if aug_eval:
-                if precision == 'fp16':
-                    with paddle.amp.auto_cast(
-                            level=amp_level,
-                            enable=True,
-                            custom_white_list={
-                                "elementwise_add", "batch_norm",
-                                "sync_batch_norm"
-                            },
-                            custom_black_list={'bilinear_interp_v2'}):
-                        pred, logits = infer.aug_inference(
-                            model,
-                            data['img'],
-                            trans_info=data['trans_info'],
-                            scales=scales,
-                            flip_horizontal=flip_horizontal,
-                            flip_vertical=flip_vertical,
-                            is_slide=is_slide,
-                            stride=stride,
-                            crop_size=crop_size,
-                            use_multilabel=use_multilabel)
-                else:
-                    pred, logits = infer.aug_inference(
-                        model,
-                        data['img'],
-                        trans_info=data['trans_info'],
-                        scales=scales,
-                        flip_horizontal=flip_horizontal,
-                        flip_vertical=flip_vertical,
-                        is_slide=is_slide,
-                        stride=stride,
-                        crop_size=crop_size,
-                        use_multilabel=use_multilabel)
-            else:
-                if precision == 'fp16':
-                    with paddle.amp.auto_cast(
-                            level=amp_level,
-                            enable=True,
-                            custom_white_list={
-                                "elementwise_add", "batch_norm",
-                                "sync_batch_norm"
-                            },
-                            custom_black_list={'bilinear_interp_v2'}):
-                        pred, logits = infer.inference(
+            num_samples = 0
+            for data in sub_batches:
+                label = data['label'].astype('int64')
+                img = data['img']
+                preds = []
+                logits = []
+                with amp_context(precision, amp_level):
+                    if aug_eval:
+                        for k, trans_info in enumerate(data['trans_info']):
+                            pred, logit = infer.aug_inference(
+                                model,
+                                img[k:k + 1],
+                                trans_info=trans_info,
+                                scales=scales,
+                                flip_horizontal=flip_horizontal,
+                                flip_vertical=flip_vertical,
+                                is_slide=is_slide,
+                                stride=stride,
+                                crop_size=crop_size,
+                                use_multilabel=use_multilabel,
+                                slide_batch_size=slide_batch_size,
+                                slide_blend=slide_blend)
+                            preds.append(pred)
+                            logits.append(logit)
+                    else:
+                        batch_logit = infer.inference(
                             model,
-                            data['img'],
-                            trans_info=data['trans_info'],
+                            img,
                             is_slide=is_slide,
                             stride=stride,
                             crop_size=crop_size,
-                            use_multilabel=use_multilabel)
-                else:
-                    pred, logits = infer.inference(
-                        model,
-                        data['img'],
-                        trans_info=data['trans_info'],
-                        is_slide=is_slide,
-                        stride=stride,
-                        crop_size=crop_size,
-                        use_multilabel=use_multilabel)
-
-            intersect_area, pred_area, label_area = metrics.calculate_area(
-                pred,
-                label,
-                eval_dataset.num_classes,
-                ignore_index=eval_dataset.ignore_index,
-                use_multilabel=use_multilabel)
-
-            # Gather from all ranks
-            if nranks > 1:
-                intersect_area_list = []
-                pred_area_list = []
-                label_area_list = []
-                paddle.distributed.all_gather(intersect_area_list,
-                                              intersect_area)
-                paddle.distributed.all_gather(pred_area_list, pred_area)
-                paddle.distributed.all_gather(label_area_list, label_area)
-
-                # Some image has been evaluated and should be eliminated in last iter
-                if (iter + 1) * nranks > len(eval_dataset):
-                    valid = len(eval_dataset) - iter * nranks
-                    intersect_area_list = intersect_area_list[:valid]
-                    pred_area_list = pred_area_list[:valid]
-                    label_area_list = label_area_list[:valid]
-
-                for i in range(len(intersect_area_list)):
-                    intersect_area_all = intersect_area_all + intersect_area_list[
-                        i]
-                    pred_area_all = pred_area_all + pred_area_list[i]
-                    label_area_all = label_area_all + label_area_list[i]
-            else:
-                intersect_area_all = intersect_area_all + intersect_area
-                pred_area_all = pred_area_all + pred_area
-                label_area_all = label_area_all + label_area
+                            slide_batch_size=slide_batch_size,
+                            slide_blend=slide_blend)
+                        for k, trans_info in enumerate(data['trans_info']):
+                            logit = infer.reverse_transform(
+                                batch_logit[k:k + 1], trans_info, mode='bilinear')
+                            if not use_multilabel:
+                                pred = paddle.argmax(
+                                    logit, axis=1, keepdim=True, dtype='int32')
+                            else:
+                                pred = (F.sigmoid(logit) > 0.5).astype('int32')
+                            preds.append(pred)
+                            logits.append(logit)
+                pred = paddle.concat(preds)
+                logits = paddle.concat(logits)
+
+                confusion_matrix.update(pred, label)
+                num_samples += len(label)
 
                 if auc_roc:
-                    logits = F.softmax(logits, axis=1)
-                    if logits_all is None:
-                        logits_all = logits.numpy()
-                        label_all = label.numpy()
-                    else:
-                        logits_all = np.concatenate(
-                            [logits_all, logits.numpy()])  # (KN, C, H, W)
-                        label_all = np.concatenate([label_all, label.numpy()])
+                    auc_meter.update(F.softmax(logits, axis=1), label)
 
             batch_cost_averager.record(
-                time.time() - batch_start, num_samples=len(label))
+                time.time() - batch_start, num_samples=num_samples)
             batch_cost = batch_cost_averager.get_average()
             reader_cost = reader_cost_averager.get_average()
 
@@ -220,7 +290,8 @@ def evaluate(model,
             batch_cost_averager.reset()
             batch_start = time.time()
 
-    metrics_input = (intersect_area_all, pred_area_all, label_area_all)
+    confusion_matrix.all_reduce()
+    metrics_input = confusion_matrix.areas()
     class_iou, miou = metrics.mean_iou(*metrics_input)
     acc, class_precision, class_recall = metrics.class_measurement(
         *metrics_input)
@@ -228,8 +299,8 @@ def evaluate(model,
     class_dice, mdice = metrics.dice(*metrics_input)
 
     if auc_roc:
-        auc_roc = metrics.auc_roc(
-            logits_all, label_all, num_classes=eval_dataset.num_classes)
+        auc_meter.all_reduce()
+        auc_roc = auc_meter.accumulate()
         auc_infor = ' Auc_roc: {:.4f}'.format(auc_roc)
 
     if print_detail:
@@ -241,4 +312,7 @@ def evaluate(model,
         logger.info("[EVAL] Class Precision: \n" + str(
             np.round(class_precision, 4)))
         logger.info("[EVAL] Class Recall: \n" + str(np.round(class_recall, 4)))
+        if transforms_profiler.save_dir() is not None:
+            # Break the reader cost down to the ops of the transforms
+            transforms_profiler.summary()
     return miou, acc, class_iou, class_precision, kappa
@@ -80,6 +80,11 @@ class Builder(object):
         return component_class(*args, **kwargs)
 
     def load_component_class(self, class_type):
+        # Only the module defining `class_type` is imported, see `ComponentManager`
+        for com in self.comp_list:
+            if class_type in com:
+                return com[class_type]
+        # Components not registered by decorators, e.g. aliases added in package `__init__`
         for com in self.comp_list:
             if class_type in com.components_dict:
                 return com[class_type]
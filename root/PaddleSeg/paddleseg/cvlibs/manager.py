@@ -12,11 +12,56 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import re
+import sys
 import inspect
+import importlib
+import importlib.util
 from collections.abc import Sequence
 
 import warnings
 
+_REGISTER_PATTERN = re.compile(
+    r'^@manager\.(\w+)\.add_component\s*\n(?:@.*\n)*(?:class|def)\s+(\w+)',
+    re.M)
+
+
+def scan_components(packages):
+    """
+    Find the components registered by `@manager.XXX.add_component` in the source files of
+    `packages` without importing them.
+
+    Args:
+        packages (list): The names of packages to scan, such as ['paddleseg.models'].
+
+    Returns:
+        dict: {manager attribute name: {component name: module name}}.
+    """
+    index = {}
+    for package in packages:
+        spec = importlib.util.find_spec(package)
+        if spec is None or not spec.submodule_search_locations:
+            continue
+        for root in spec.submodule_search_locations:
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames[:] = sorted(d for d in dirnames if d != '__pycache__')
+                for filename in sorted(filenames):
+                    if not filename.endswith('.py'):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    with open(path, 'r', encoding='utf-8') as f:
+                        text = f.read()
+                    if '@manager.' not in text:
+                        continue
+                    rel = os.path.relpath(path, root)[:-3].replace(os.sep, '.')
+                    if rel.endswith('__init__'):
+                        rel = rel[:-len('__init__')].rstrip('.')
+                    module = package + ('.' + rel if rel else '')
+                    for attr, name in _REGISTER_PATTERN.findall(text):
+                        index.setdefault(attr, {}).setdefault(name, module)
+    return index
+
 
 class ComponentManager:
     """
@@ -61,27 +106,63 @@ class ComponentManager:
 
         print(model_manager.components_dict)
         # {'AlexNet': <class '__main__.AlexNet'>, 'ResNet': <class '__main__.ResNet'>}
+
+    Examples 3:
+
+        # Components of the given packages are imported on first lookup. The modules are found by
+        # scanning the source files for `@manager.MODELS.add_component`, i.e. `name.upper()`.
+        MODELS = ComponentManager("models", packages=['paddleseg.models'])
+        model_class = MODELS['SegFormer']  # only imports paddleseg.models.segformer
     """
 
-    def __init__(self, name=None):
+    def __init__(self, name=None, packages=None):
         self._components_dict = dict()
         self._name = name
+        self._packages = list(packages or [])
+        self._lazy_index = None
+        self._all_loaded = not self._packages
 
     def __len__(self):
-        return len(self._components_dict)
+        return len(self.components_dict)
 
     def __repr__(self):
         name_str = self._name if self._name else self.__class__.__name__
-        return "{}:{}".format(name_str, list(self._components_dict.keys()))
+        return "{}:{}".format(name_str, list(self.components_dict.keys()))
+
+    def __contains__(self, item):
+        return item in self._components_dict or item in self.lazy_index
 
     def __getitem__(self, item):
-        if item not in self._components_dict.keys():
+        if item not in self._components_dict and item in self.lazy_index:
+            importlib.import_module(self.lazy_index[item])
+        if item not in self._components_dict:
+            # Components added in other ways, e.g. aliases in package `__init__`
+            self._load_all()
+        if item not in self._components_dict:
             raise KeyError("{} does not exist in availabel {}".format(item,
                                                                       self))
         return self._components_dict[item]
 
+    @property
+    def lazy_index(self):
+        """dict: {component name: module name} of the components which can be imported lazily."""
+        if self._lazy_index is None:
+            key = (self._name or '').upper()
+            self._lazy_index = scan_components(self._packages).get(key, {})
+        return self._lazy_index
+
+    def _load_all(self):
+        if self._all_loaded:
+            return
+        self._all_loaded = True
+        for package in self._packages:
+            importlib.import_module(package)
+        for module in sorted(set(self.lazy_index.values())):
+            importlib.import_module(module)
+
     @property
     def components_dict(self):
+        self._load_all()
         return self._components_dict
 
     @property
@@ -140,9 +221,80 @@ class ComponentManager:
         return components
 
 
-MODELS = ComponentManager("models")
-BACKBONES = ComponentManager("backbones")
-DATASETS = ComponentManager("datasets")
-TRANSFORMS = ComponentManager("transforms")
-LOSSES = ComponentManager("losses")
-OPTIMIZERS = ComponentManager("optimizers")
+MODELS = ComponentManager("models", packages=['paddleseg.models'])
+BACKBONES = ComponentManager(
+    "backbones", packages=['paddleseg.models.backbones'])
+DATASETS = ComponentManager("datasets", packages=['paddleseg.datasets'])
+TRANSFORMS = ComponentManager("transforms", packages=['paddleseg.transforms'])
+LOSSES = ComponentManager("losses", packages=['paddleseg.models.losses'])
+OPTIMIZERS = ComponentManager("optimizers", packages=['paddleseg.optimizers'])
+
+
+def lazy_package(package, submodules):
+    """
+    Make the star-imports of a package lazy.
+
+    Instead of `from .xxx import *` for every submodule, the package `__init__` calls
+    `__getattr__, __dir__ = lazy_package(__name__, [...])`. An attribute is resolved on first
+    access: submodules are imported directly, registered components are imported from the
+    module found by `scan_components`, and other names fall back to importing all `submodules`
+    in order and copying their public names into the package, as the star-imports did.
+
+    Args:
+        package (str): The name of the package, i.e. `__name__` in its `__init__`.
+        submodules (list): The submodules which were imported, in the original order. An item is
+            either the name of a star-imported submodule or a tuple of the submodule name and the
+            list of names imported from it.
+
+    Returns:
+        function: The module level `__getattr__` of the package.
+        function: The module level `__dir__` of the package.
+    """
+    state = {'index': None, 'loaded': False}
+
+    def _namespace():
+        return sys.modules[package].__dict__
+
+    def _load_all():
+        if state['loaded']:
+            return
+        state['loaded'] = True
+        namespace = _namespace()
+        for submodule in submodules:
+            names = None
+            if isinstance(submodule, tuple):
+                submodule, names = submodule
+            module = importlib.import_module('.' + submodule, package)
+            if names is None:
+                names = getattr(module, '__all__', None)
+            if names is None:
+                names = [n for n in vars(module) if not n.startswith('_')]
+            for name in names:
+                namespace.setdefault(name, getattr(module, name))
+
+    def __getattr__(name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if importlib.util.find_spec('.' + name, package) is not None:
+            return importlib.import_module('.' + name, package)
+        if state['index'] is None:
+            state['index'] = {}
+            for components in scan_components([package]).values():
+                for key, module in components.items():
+                    state['index'].setdefault(key, module)
+        namespace = _namespace()
+        if name in state['index']:
+            obj = getattr(importlib.import_module(state['index'][name]), name)
+            namespace.setdefault(name, obj)
+            return obj
+        _load_all()
+        if name in namespace:
+            return namespace[name]
+        raise AttributeError("module '{}' has no attribute '{}'".format(
+            package, name))
+
+    def __dir__():
+        _load_all()
+        return sorted(_namespace().keys())
+
+    return __getattr__, __dir__
@@ -28,6 +28,7 @@ from .hrf import HRF
 from .chase_db1 import CHASEDB1
 from .pp_humanseg14k import PPHumanSeg14K
 from .pssl import PSSLDataset
+from .sample_cache import SampleCache
 
 from paddleseg.cvlibs import manager
 
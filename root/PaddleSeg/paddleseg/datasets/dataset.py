@@ -20,6 +20,7 @@ from PIL import Image
 
 from paddleseg.cvlibs import manager
 from paddleseg.transforms import Compose
+from paddleseg.datasets.sample_cache import SampleCache
 import paddleseg.transforms.functional as F
 
 
@@ -43,6 +44,13 @@ class Dataset(paddle.io.Dataset):
             The annotation file is not necessary in test_path file.
         separator (str, optional): The separator of dataset list. Default: ' '.
         edge (bool, optional): Whether to compute edge while training. Default: False
+        cache_dir (str, optional): The directory of a memory-mapped cache of decoded samples. If set, every image
+            and label is decoded once and later epochs only run the transforms. Put it on a local disk or
+            /dev/shm. Default: None, decode the files every time.
+        cache_max_bytes (int, optional): The maximum bytes of the cache, the least recently used samples are
+            removed beyond it. Default: None, unbounded.
+        preload_cache (bool, optional): Whether to decode all the samples into the cache when creating the
+            dataset. Default: False, fill the cache on first access.
 
         Examples:
 
@@ -72,7 +80,10 @@ class Dataset(paddle.io.Dataset):
                  test_path=None,
                  separator=' ',
                  ignore_index=255,
-                 edge=False):
+                 edge=False,
+                 cache_dir=None,
+                 cache_max_bytes=None,
+                 preload_cache=False):
         self.dataset_root = dataset_root
         self.transforms = Compose(transforms, img_channels=img_channels)
         self.file_list = list()
@@ -145,12 +156,33 @@ class Dataset(paddle.io.Dataset):
                     label_path = os.path.join(self.dataset_root, items[1])
                 self.file_list.append([image_path, label_path])
 
+        self.sample_cache = None
+        if cache_dir is not None:
+            self.sample_cache = SampleCache(cache_dir, max_bytes=cache_max_bytes)
+            if preload_cache:
+                self.sample_cache.preload(self.file_list, self.decode_sample)
+
+    def decode_sample(self, image_path, label_path):
+        """Decode the image and label of a sample to uint8 arrays."""
+        img = self.transforms.read_image(image_path)
+        label = None
+        if label_path is not None:
+            label = self.transforms.read_label(label_path, img.shape[:2])
+        return {'img': img, 'label': label}
+
     def __getitem__(self, idx):
         data = {}
         data['trans_info'] = []
         image_path, label_path = self.file_list[idx]
         data['img'] = image_path
         data['label'] = label_path
+        sample_cache = getattr(self, 'sample_cache', None)
+        if sample_cache is not None:
+            arrays = sample_cache.get([image_path, label_path],
+                                      self.decode_sample)
+            data['img'] = arrays['img']
+            if arrays.get('label') is not None:
+                data['label'] = np.array(arrays['label'])
         # If key in gt_fields, the data[key] have transforms synchronous.
         data['gt_fields'] = []
         if self.mode == 'val':
@@ -0,0 +1,198 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import time
+import hashlib
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from paddleseg.utils import logger
+
+
+class SampleCache(object):
+    """
+    A memory-mapped store of decoded samples.
+
+    Every sample is decoded once and saved as uint8 `.npy` files in `cache_dir`. Later reads
+    use `np.load(mmap_mode='r')`, so DataLoader workers share the pages through the OS page
+    cache and get arrays without decoding or copying. The key of a sample contains the size
+    and the modification time of its files, so a changed file is decoded again.
+
+    The total size of the store is bounded by `max_bytes`. When a new sample exceeds the
+    bound, the least recently used samples are removed. The recency is kept by every process
+    and by the modification time of the cached files, so with several workers the bound is
+    approximate.
+
+    Args:
+        cache_dir (str): The directory of the store. It can be shared by several datasets.
+        max_bytes (int, optional): The maximum total bytes of the store. Default: None, unbounded.
+
+    Examples:
+
+        cache = SampleCache('/dev/shm/root_cache', max_bytes=20 * 1024**3)
+        arrays = cache.get([img_path, label_path], decode_fn)
+    """
+
+    def __init__(self, cache_dir, max_bytes=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lru = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Every DataLoader worker rebuilds its own recency order
+        state = self.__dict__.copy()
+        state['_lru'] = None
+        state['_lock'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        """Load the recency order of the store from the modification time of its files."""
+        entries = {}
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith('.npy'):
+                continue
+            key = entry.name.split('.')[0]
+            stat = entry.stat()
+            mtime, nbytes = entries.get(key, (0, 0))
+            entries[key] = (max(mtime, stat.st_mtime), nbytes + stat.st_size)
+        self._lru = collections.OrderedDict(
+            (key, nbytes)
+            for key, (_, nbytes) in sorted(
+                entries.items(), key=lambda kv: kv[1][0]))
+        self._total_bytes = sum(self._lru.values())
+
+    @staticmethod
+    def sample_key(paths):
+        """The key of a sample from the path, size and modification time of its files."""
+        h = hashlib.sha1()
+        for path in paths:
+            if path is None:
+                h.update(b'None')
+                continue
+            stat = os.stat(path)
+            h.update('{}|{}|{}'.format(
+                os.path.abspath(path), stat.st_size, stat.st_mtime_ns).encode())
+        return h.hexdigest()
+
+    def _path(self, key, name):
+        return os.path.join(self.cache_dir, '{}.{}.npy'.format(key, name))
+
+    def _load(self, key, names):
+        arrays = {}
+        for name in names:
+            arrays[name] = np.load(self._path(key, name), mmap_mode='r')
+        return arrays
+
+    def _evict(self):
+        while self.max_bytes is not None and self._total_bytes > self.max_bytes \
+                and len(self._lru) > 1:
+            key, nbytes = self._lru.popitem(last=False)
+            self._total_bytes -= nbytes
+            for filename in os.listdir(self.cache_dir):
+                if filename.startswith(key + '.'):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, filename))
+                    except OSError:
+                        # The file is still mapped by other process on Windows
+                        pass
+
+    def get(self, paths, decode_fn, names=('img', 'label')):
+        """
+        Get the decoded arrays of a sample, decoding and storing it on a miss.
+
+        Args:
+            paths (list): The files of the sample, which are used as the key.
+            decode_fn (callable): `decode_fn(*paths)` returns a dict of the arrays named by `names`.
+                An array which is None is not stored.
+            names (tuple, optional): The names of arrays. Default: ('img', 'label').
+
+        Returns:
+            dict: The read-only memory-mapped arrays.
+        """
+        with self._lock:
+            if self._lru is None:
+                self._scan()
+        key = self.sample_key(paths)
+        stored = [n for n in names if os.path.exists(self._path(key, n))]
+        if stored:
+            try:
+                arrays = self._load(key, stored)
+                with self._lock:
+                    if key in self._lru:
+                        self._lru.move_to_end(key)
+                os.utime(self._path(key, stored[0]))
+                return arrays
+            except (OSError, ValueError):
+                # Removed or being written by other process, decode again
+                pass
+
+        arrays = decode_fn(*paths)
+        nbytes = 0
+        for name in names:
+            array = arrays.get(name)
+            if array is None:
+                continue
+            array = np.ascontiguousarray(array)
+            # Write to a temporary file and rename, so other processes never read a partial file
+            tmp_path = self._path(key, name) + '.{}.tmp'.format(os.getpid())
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, self._path(key, name))
+            nbytes += array.nbytes
+        with self._lock:
+            self._lru[key] = nbytes
+            self._total_bytes += nbytes
+            self._evict()
+        return arrays
+
+    def preload(self, samples, decode_fn, num_workers=4):
+        """
+        Decode and store the samples in a thread pool, stopping when the store reaches `max_bytes`.
+
+        Args:
+            samples (list): The file paths of every sample, e.g. `dataset.file_list`.
+            decode_fn (callable): See `get`.
+            num_workers (int, optional): The number of decoding threads. Default: 4.
+        """
+        with self._lock:
+            if self._lru is None:
+                self._scan()
+        start = time.time()
+        todo = [s for s in samples if self.sample_key(s) not in self._lru]
+        done = 0
+        with ThreadPoolExecutor(max_workers=max(1, num_workers)) as pool:
+            for i in range(0, len(todo), num_workers * 4):
+                if self.max_bytes is not None and self._total_bytes >= self.max_bytes:
+                    logger.warning(
+                        'The sample cache is full ({} bytes), {} samples are not preloaded.'.
+                        format(self._total_bytes, len(todo) - done))
+                    break
+                chunk = todo[i:i + num_workers * 4]
+                list(pool.map(lambda s: self.get(s, decode_fn), chunk))
+                done += len(chunk)
+        logger.info(
+            'Preloaded {} samples into {} in {:.1f}s, {} samples cached before.'.
+            format(done, self.cache_dir,
+                   time.time() - start, len(samples) - len(todo)))
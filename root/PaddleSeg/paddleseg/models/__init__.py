@@ -12,67 +12,71 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from .backbones import *
-from .losses import *
+# The submodules are imported on first attribute access, see `manager.lazy_package`.
+from paddleseg.cvlibs.manager import lazy_package
 
-from .ann import *
-from .bisenet import *
-from .danet import *
-from .deeplab import *
-from .fast_scnn import *
-from .fcn import *
-from .gcnet import *
-from .ocrnet import *
-from .pspnet import *
-from .gscnn import GSCNN
-from .unet import UNet
-from .hardnet import HarDNet
-from .u2net import U2Net, U2Netp
-from .attention_unet import AttentionUNet
-from .unet_plusplus import UNetPlusPlus
-from .unet_3plus import UNet3Plus
-from .decoupled_segnet import DecoupledSegNet
-from .emanet import *
-from .isanet import *
-from .dnlnet import *
-from .setr import *
-from .sfnet import *
-from .pphumanseg_lite import *
-from .seaformer_seg import SeaFormerSeg
-from .mla_transformer import MLATransformer
-from .portraitnet import PortraitNet
-from .stdcseg import STDCSeg
-from .segformer import SegFormer
-from .pointrend import PointRend
-from .ginet import GINet
-from .segmenter import *
-from .segnet import SegNet
-from .encnet import ENCNet
-from .hrnet_contrast import HRNetW48Contrast
-from .espnet import ESPNetV2
-from .pp_liteseg import PPLiteSeg
-from .dmnet import DMNet
-from .espnetv1 import ESPNetV1
-from .enet import ENet
-from .bisenetv1 import BiseNetV1
-from .fastfcn import FastFCN
-from .pfpnnet import PFPNNet
-from .glore import GloRe
-from .ddrnet import DDRNet_23
-from .ccnet import CCNet
-from .mobileseg import MobileSeg
-from .upernet import UPerNet
-from .upernet_cae import UPerNetCAE
-from .sinet import SINet
-from .lraspp import LRASPP
-from .mscale_ocrnet import MscaleOCRNet
-from .topformer import TopFormer
-from .rtformer import RTFormer
-from .upernet_vit_adapter import UPerNetViTAdapter
-from .lpsnet import LPSNet
-from .efficientformerv2_seg import EfficientFormerSeg
-from .maskformer import MaskFormer
-from .segnext import SegNeXt
-from .knet import KNet
-from .pp_mobileseg import PPMobileSeg
-from .pidnet import PIDNet
+__getattr__, __dir__ = lazy_package(__name__, [
+    'backbones',
+    'losses',
+    'ann',
+    'bisenet',
+    'danet',
+    'deeplab',
+    'fast_scnn',
+    'fcn',
+    'gcnet',
+    'ocrnet',
+    'pspnet',
+    ('gscnn', ['GSCNN']),
+    ('unet', ['UNet']),
+    ('hardnet', ['HarDNet']),
+    ('u2net', ['U2Net', 'U2Netp']),
+    ('attention_unet', ['AttentionUNet']),
+    ('unet_plusplus', ['UNetPlusPlus']),
+    ('unet_3plus', ['UNet3Plus']),
+    ('decoupled_segnet', ['DecoupledSegNet']),
+    'emanet',
+    'isanet',
+    'dnlnet',
+    'setr',
+    'sfnet',
+    'pphumanseg_lite',
+    ('seaformer_seg', ['SeaFormerSeg']),
+    ('mla_transformer', ['MLATransformer']),
+    ('portraitnet', ['PortraitNet']),
+    ('stdcseg', ['STDCSeg']),
+    ('segformer', ['SegFormer']),
+    ('pointrend', ['PointRend']),
+    ('ginet', ['GINet']),
+    'segmenter',
+    ('segnet', ['SegNet']),
+    ('encnet', ['ENCNet']),
+    ('hrnet_contrast', ['HRNetW48Contrast']),
+    ('espnet', ['ESPNetV2']),
+    ('pp_liteseg', ['PPLiteSeg']),
+    ('dmnet', ['DMNet']),
+    ('espnetv1', ['ESPNetV1']),
+    ('enet', ['ENet']),
+    ('bisenetv1', ['BiseNetV1']),
+    ('fastfcn', ['FastFCN']),
+    ('pfpnnet', ['PFPNNet']),
+    ('glore', ['GloRe']),
+    ('ddrnet', ['DDRNet_23']),
+    ('ccnet', ['CCNet']),
+    ('mobileseg', ['MobileSeg']),
+    ('upernet', ['UPerNet']),
+    ('upernet_cae', ['UPerNetCAE']),
+    ('sinet', ['SINet']),
+    ('lraspp', ['LRASPP']),
+    ('mscale_ocrnet', ['MscaleOCRNet']),
+    ('topformer', ['TopFormer']),
+    ('rtformer', ['RTFormer']),
+    ('upernet_vit_adapter', ['UPerNetViTAdapter']),
+    ('lpsnet', ['LPSNet']),
+    ('efficientformerv2_seg', ['EfficientFormerSeg']),
+    ('maskformer', ['MaskFormer']),
+    ('segnext', ['SegNeXt']),
+    ('knet', ['KNet']),
+    ('pp_mobileseg', ['PPMobileSeg']),
+    ('pidnet', ['PIDNet']),
+])
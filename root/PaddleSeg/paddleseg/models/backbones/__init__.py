@@ -12,25 +12,30 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from .hrnet import *
-from .resnet_vd import *
-from .xception_deeplab import *
-from .mobilenetv3 import *
-from .vision_transformer import *
-from .swin_transformer import *
-from .mobilenetv2 import *
-from .mix_transformer import *
-from .stdcnet import *
-from .lite_hrnet import *
-from .shufflenetv2 import *
-from .ghostnet import *
-from .cae import *
-from .top_transformer import *
-from .uhrnet import *
-from .efficientformerv2 import *
-from .hrformer import *
-from .strideformer import *
-from .vit_adapter import *
-from .mscan import *
-from .seaformer import *
-from .pidnet import *
+# The submodules are imported on first attribute access, see `manager.lazy_package`.
+from paddleseg.cvlibs.manager import lazy_package
+
+__getattr__, __dir__ = lazy_package(__name__, [
+    'hrnet',
+    'resnet_vd',
+    'xception_deeplab',
+    'mobilenetv3',
+    'vision_transformer',
+    'swin_transformer',
+    'mobilenetv2',
+    'mix_transformer',
+    'stdcnet',
+    'lite_hrnet',
+    'shufflenetv2',
+    'ghostnet',
+    'cae',
+    'top_transformer',
+    'uhrnet',
+    'efficientformerv2',
+    'hrformer',
+    'strideformer',
+    'vit_adapter',
+    'mscan',
+    'seaformer',
+    'pidnet',
+])
@@ -12,26 +12,31 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from .mixed_loss import MixedLoss
-from .cross_entropy_loss import CrossEntropyLoss
-from .cross_entropy_loss import DistillCrossEntropyLoss
-from .binary_cross_entropy_loss import BCELoss
-from .lovasz_loss import LovaszSoftmaxLoss, LovaszHingeLoss
-from .gscnn_dual_task_loss import DualTaskLoss
-from .edge_attention_loss import EdgeAttentionLoss
-from .bootstrapped_cross_entropy import BootstrappedCrossEntropyLoss
-from .dice_loss import DiceLoss
-from .ohem_cross_entropy_loss import OhemCrossEntropyLoss
-from .decoupledsegnet_relax_boundary_loss import RelaxBoundaryLoss
-from .ohem_edge_attention_loss import OhemEdgeAttentionLoss
-from .l1_loss import L1Loss
-from .mean_square_error_loss import MSELoss
-from .focal_loss import FocalLoss
-from .kl_loss import KLLoss
-from .rmi_loss import RMILoss
-from .detail_aggregate_loss import DetailAggregateLoss
-from .point_cross_entropy_loss import PointCrossEntropyLoss
-from .pixel_contrast_cross_entropy_loss import PixelContrastCrossEntropyLoss
-from .semantic_encode_cross_entropy_loss import SECrossEntropyLoss
-from .semantic_connectivity_loss import SemanticConnectivityLoss
-from .maskformer_loss import MaskFormerLoss
+# The submodules are imported on first attribute access, see `manager.lazy_package`.
+from paddleseg.cvlibs.manager import lazy_package
+
+__getattr__, __dir__ = lazy_package(__name__, [
+    ('mixed_loss', ['MixedLoss']),
+    ('cross_entropy_loss', ['CrossEntropyLoss']),
+    ('cross_entropy_loss', ['DistillCrossEntropyLoss']),
+    ('binary_cross_entropy_loss', ['BCELoss']),
+    ('lovasz_loss', ['LovaszSoftmaxLoss', 'LovaszHingeLoss']),
+    ('gscnn_dual_task_loss', ['DualTaskLoss']),
+    ('edge_attention_loss', ['EdgeAttentionLoss']),
+    ('bootstrapped_cross_entropy', ['BootstrappedCrossEntropyLoss']),
+    ('dice_loss', ['DiceLoss']),
+    ('ohem_cross_entropy_loss', ['OhemCrossEntropyLoss']),
+    ('decoupledsegnet_relax_boundary_loss', ['RelaxBoundaryLoss']),
+    ('ohem_edge_attention_loss', ['OhemEdgeAttentionLoss']),
+    ('l1_loss', ['L1Loss']),
+    ('mean_square_error_loss', ['MSELoss']),
+    ('focal_loss', ['FocalLoss']),
+    ('kl_loss', ['KLLoss']),
+    ('rmi_loss', ['RMILoss']),
+    ('detail_aggregate_loss', ['DetailAggregateLoss']),
+    ('point_cross_entropy_loss', ['PointCrossEntropyLoss']),
+    ('pixel_contrast_cross_entropy_loss', ['PixelContrastCrossEntropyLoss']),
+    ('semantic_encode_cross_entropy_loss', ['SECrossEntropyLoss']),
+    ('semantic_connectivity_loss', ['SemanticConnectivityLoss']),
+    ('maskformer_loss', ['MaskFormerLoss']),
+])
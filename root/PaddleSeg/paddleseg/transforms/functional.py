@@ -32,9 +32,16 @@ def rescale_size(img_size, target_size):
 
 
 def normalize(im, mean, std):
-    im = im.astype(np.float32, copy=False) / 255.0
-    im -= mean
-    im /= std
+    # (im / 255 - mean) / std as one conversion and one multiply-add
+    std = np.asarray(std, dtype=np.float32)
+    scale = 1.0 / (std * 255.0)
+    offset = -np.asarray(mean, dtype=np.float32) / std
+    if im.dtype == np.float32:
+        im = im * scale
+    else:
+        im = im.astype(np.float32)
+        im *= scale
+    im += offset
     return im
 
 
@@ -125,6 +132,110 @@ def rotate(im, rotate_lower, rotate_upper):
     return im
 
 
+# The following photometric ops work on uint8 arrays (RGB, or gray for 2-dim arrays) with
+# look-up tables and OpenCV, giving the results of the PIL ImageEnhance ops above without
+# converting the image to a PIL Image.
+
+
+def _blend_lut(degenerate, factor):
+    lut = np.arange(256, dtype=np.float32)
+    lut = degenerate + factor * (lut - degenerate)
+    return np.clip(lut + 0.5, 0, 255).astype(np.uint8)
+
+
+def _gray(im):
+    if im.ndim == 2:
+        return im
+    return cv2.cvtColor(im, cv2.COLOR_RGB2GRAY)
+
+
+def adjust_brightness(im, factor):
+    """
+    Adjust the brightness of an image, as `ImageEnhance.Brightness`.
+
+    Args:
+        im (np.ndarray): The uint8 image with shape (H, W, C) or (H, W).
+        factor (float): 0 gives a black image and 1 gives the original image.
+
+    Returns:
+        np.ndarray: The adjusted uint8 image.
+    """
+    return cv2.LUT(im, _blend_lut(0., factor))
+
+
+def adjust_contrast(im, factor):
+    """
+    Adjust the contrast of an image, as `ImageEnhance.Contrast`.
+
+    Args:
+        im (np.ndarray): The uint8 image with shape (H, W, C) or (H, W).
+        factor (float): 0 gives a solid gray image of the mean gray value and 1 gives the original image.
+
+    Returns:
+        np.ndarray: The adjusted uint8 image.
+    """
+    mean = int(cv2.mean(_gray(im))[0] + 0.5)
+    return cv2.LUT(im, _blend_lut(float(mean), factor))
+
+
+def adjust_saturation(im, factor):
+    """
+    Adjust the color saturation of an image, as `ImageEnhance.Color`.
+
+    Args:
+        im (np.ndarray): The uint8 RGB image with shape (H, W, 3). Gray images are returned unchanged.
+        factor (float): 0 gives a gray image and 1 gives the original image.
+
+    Returns:
+        np.ndarray: The adjusted uint8 image.
+    """
+    if im.ndim == 2 or im.shape[2] != 3:
+        return im
+    gray = cv2.cvtColor(_gray(im), cv2.COLOR_GRAY2RGB)
+    return cv2.addWeighted(im, factor, gray, 1.0 - factor, 0)
+
+
+def adjust_hue(im, delta):
+    """
+    Shift the hue of an image, as the hue channel of PIL "HSV" mode.
+
+    Args:
+        im (np.ndarray): The uint8 RGB image with shape (H, W, 3). Gray images are returned unchanged.
+        delta (float): The shift of hue, where 256 is a full turn.
+
+    Returns:
+        np.ndarray: The adjusted uint8 image.
+    """
+    if im.ndim == 2 or im.shape[2] != 3:
+        return im
+    hsv = cv2.cvtColor(im, cv2.COLOR_RGB2HSV_FULL)
+    lut = (np.floor(np.arange(256) + delta) % 256).astype(np.uint8)
+    hsv[..., 0] = cv2.LUT(hsv[..., 0], lut)
+    return cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB_FULL)
+
+
+def adjust_sharpness(im, factor):
+    """
+    Adjust the sharpness of an image, as `ImageEnhance.Sharpness`.
+
+    Args:
+        im (np.ndarray): The uint8 image with shape (H, W, C) or (H, W).
+        factor (float): 0 gives a smoothed image and 1 gives the original image.
+
+    Returns:
+        np.ndarray: The adjusted uint8 image.
+    """
+    kernel = np.array(
+        [[1, 1, 1], [1, 5, 1], [1, 1, 1]], dtype=np.float32) / 13.0
+    degenerate = cv2.filter2D(im, -1, kernel)
+    # PIL keeps the border pixels of the smoothed image
+    degenerate[0, :] = im[0, :]
+    degenerate[-1, :] = im[-1, :]
+    degenerate[:, 0] = im[:, 0]
+    degenerate[:, -1] = im[:, -1]
+    return cv2.addWeighted(im, factor, degenerate, 1.0 - factor, 0)
+
+
 def mask_to_onehot(mask, num_classes):
     """
     Convert a mask (H, W) to onehot (K, H, W).
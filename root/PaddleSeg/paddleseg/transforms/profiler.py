@@ -0,0 +1,263 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Opt-in profiling of the operations in `Compose`.
+
+`enable(save_dir)` sets an environment variable, so DataLoader workers started afterwards,
+forked or spawned, profile as well. Every process records the wall time, the image shapes
+and the bytes of newly allocated arrays of every op, and dumps them to
+`save_dir/transforms_<pid>.json` every `DUMP_INTERVAL` samples or `DUMP_SECONDS` seconds,
+and when the process exits. DataLoader workers leave through `os._exit`, which skips `atexit`,
+so the last dump of a worker is registered with `multiprocessing.util.Finalize`, which runs
+when a worker returns normally. `summary()` merges the files of all processes into one table.
+
+Workers only profile if the profiling is enabled before they start, i.e. before iterating
+the DataLoader.
+
+Examples:
+
+    from paddleseg.transforms import profiler
+    profiler.enable('./output/transforms_profile')
+    # build the DataLoader and iterate ...
+    profiler.summary()
+"""
+
+import os
+import glob
+import json
+import time
+import atexit
+import collections
+import multiprocessing.util
+
+import numpy as np
+
+from paddleseg.utils import logger
+
+ENV_KEY = 'PADDLESEG_TRANSFORMS_PROFILE'
+# The number of samples between two dumps of a process
+DUMP_INTERVAL = 50
+# The seconds between two dumps of a process, for persistent DataLoader workers
+DUMP_SECONDS = 5.
+# The number of most common shapes kept for every op
+TOP_SHAPES = 3
+
+_stats = None
+_num_samples = 0
+_last_dump = 0.
+
+
+def _reset():
+    global _stats, _num_samples, _last_dump
+    _stats = None
+    _num_samples = 0
+    _last_dump = 0.
+
+
+if hasattr(os, 'register_at_fork'):
+    # A forked worker must not report the samples of its parent as its own
+    os.register_at_fork(after_in_child=_reset)
+
+
+def enable(save_dir):
+    """
+    Enable the profiling in this process and the processes started afterwards.
+
+    Args:
+        save_dir (str): The directory of the statistics. Old statistics in it are removed.
+    """
+    os.makedirs(save_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(save_dir, 'transforms_*.json')):
+        os.remove(path)
+    os.environ[ENV_KEY] = os.path.abspath(save_dir)
+
+
+def disable():
+    """Disable the profiling in this process and the processes started afterwards."""
+    os.environ.pop(ENV_KEY, None)
+
+
+def save_dir():
+    """str: The directory of the statistics if the profiling is enabled, otherwise None."""
+    return os.environ.get(ENV_KEY) or None
+
+
+def _describe(array):
+    if not isinstance(array, np.ndarray):
+        return type(array).__name__
+    return '{}{}'.format(array.dtype, list(array.shape))
+
+
+def _arrays(data):
+    keys = ['img'] + list(data.get('gt_fields', []))
+    return [data[k] for k in keys if isinstance(data.get(k), np.ndarray)]
+
+
+def _new_bytes(before, after):
+    """The bytes of arrays in `after` which share no memory with any array in `before`."""
+    nbytes = 0
+    for array in after:
+        if not any(array is b or np.may_share_memory(array, b) for b in before):
+            nbytes += array.nbytes
+    return nbytes
+
+
+def _record(name, cost, in_desc, out_desc, nbytes):
+    global _stats, _last_dump
+    if _stats is None:
+        _stats = collections.OrderedDict()
+        _last_dump = time.time()
+        atexit.register(dump)
+        multiprocessing.util.Finalize(None, dump, exitpriority=100)
+    item = _stats.setdefault(
+        name, {
+            'calls': 0,
+            'time': 0.,
+            'max_time': 0.,
+            'bytes': 0,
+            'shapes': collections.Counter()
+        })
+    item['calls'] += 1
+    item['time'] += cost
+    item['max_time'] = max(item['max_time'], cost)
+    item['bytes'] += nbytes
+    item['shapes']['{} -> {}'.format(in_desc, out_desc)] += 1
+
+
+def run_op(name, op, data):
+    """
+    Run an op of `Compose` and record its statistics.
+
+    Args:
+        name (str): The name of the op in the table.
+        op (callable): The op, which takes and returns the data dict.
+        data (dict): The data dict.
+
+    Returns:
+        dict: The data dict returned by `op`.
+    """
+    before = _arrays(data)
+    in_desc = _describe(data.get('img'))
+    start = time.perf_counter()
+    data = op(data)
+    cost = time.perf_counter() - start
+    _record(name, cost, in_desc, _describe(data.get('img')),
+            _new_bytes(before, _arrays(data)))
+    return data
+
+
+def step():
+    """
+    Mark the end of a sample, dumping the statistics every `DUMP_INTERVAL` samples or
+    `DUMP_SECONDS` seconds.
+    """
+    global _num_samples
+    _num_samples += 1
+    if _num_samples % DUMP_INTERVAL == 0 or \
+            time.time() - _last_dump >= DUMP_SECONDS:
+        dump()
+
+
+def dump():
+    """Save the statistics of this process to `save_dir()`."""
+    global _last_dump
+    _last_dump = time.time()
+    directory = save_dir()
+    if directory is None or not _stats:
+        return
+    stats = collections.OrderedDict()
+    for name, item in _stats.items():
+        stats[name] = dict(item)
+        stats[name]['shapes'] = dict(item['shapes'].most_common(TOP_SHAPES))
+    path = os.path.join(directory, 'transforms_{}.json'.format(os.getpid()))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'samples': _num_samples, 'ops': stats}, f)
+    os.replace(tmp_path, path)
+
+
+def summary(directory=None, save_path=None):
+    """
+    Merge the statistics of all processes, log them as a table and save them as JSON.
+
+    Args:
+        directory (str, optional): The directory of the statistics. Default: None, use `save_dir()`.
+        save_path (str, optional): The path of the merged JSON. Default: None, `summary.json`
+            in the directory.
+
+    Returns:
+        dict: {'samples': number of samples, 'processes': number of processes,
+            'ops': {op name: {'calls', 'time', 'avg_ms', 'max_ms', 'ratio', 'bytes', 'avg_mb', 'shapes'}}}.
+    """
+    directory = directory or save_dir()
+    if directory is None:
+        raise ValueError(
+            'The transforms profiling is not enabled, please set `directory`.')
+    dump()
+    samples, processes = 0, 0
+    ops = collections.OrderedDict()
+    for path in sorted(glob.glob(os.path.join(directory, 'transforms_*.json'))):
+        try:
+            with open(path, 'r') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            continue
+        samples += result['samples']
+        processes += 1
+        for name, item in result['ops'].items():
+            merged = ops.setdefault(
+                name, {
+                    'calls': 0,
+                    'time': 0.,
+                    'max_time': 0.,
+                    'bytes': 0,
+                    'shapes': collections.Counter()
+                })
+            merged['calls'] += item['calls']
+            merged['time'] += item['time']
+            merged['max_time'] = max(merged['max_time'], item['max_time'])
+            merged['bytes'] += item['bytes']
+            merged['shapes'].update(item['shapes'])
+
+    total_time = sum(item['time'] for item in ops.values()) or 1.
+    for item in ops.values():
+        calls = max(item['calls'], 1)
+        item['avg_ms'] = item['time'] / calls * 1000
+        item['max_ms'] = item.pop('max_time') * 1000
+        item['ratio'] = item['time'] / total_time
+        item['avg_mb'] = item['bytes'] / calls / 1024**2
+        item['shapes'] = dict(item['shapes'].most_common(TOP_SHAPES))
+    result = {'samples': samples, 'processes': processes, 'ops': ops}
+
+    lines = [
+        'Transforms profile of {} samples in {} processes:'.format(
+            samples, processes),
+        '{:<28} {:>8} {:>10} {:>10} {:>8} {:>10}  {}'.format(
+            'op', 'calls', 'avg (ms)', 'max (ms)', 'ratio', 'alloc (MB)',
+            'shape')
+    ]
+    for name, item in sorted(ops.items(),
+                             key=lambda kv: kv[1]['time'],
+                             reverse=True):
+        shape = next(iter(item['shapes']), '')
+        lines.append(
+            '{:<28} {:>8} {:>10.2f} {:>10.2f} {:>7.1%} {:>10.2f}  {}'.format(
+                name, item['calls'], item['avg_ms'], item['max_ms'],
+                item['ratio'], item['avg_mb'], shape))
+    logger.info('\n'.join(lines))
+
+    save_path = save_path or os.path.join(directory, 'summary.json')
+    with open(save_path, 'w') as f:
+        json.dump(result, f, indent=2)
+    return result
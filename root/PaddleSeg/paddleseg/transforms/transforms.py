@@ -20,7 +20,7 @@ import numpy as np
 from PIL import Image
 
 from paddleseg.cvlibs import manager
-from paddleseg.transforms import functional
+from paddleseg.transforms import functional, profiler
 from paddleseg.utils import logger
 
 
@@ -30,6 +30,15 @@ class Compose:
     Do transformation on input data with corresponding pre-processing and augmentation operations.
     The shape of input data to all operations is [height, width, channels].
 
+    Decoded images stay uint8 through the operations and are converted to float32 by `Normalize`,
+    or at the end if there is no `Normalize`. Geometric operations such as `Resize` and
+    `ResizeStepScaling` therefore interpolate uint8 values, so the outputs match a float32
+    pipeline only within uint8 rounding (up to 0.5 before normalization). Likewise, padding
+    values such as 127.5 are rounded to 128.
+
+    The time, shapes and allocated bytes of every operation are recorded when
+    `paddleseg.transforms.profiler` is enabled.
+
     Args:
         transforms (list): A list contains data pre-processing or augmentation. An empty list means only reading images, no transformation.
         to_rgb (bool, optional): If converting image to RGB color space. Default: True.
@@ -48,6 +57,24 @@ class Compose:
         self.img_channels = img_channels
         self.read_flag = cv2.IMREAD_GRAYSCALE if img_channels == 1 else cv2.IMREAD_COLOR
 
+    def read_image(self, path):
+        """Decode an image file to a uint8 array in BGR order, or gray if `img_channels` is 1."""
+        img = cv2.imread(path, self.read_flag)
+        if img is None:
+            raise ValueError('Can\'t read The image file {}!'.format(path))
+        return img
+
+    @staticmethod
+    def read_label(path, img_shape):
+        """Decode a label file. Multi-label files stacked vertically or horizontally are split to (h, w, c)."""
+        label = np.asarray(Image.open(path))
+        img_h, img_w = img_shape
+        if label.shape[0] != img_h:
+            label = label.reshape([-1, img_h, img_w]).transpose([1, 2, 0])
+        elif label.shape[1] != img_w:
+            label = label.reshape([img_h, -1, img_w]).transpose([0, 2, 1])
+        return label
+
     def __call__(self, data):
         """
         Args:
@@ -57,6 +84,30 @@ class Compose:
 
         Returns: A dict after process。
         """
+        profiling = profiler.save_dir() is not None
+        if profiling:
+            data = profiler.run_op('Compose.read', self._read, data)
+        else:
+            data = self._read(data)
+
+        for op in self.transforms:
+            if profiling:
+                data = profiler.run_op(type(op).__name__, op, data)
+            else:
+                data = op(data)
+
+        if data['img'].dtype != np.float32:
+            data['img'] = data['img'].astype('float32')
+        if data['img'].ndim == 2:
+            data['img'] = data['img'][..., np.newaxis]
+        data['img'] = np.transpose(data['img'], (2, 0, 1))
+        if 'label' in data and data['label'].ndim == 3:
+            data['label'] = np.transpose(data['label'], (2, 0, 1))
+        if profiling:
+            profiler.step()
+        return data
+
+    def _read(self, data):
         if 'img' not in data.keys():
             raise ValueError("`data` must include `img` key.")
         # data['img'] is numpy array in eg1800 and supervisely
@@ -64,10 +115,7 @@ class Compose:
             raise TypeError(
                 "Expect `data[img]` to be str or np.ndarray, but got NoneType.")
         elif isinstance(data['img'], str):
-            img = cv2.imread(data['img'], self.read_flag)
-            if img is None:
-                raise ValueError('Can\'t read The image file {}!'.format(data['img']))
-            data['img'] = img.astype('float32')
+            data['img'] = self.read_image(data['img'])
         if not isinstance(data['img'], np.ndarray):
             raise TypeError(
                 "Expect image to be np.ndarray, but got {}".format(type(data['img'])))
@@ -81,25 +129,11 @@ class Compose:
             data['img'] = cv2.cvtColor(data['img'], cv2.COLOR_BGR2RGB)
 
         if 'label' in data.keys() and isinstance(data['label'], str):
-            data['label'] = np.asarray(Image.open(data['label']))
-            img_h, img_w = data['img'].shape[:2]
-            if data['label'].shape[0] != img_h:
-                data['label'] = data['label'].reshape([-1, img_h, img_w]).transpose([1, 2, 0])
-            elif data['label'].shape[1] != img_w:
-                data['label'] = data['label'].reshape([img_h, -1, img_w]).transpose([0, 2, 1])
+            data['label'] = self.read_label(data['label'], data['img'].shape[:2])
 
         # the `trans_info` will save the process of image shape, and will be used in evaluation and prediction.
         if 'trans_info' not in data.keys():
             data['trans_info'] = []
-
-        for op in self.transforms:
-            data = op(data)
-
-        if data['img'].ndim == 2:
-            data['img'] = data['img'][..., np.newaxis]
-        data['img'] = np.transpose(data['img'], (2, 0, 1))
-        if 'label' in data and data['label'].ndim == 3:
-            data['label'] = np.transpose(data['label'], (2, 0, 1))
         return data
 
 
@@ -425,7 +459,7 @@ class ResizeStepScaling:
 @manager.TRANSFORMS.add_component
 class Normalize:
     """
-    Normalize an image.
+    Normalize an image. A uint8 image is converted to float32 in the same pass.
 
     Args:
         mean (list, optional): The mean value of a data set. Default: [0.5,].
@@ -821,10 +855,13 @@ class RandomNoise:
         if random.random() < self.prob:
             mu = 0
             sigma = random.random() * self.max_sigma
-            data['img'] = np.array(data['img'], dtype=np.float32)
-            data['img'] += np.random.normal(mu, sigma, data['img'].shape)
-            data['img'][data['img'] > 255] = 255
-            data['img'][data['img'] < 0] = 0
+            dtype = data['img'].dtype
+            img = np.array(data['img'], dtype=np.float32)
+            img += np.random.normal(mu, sigma, img.shape).astype(np.float32)
+            np.clip(img, 0, 255, out=img)
+            if dtype == np.uint8:
+                img = (img + 0.5).astype(np.uint8)
+            data['img'] = img
 
         return data
 
@@ -863,7 +900,7 @@ class RandomBlur:
                     radius = radius + 1
                 if radius > 9:
                     radius = 9
-                data['img'] = np.array(data['img'], dtype='uint8')
+                data['img'] = data['img'].astype('uint8', copy=False)
                 if self.blur_type == "gaussian":
                     data['img'] = cv2.GaussianBlur(data['img'],
                                                    (radius, radius), 0, 0)
@@ -883,7 +920,6 @@ class RandomBlur:
                 else:
                     data['img'] = cv2.GaussianBlur(data['img'],
                                                    (radius, radius), 0, 0)
-        data['img'] = np.array(data['img'], dtype='float32')
         return data
 
 
@@ -1050,50 +1086,33 @@ class RandomDistort:
         sharpness_lower = 1 - self.sharpness_range
         sharpness_upper = 1 + self.sharpness_range
         ops = [
-            functional.brightness, functional.contrast, functional.saturation,
-            functional.sharpness
+            functional.adjust_brightness, functional.adjust_contrast,
+            functional.adjust_saturation, functional.adjust_sharpness
         ]
         if data['img'].ndim > 2:
-            ops.append(functional.hue)
+            ops.append(functional.adjust_hue)
         random.shuffle(ops)
         params_dict = {
-            'brightness': {
-                'brightness_lower': brightness_lower,
-                'brightness_upper': brightness_upper
-            },
-            'contrast': {
-                'contrast_lower': contrast_lower,
-                'contrast_upper': contrast_upper
-            },
-            'saturation': {
-                'saturation_lower': saturation_lower,
-                'saturation_upper': saturation_upper
-            },
-            'hue': {
-                'hue_lower': hue_lower,
-                'hue_upper': hue_upper
-            },
-            'sharpness': {
-                'sharpness_lower': sharpness_lower,
-                'sharpness_upper': sharpness_upper,
-            }
+            'adjust_brightness': (brightness_lower, brightness_upper),
+            'adjust_contrast': (contrast_lower, contrast_upper),
+            'adjust_saturation': (saturation_lower, saturation_upper),
+            'adjust_hue': (hue_lower, hue_upper),
+            'adjust_sharpness': (sharpness_lower, sharpness_upper)
         }
         prob_dict = {
-            'brightness': self.brightness_prob,
-            'contrast': self.contrast_prob,
-            'saturation': self.saturation_prob,
-            'hue': self.hue_prob,
-            'sharpness': self.sharpness_prob
+            'adjust_brightness': self.brightness_prob,
+            'adjust_contrast': self.contrast_prob,
+            'adjust_saturation': self.saturation_prob,
+            'adjust_hue': self.hue_prob,
+            'adjust_sharpness': self.sharpness_prob
         }
-        data['img'] = data['img'].astype('uint8')
-        data['img'] = Image.fromarray(data['img'])
-        for id in range(len(ops)):
-            params = params_dict[ops[id].__name__]
-            prob = prob_dict[ops[id].__name__]
-            params['im'] = data['img']
+        # The ops work on uint8 arrays with look-up tables, without converting to PIL Image
+        data['img'] = data['img'].astype('uint8', copy=False)
+        for op in ops:
+            lower, upper = params_dict[op.__name__]
+            prob = prob_dict[op.__name__]
             if np.random.uniform(0, 1) < prob:
-                data['img'] = ops[id](**params)
-        data['img'] = np.asarray(data['img']).astype('float32')
+                data['img'] = op(data['img'], np.random.uniform(lower, upper))
         return data
 
 
@@ -19,4 +19,5 @@ from .env import seg_env, get_sys_env
 from .utils import *
 from .timer import TimeAverager, calculate_eta
 from . import visualize
+from .manifest import scan_images
 from .ema import *
@@ -0,0 +1,144 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from paddleseg.utils import logger
+
+VALID_SUFFIX = [
+    '.JPEG', '.jpeg', '.JPG', '.jpg', '.BMP', '.bmp', '.PNG', '.png'
+]
+MANIFEST_VERSION = 1
+
+
+def _scan_dir(path, cached, stat_files):
+    """
+    List the images and sub directories of a directory.
+
+    The listing in `cached` is reused if the modification time of the directory, which changes
+    when entries are added, removed or renamed, is unchanged.
+    """
+    mtime_ns = os.stat(path).st_mtime_ns
+    if cached is not None and cached['mtime_ns'] == mtime_ns:
+        if not stat_files:
+            return cached, True
+        files = {}
+        for name in cached['files']:
+            try:
+                stat = os.stat(os.path.join(path, name))
+            except FileNotFoundError:
+                continue
+            files[name] = [stat.st_size, stat.st_mtime_ns]
+        return dict(cached, files=files), True
+
+    files, subdirs = {}, []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name != '.ipynb_checkpoints':
+                    subdirs.append(entry.name)
+            elif entry.name.startswith('.') or entry.is_dir():
+                # Like os.walk, symlinked directories are not descended
+                continue
+            elif os.path.splitext(entry.name)[-1] in VALID_SUFFIX:
+                stat = entry.stat()
+                files[entry.name] = [stat.st_size, stat.st_mtime_ns]
+    return {
+        'mtime_ns': mtime_ns,
+        'files': files,
+        'subdirs': sorted(subdirs)
+    }, False
+
+
+def scan_images(image_dir, manifest_path=None, num_workers=8,
+                stat_files=False):
+    """
+    Find the images in a directory tree with `os.scandir` in a thread pool.
+
+    If `manifest_path` is given, the listing of every directory is cached in it with the size and
+    the modification time of the images. In later calls a directory whose modification time is
+    unchanged is not listed again, so only one `stat` per directory is needed for an unchanged
+    tree, which matters on network drives.
+
+    Args:
+        image_dir (str): The root directory.
+        manifest_path (str, optional): The path of the JSON manifest. Default: None, no cache.
+        num_workers (int, optional): The number of threads listing directories. Default: 8.
+        stat_files (bool, optional): Whether to stat the images of unchanged directories again,
+            to find images overwritten in place. Default: False.
+
+    Returns:
+        collections.OrderedDict: {image path: (size, modification time in ns)}, sorted by path.
+    """
+    root = os.path.abspath(image_dir)
+    cached_dirs = {}
+    if manifest_path and os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION and \
+                    manifest.get('root') == root:
+                cached_dirs = manifest['dirs']
+        except ValueError:
+            logger.warning('The manifest {} is broken and rebuilt.'.format(
+                manifest_path))
+
+    dirs = {}
+    num_reused = 0
+    with ThreadPoolExecutor(max_workers=max(1, num_workers)) as pool:
+        pending = {
+            pool.submit(_scan_dir, root, cached_dirs.get(''), stat_files): ''
+        }
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                rel_dir = pending.pop(future)
+                try:
+                    item, reused = future.result()
+                except FileNotFoundError:
+                    # Removed during the scan
+                    continue
+                dirs[rel_dir] = item
+                num_reused += reused
+                for name in item['subdirs']:
+                    sub = os.path.join(rel_dir, name) if rel_dir else name
+                    pending[pool.submit(
+                        _scan_dir,
+                        os.path.join(root, sub),
+                        cached_dirs.get(sub), stat_files)] = sub
+
+    if manifest_path:
+        manifest_dir = os.path.dirname(manifest_path)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'root': root,
+                'dirs': dirs
+            }, f)
+        os.replace(tmp_path, manifest_path)
+
+    images = []
+    for rel_dir, item in dirs.items():
+        directory = os.path.join(image_dir, rel_dir) if rel_dir else image_dir
+        for name, (size, mtime_ns) in item['files'].items():
+            images.append((os.path.join(directory, name), (size, mtime_ns)))
+    logger.info('Scanned {} directories ({} unchanged), found {} images.'.
+                 format(len(dirs), num_reused, len(images)))
+    return collections.OrderedDict(sorted(images))
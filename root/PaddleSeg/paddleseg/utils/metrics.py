@@ -67,6 +67,142 @@ def calculate_area(pred, label, num_classes, ignore_index=255, use_multilabel=Fa
     return intersect_area, pred_area, label_area
 
 
+def calculate_confusion_matrix(pred, label, num_classes, ignore_index=255):
+    """
+    Calculate the confusion matrix with a single bincount.
+
+    Args:
+        pred (Tensor): The prediction by model.
+        label (Tensor): The ground truth of image.
+        num_classes (int): The unique number of target classes.
+        ignore_index (int): Specifies a target value that is ignored. Default: 255.
+
+    Returns:
+        Tensor: The confusion matrix with shape (num_classes + 1, num_classes). The element (i, j)
+            is the number of pixels of label i predicted as class j. The last row counts the
+            pixels whose label is out of [0, num_classes) but not `ignore_index`, which are
+            included in the prediction area as `calculate_area` does.
+    """
+    if len(pred.shape) == 4:
+        pred = paddle.squeeze(pred, axis=1)
+    if len(label.shape) == 4:
+        label = paddle.squeeze(label, axis=1)
+    if not pred.shape == label.shape:
+        raise ValueError('Shape of `pred` and `label should be equal, '
+                         'but there are {} and {}.'.format(pred.shape,
+                                                           label.shape))
+    mask = label != ignore_index
+    pred = paddle.masked_select(pred, mask).astype('int64')
+    label = paddle.masked_select(label, mask).astype('int64')
+    valid = paddle.logical_and(pred >= 0, pred < num_classes)
+    pred = paddle.masked_select(pred, valid)
+    label = paddle.masked_select(label, valid)
+    label = paddle.where(
+        paddle.logical_and(label >= 0, label < num_classes), label,
+        paddle.full_like(label, num_classes))
+    index = label * num_classes + pred
+    matrix = paddle.bincount(index, minlength=(num_classes + 1) * num_classes)
+    return matrix.astype('int64').reshape([num_classes + 1, num_classes])
+
+
+class ConfusionMatrix(object):
+    """
+    Accumulate the confusion matrix of a dataset.
+
+    The confusion matrix of each batch is computed by one `bincount`, and a single tensor is
+    all-reduced across ranks. In multilabel mode, the intersect, prediction and label areas of
+    every class are accumulated instead.
+
+    Args:
+        num_classes (int): The unique number of target classes.
+        ignore_index (int): Specifies a target value that is ignored. Default: 255.
+        use_multilabel (bool, optional): Whether to enable multilabel mode. Default: False.
+    """
+
+    def __init__(self, num_classes, ignore_index=255, use_multilabel=False):
+        self.num_classes = num_classes
+        self.ignore_index = ignore_index
+        self.use_multilabel = use_multilabel
+        if use_multilabel:
+            self._data = paddle.zeros([3, num_classes], dtype='int64')
+        else:
+            self._data = paddle.zeros(
+                [num_classes + 1, num_classes], dtype='int64')
+
+    def update(self, pred, label):
+        if self.use_multilabel:
+            self._data += paddle.stack(
+                list(calculate_area(
+                    pred,
+                    label,
+                    self.num_classes,
+                    ignore_index=self.ignore_index,
+                    use_multilabel=True)))
+        else:
+            self._data += calculate_confusion_matrix(
+                pred, label, self.num_classes, ignore_index=self.ignore_index)
+
+    def all_reduce(self):
+        """Sum the accumulated tensor of all ranks."""
+        if paddle.distributed.get_world_size() > 1:
+            paddle.distributed.all_reduce(self._data)
+
+    @property
+    def matrix(self):
+        """np.ndarray: The confusion matrix with shape (num_classes, num_classes)."""
+        if self.use_multilabel:
+            raise RuntimeError(
+                'The confusion matrix is not available in multilabel mode.')
+        return self._data.numpy()[:self.num_classes]
+
+    def areas(self):
+        """
+        Returns:
+            Tensor: The intersection area of prediction and the ground on all class.
+            Tensor: The prediction area on all class.
+            Tensor: The ground truth area on all class
+        """
+        if self.use_multilabel:
+            return self._data[0], self._data[1], self._data[2]
+        data = self._data.numpy()
+        matrix = data[:self.num_classes]
+        intersect_area = np.diag(matrix)
+        pred_area = data.sum(axis=0)
+        label_area = matrix.sum(axis=1)
+        return (paddle.to_tensor(intersect_area), paddle.to_tensor(pred_area),
+                paddle.to_tensor(label_area))
+
+    def class_accuracy(self):
+        """np.ndarray: The pixel accuracy of every class, i.e. the recall of every class."""
+        intersect_area, _, label_area = [a.numpy() for a in self.areas()]
+        return np.where(label_area == 0, 0.,
+                        intersect_area / np.maximum(label_area, 1))
+
+    def summary(self):
+        """
+        Derive all the metrics from the accumulated areas.
+
+        Returns:
+            dict: mIoU, class IoU, accuracy, class precision, class recall, class accuracy,
+                kappa, Dice and class Dice.
+        """
+        areas = self.areas()
+        class_iou, miou = mean_iou(*areas)
+        acc, class_precision, class_recall = class_measurement(*areas)
+        class_dice, mdice = dice(*areas)
+        return {
+            'miou': miou,
+            'class_iou': class_iou,
+            'acc': acc,
+            'class_precision': class_precision,
+            'class_recall': class_recall,
+            'class_accuracy': self.class_accuracy(),
+            'kappa': kappa(*areas),
+            'mdice': mdice,
+            'class_dice': class_dice
+        }
+
+
 def auc_roc(logits, label, num_classes, ignore_index=None):
     """
     Calculate area under the roc curve
@@ -113,6 +249,81 @@ def auc_roc(logits, label, num_classes, ignore_index=None):
     return auc
 
 
+class StreamingAUC(object):
+    """
+    Streaming area under the roc curve.
+
+    The softmax scores of every class are accumulated into fixed-bin histograms of positive
+    and negative pixels, which takes O(num_classes * bins) memory no matter how many images
+    are evaluated. The AUC is computed from the histograms treating scores in the same bin as
+    ties, so it differs from `sklearn.metrics.roc_auc_score` only by the pairs of positive and
+    negative pixels falling into the same bin. With the default 1000 bins the difference is
+    usually below 1e-3.
+
+    For 2 classes the AUC of class 1 is returned, as `auc_roc` does. Otherwise the macro
+    average of the one-vs-rest AUC of every class is returned, which is the `multi_class='ovr'`
+    result of sklearn.
+
+    Args:
+        num_classes (int): The unique number of target classes.
+        bins (int, optional): The number of histogram bins on [0, 1]. Default: 1000.
+        ignore_index (int, optional): Specifies a target value that is ignored. Default: 255.
+    """
+
+    def __init__(self, num_classes, bins=1000, ignore_index=255):
+        self.num_classes = num_classes
+        self.bins = bins
+        self.ignore_index = ignore_index
+        self._hist = paddle.zeros([num_classes * 2 * bins], dtype='int64')
+
+    def update(self, probs, label):
+        """
+        Args:
+            probs (Tensor): The softmax scores with shape (N, C, H, W).
+            label (Tensor): The ground truth with shape (N, 1, H, W) or (N, H, W).
+        """
+        if len(label.shape) == 4:
+            label = paddle.squeeze(label, axis=1)
+        num_classes, bins = self.num_classes, self.bins
+        probs = probs.astype('float32').transpose([1, 0, 2, 3]).reshape(
+            [num_classes, -1])
+        label = label.astype('int64').reshape([1, -1])
+        mask = paddle.expand(label != self.ignore_index, probs.shape)
+
+        bin_idx = paddle.clip(
+            paddle.floor(probs * bins), 0, bins - 1).astype('int64')
+        classes = paddle.arange(num_classes, dtype='int64').reshape([-1, 1])
+        is_pos = (label == classes).astype('int64')
+        index = (classes * 2 + is_pos) * bins + bin_idx
+        index = paddle.masked_select(index, mask)
+        self._hist += paddle.bincount(
+            index, minlength=num_classes * 2 * bins).astype('int64')
+
+    def all_reduce(self):
+        """Sum the histograms of all ranks."""
+        if paddle.distributed.get_world_size() > 1:
+            paddle.distributed.all_reduce(self._hist)
+
+    def class_auc(self):
+        """np.ndarray: The one-vs-rest AUC of every class, nan if the class has no positive or negative pixel."""
+        hist = self._hist.numpy().astype(np.float64).reshape(
+            [self.num_classes, 2, self.bins])
+        neg, pos = hist[:, 0], hist[:, 1]
+        # Positives with a higher score than each bin, plus half of the ties in the bin
+        pos_above = np.cumsum(pos[:, ::-1], axis=1)[:, ::-1] - pos
+        correct = np.sum(neg * (pos_above + 0.5 * pos), axis=1)
+        pairs = pos.sum(axis=1) * neg.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(pairs > 0, correct / pairs, np.nan)
+
+    def accumulate(self):
+        """float: The AUC of the accumulated histograms."""
+        class_auc = self.class_auc()
+        if self.num_classes == 2:
+            return float(class_auc[1])
+        return float(np.nanmean(class_auc))
+
+
 def mean_iou(intersect_area, pred_area, label_area):
     """
     Calculate iou.
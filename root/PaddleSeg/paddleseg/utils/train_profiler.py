@@ -12,9 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import sys
 import paddle.profiler as profiler
 
+from paddleseg.transforms import profiler as transforms_profiler
+from paddleseg.utils import logger
+
 # A global variable to record the number of calling times for profiler
 # functions. It is used to specify the tracing range of training steps.
 _profiler_step_id = 0
@@ -42,6 +46,10 @@ class ProfilerOptions(object):
       profile_path     - a string, the path to save the serialized profile data,
                          which can be used to generate a timeline.
       exit_on_finished - a boolean.
+      transforms_profile - a string, the directory to save the time, shapes and
+                         allocated bytes of every op in `transforms.Compose`,
+                         gathered from all DataLoader workers. A summary table
+                         is printed at the end of `batch_range`.
     '''
 
     def __init__(self, options_str):
@@ -54,7 +62,8 @@ class ProfilerOptions(object):
             'tracer_option': 'Default',
             'profile_path': '/tmp/profile',
             'exit_on_finished': True,
-            'timer_only': True
+            'timer_only': True,
+            'transforms_profile': ''
         }
         self._parse_from_string(options_str)
 
@@ -70,7 +79,8 @@ class ProfilerOptions(object):
             elif key == 'exit_on_finished':
                 self._options[key] = value.lower() in ("yes", "true", "t", "1")
             elif key in [
-                    'state', 'sorted_key', 'tracer_option', 'profile_path'
+                    'state', 'sorted_key', 'tracer_option', 'profile_path',
+                    'transforms_profile'
             ]:
                 self._options[key] = value
             elif key == 'timer_only':
@@ -83,6 +93,30 @@ class ProfilerOptions(object):
         return self._options[name]
 
 
+def enable_transforms_profiler(options_str=None):
+    '''
+    Enable the profiling of `transforms.Compose` if `transforms_profile` is set in
+    the options string. Call it before creating the DataLoader, so that every worker
+    profiles. `add_profiler_step` calls it at the first step otherwise.
+    Args:
+      profiler_options - a string to initialize the ProfilerOptions.
+                         Default is None, and the profiler is disabled.
+    Returns:
+      bool - whether the transforms profiling is enabled.
+    '''
+    if options_str is None:
+        return False
+    global _profiler_options
+    if _profiler_options is None:
+        _profiler_options = ProfilerOptions(options_str)
+    save_dir = _profiler_options['transforms_profile']
+    if not save_dir:
+        return False
+    if transforms_profiler.save_dir() != os.path.abspath(save_dir):
+        transforms_profiler.enable(save_dir)
+    return True
+
+
 def add_profiler_step(options_str=None):
     '''
     Enable the operator-level timing using PaddlePaddle's profiler.
@@ -101,6 +135,14 @@ def add_profiler_step(options_str=None):
 
     if _profiler_options is None:
         _profiler_options = ProfilerOptions(options_str)
+    if _profiler_step_id == 0:
+        enabled = transforms_profiler.save_dir() is not None
+        if enable_transforms_profiler(options_str) and not enabled:
+            logger.warning(
+                'The transforms profiling is enabled after the DataLoader '
+                'workers started, so they are not profiled until they are '
+                'restarted. Call `enable_transforms_profiler` before '
+                'iterating the DataLoader to profile them from the start.')
     # profile : https://www.paddlepaddle.org.cn/documentation/docs/zh/guides/performance_improving/profiling_model.html#chakanxingnengshujudetongjibiaodan
     # timer_only = True  only the model's throughput and time overhead are displayed
     # timer_only = False calling summary can print a statistical form that presents performance data from different perspectives.
@@ -122,6 +164,8 @@ def add_profiler_step(options_str=None):
              thread_sep=False,
              time_unit='ms')
         _prof = None
+        if transforms_profiler.save_dir() is not None:
+            transforms_profiler.summary()
         if _profiler_options['exit_on_finished']:
             sys.exit(0)
 
@@ -25,7 +25,7 @@ import cv2
 
 from paddleseg.utils import logger, seg_env, get_sys_env
 from paddleseg.utils.download import download_file_and_uncompress
-from paddleseg.models.layers.layer_libs import NaiveSyncBatchNorm
+from paddleseg.utils.manifest import VALID_SUFFIX, scan_images
 
 
 def set_seed(seed=None):
@@ -85,6 +85,8 @@ def convert_sync_batchnorm(model, device):
         model = paddle.nn.SyncBatchNorm.convert_sync_batchnorm(model)
         logger.info("Convert bn to sync_bn")
     elif device == "npu" and paddle.distributed.ParallelEnv().nranks > 1:
+        # Imported here since paddleseg.models depends on paddleseg.utils
+        from paddleseg.models.layers.layer_libs import NaiveSyncBatchNorm
         model = NaiveSyncBatchNorm.convert_sync_batchnorm(model)
         logger.info("Convert bn to sync_bn in NPU Device")
     return model
@@ -215,11 +217,20 @@ def worker_init_fn(worker_id):
     np.random.seed(random.randint(0, 100000))
 
 
-def get_image_list(image_path):
-    """Get image list"""
-    valid_suffix = [
-        '.JPEG', '.jpeg', '.JPG', '.jpg', '.BMP', '.bmp', '.PNG', '.png'
-    ]
+def get_image_list(image_path, manifest_path=None, num_workers=8):
+    """
+    Get image list
+
+    Args:
+        image_path (str): The path of an image, a file list containing image paths, or a directory including images.
+        manifest_path (str, optional): The manifest caching the listing of a directory, see `scan_images`. Default: None.
+        num_workers (int, optional): The number of threads listing a directory. Default: 8.
+
+    Returns:
+        list: The image paths.
+        str: The root directory of the images, or None for a single image.
+    """
+    valid_suffix = VALID_SUFFIX
     image_list = []
     image_dir = None
     if os.path.isfile(image_path):
@@ -235,14 +246,11 @@ def get_image_list(image_path):
                     image_list.append(os.path.join(image_dir, line))
     elif os.path.isdir(image_path):
         image_dir = image_path
-        for root, dirs, files in os.walk(image_path):
-            for f in files:
-                if '.ipynb_checkpoints' in root:
-                    continue
-                if f.startswith('.'):
-                    continue
-                if os.path.splitext(f)[-1] in valid_suffix:
-                    image_list.append(os.path.join(root, f))
+        image_list = list(
+            scan_images(
+                image_path,
+                manifest_path=manifest_path,
+                num_workers=num_workers))
     else:
         raise FileNotFoundError(
             '`--image_path` is not found. it should be a path of image, or a file list containing image paths, or a directory including images.'
@@ -13,64 +13,256 @@
 # limitations under the License.
 
 import os
+import collections
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 import numpy as np
 from PIL import Image as PILImage
 
 
-def visualize(image, result, color_map, save_dir=None, weight=0.6, use_multilabel=False):
+def get_palette(color_map):
+    """
+    Convert a color map to a palette for `visualize`.
+
+    Args:
+        color_map (list|np.ndarray): The flat RGB color map from `get_color_map_list`, or a palette.
+
+    Returns:
+        np.ndarray: The BGR palette with shape (256, 3) and dtype uint8.
+    """
+    if isinstance(color_map, np.ndarray) and color_map.ndim == 2:
+        return color_map
+    color_map = np.array(color_map, dtype='uint8').reshape([-1, 3])[:256]
+    palette = np.zeros([256, 3], dtype='uint8')
+    palette[:len(color_map)] = color_map[:, ::-1]
+    return palette
+
+
+def _class_codes(masks):
+    """Encode the classes of every pixel of at most 8 (H, W) masks as the bits of a uint8 code."""
+    code = np.zeros(masks[0].shape, dtype='uint8')
+    for i, mask in enumerate(masks):
+        code |= (mask > 0).view('uint8') << i
+    return code
+
+
+def _code_lut(code3, table):
+    """Look up a (256, 3) table with a 3-channel uint8 code image."""
+    table = np.ascontiguousarray(table, dtype='float32')
+    return cv2.LUT(code3, table[:, None, :])
+
+
+def _multilabel_overlay(im, result, palette, weight, draw_contours):
+    """
+    Blend the classes of a multilabel result into the image with look-up tables.
+
+    Blending the classes one by one gives `w**k * im + sum((1 - w) * w**(k - j) * color_j)` for
+    a pixel covered by k of them. Every 8 classes are encoded as the bits of a uint8 code, so the
+    weight of the image and the blended color are looked up from two 256-entry tables.
+    """
+    vis_result = im
+    boundaries = []
+    kernel = np.ones((3, 3), 'uint8')
+    members = ((np.arange(256)[:, None] >> np.arange(8)[None, :]) &
+               1).astype(bool)
+    for start in range(0, result.shape[0], 8):
+        masks = result[start:start + 8]
+        num = masks.shape[0]
+        code3 = cv2.merge([_class_codes(masks)] * 3)
+        sub_members = members[:, :num]
+
+        # The weight of class j of a code is (1 - w) * w ** (number of its classes after j)
+        after = np.cumsum(sub_members[:, ::-1], axis=1)[:, ::-1] - sub_members
+        class_weight = np.where(sub_members, (1 - weight) * weight**after, 0.)
+        im_weight = np.repeat(
+            weight**sub_members.sum(axis=1, keepdims=True), 3, axis=1)
+        offset = class_weight.dot(palette[start:start + num].astype('float32'))
+
+        blended = cv2.multiply(
+            vis_result, _code_lut(code3, im_weight), dtype=cv2.CV_32F)
+        vis_result = cv2.add(
+            blended, _code_lut(code3, offset), dtype=cv2.CV_8U)
+
+        if draw_contours:
+            # The inner boundaries of the masks
+            boundary = [
+                mask > cv2.erode(
+                    mask.astype('uint8', copy=False),
+                    kernel,
+                    borderType=cv2.BORDER_CONSTANT,
+                    borderValue=0) for mask in masks
+            ]
+            boundaries.append((start, num, _class_codes(boundary)))
+
+    # Later classes are drawn on top
+    for start, num, code in boundaries:
+        last = num - 1 - np.argmax(members[:, :num][:, ::-1], axis=1)
+        colors = cv2.LUT(cv2.merge([code] * 3), palette[start + last][:, None, :])
+        cv2.copyTo(colors, (code > 0).view('uint8'), vis_result)
+    return vis_result
+
+
+def visualize(image,
+              result,
+              color_map,
+              save_dir=None,
+              weight=0.6,
+              use_multilabel=False,
+              draw_contours=True):
     """
     Convert predict result to color image, and save added image.
 
     Args:
-        image (str): The path of origin image.
+        image (str|np.ndarray): The path of origin image, or the decoded BGR (or gray) image.
         result (np.ndarray): The predict result of image.
-        color_map (list): The color used to save the prediction results.
+        color_map (list|np.ndarray): The color used to save the prediction results, or the palette from `get_palette`.
         save_dir (str): The directory for saving visual image. Default: None.
         weight (float): The image weight of visual image, and the result weight is (1 - weight). Default: 0.6
         use_multilabel (bool, optional): Whether to enable multilabel mode. Default: False.
+        draw_contours (bool, optional): Whether to draw the contours of classes in multilabel mode. Default: True.
 
     Returns:
         vis_result (np.ndarray): If `save_dir` is None, return the visualized result.
     """
 
-    color_map = [color_map[i:i + 3] for i in range(0, len(color_map), 3)]
-    color_map = np.array(color_map).astype("uint8")
+    palette = get_palette(color_map)
 
-    im = cv2.imread(image)
+    if isinstance(image, str):
+        image_name = os.path.split(image)[-1]
+        im = cv2.imread(image)
+    else:
+        image_name = None
+        im = image
+        if im.ndim == 2:
+            im = cv2.cvtColor(im, cv2.COLOR_GRAY2BGR)
     if not use_multilabel:
         # Use OpenCV LUT for color mapping
-        c1 = cv2.LUT(result, color_map[:, 0])
-        c2 = cv2.LUT(result, color_map[:, 1])
-        c3 = cv2.LUT(result, color_map[:, 2])
-        pseudo_img = np.dstack((c3, c2, c1))
-
+        result = result.astype('uint8', copy=False)
+        pseudo_img = cv2.LUT(cv2.merge([result] * 3), palette[:, None, :])
         vis_result = cv2.addWeighted(im, weight, pseudo_img, 1 - weight, 0)
     else:
-        vis_result = im.copy()
-        for i in range(result.shape[0]):
-            mask = result[i]
-            c1 = np.where(mask, color_map[i, 0], vis_result[..., 0])
-            c2 = np.where(mask, color_map[i, 1], vis_result[..., 1])
-            c3 = np.where(mask, color_map[i, 2], vis_result[..., 2])
-            pseudo_img = np.dstack((c3, c2, c1)).astype('uint8')
-
-            contour, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            vis_result = cv2.addWeighted(vis_result, weight, pseudo_img, 1 - weight, 0)
-            contour_color = (int(color_map[i, 0]), int(color_map[i, 1]), int(color_map[i, 2]))
-            vis_result = cv2.drawContours(vis_result, contour, -1, contour_color, 1)
+        vis_result = _multilabel_overlay(im, result, palette, weight,
+                                         draw_contours)
 
     if save_dir is not None:
+        if image_name is None:
+            raise ValueError(
+                'The image is not a path, please visualize it with `save_dir=None` and save the result.'
+            )
         if not os.path.exists(save_dir):
             os.makedirs(save_dir)
-        image_name = os.path.split(image)[-1]
         out_path = os.path.join(save_dir, image_name)
         cv2.imwrite(out_path, vis_result)
     else:
         return vis_result
 
 
+def visualize_batch(images,
+                    results,
+                    color_map,
+                    weight=0.6,
+                    use_multilabel=False,
+                    draw_contours=True):
+    """
+    Visualize a batch of in-memory images with a palette computed once.
+
+    Args:
+        images (list[np.ndarray]): The decoded BGR (or gray) images.
+        results (list[np.ndarray]|np.ndarray): The predict results of images.
+        color_map (list|np.ndarray): The color map or the palette from `get_palette`.
+        weight (float, optional): The image weight of visual image. Default: 0.6.
+        use_multilabel (bool, optional): Whether to enable multilabel mode. Default: False.
+        draw_contours (bool, optional): Whether to draw the contours in multilabel mode. Default: True.
+
+    Returns:
+        list[np.ndarray]: The visualized results.
+    """
+    palette = get_palette(color_map)
+    return [
+        visualize(
+            im,
+            result,
+            palette,
+            weight=weight,
+            use_multilabel=use_multilabel,
+            draw_contours=draw_contours)
+        for im, result in zip(images, results)
+    ]
+
+
+class AsyncImageWriter(object):
+    """
+    Encode and write images in a thread pool, so the caller does not wait for the disk.
+
+    At most `max_pending` jobs are pending; `submit` blocks on the oldest job beyond it, and
+    raises the errors of finished jobs.
+
+    Args:
+        num_workers (int, optional): The number of writing threads. Default: 2.
+        max_pending (int, optional): The maximum number of pending jobs. Default: 8.
+
+    Examples:
+
+        with AsyncImageWriter(num_workers=2) as writer:
+            for im, pred, path in results:
+                writer.write(path, visualize(im, pred, palette))
+    """
+
+    def __init__(self, num_workers=2, max_pending=8):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, num_workers))
+        self._pending = collections.deque()
+        self.max_pending = max(1, max_pending)
+
+    @staticmethod
+    def _write(path, image):
+        sub_dir = os.path.dirname(path)
+        if sub_dir:
+            os.makedirs(sub_dir, exist_ok=True)
+        if isinstance(image, np.ndarray):
+            if not cv2.imwrite(path, image):
+                raise IOError('Failed to write {}'.format(path))
+        else:
+            image.save(path)
+
+    def submit(self, fn, *args, **kwargs):
+        """Run `fn(*args, **kwargs)` in the pool, e.g. visualize and write a result."""
+        self._pending.append(self._executor.submit(fn, *args, **kwargs))
+        while len(self._pending) > self.max_pending or (
+                self._pending and self._pending[0].done()):
+            self._pending.popleft().result()
+
+    def write(self, path, image):
+        """
+        Write an image asynchronously.
+
+        Args:
+            path (str): The output path, whose directory is created if needed.
+            image (np.ndarray|PIL.Image): A BGR array written by OpenCV, or a PIL Image.
+        """
+        self.submit(self._write, path, image)
+
+    def wait(self):
+        """Wait for all pending jobs."""
+        while self._pending:
+            self._pending.popleft().result()
+
+    def close(self):
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._executor.shutdown(wait=True)
+
+
 def get_pseudo_color_map(pred, color_map=None, use_multilabel=False):
     """
     Get the pseudo color image.
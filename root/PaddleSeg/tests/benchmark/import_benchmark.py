@@ -0,0 +1,80 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measure the cold-start time of importing paddleseg and looking up the components we build.
+
+"eager" imports every model, backbone, loss, dataset, transform and optimizer as
+`import paddleseg` did before the lazy ComponentManager, "lazy" only imports the modules
+defining the requested components. Every run uses a fresh interpreter.
+
+Usage:
+    python tests/benchmark/import_benchmark.py --components SegFormer HarDNet --repeats 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+SNIPPET = '''
+import time
+start = time.time()
+import paddle
+paddle_cost = time.time() - start
+from paddleseg.cvlibs import manager
+if {eager}:
+    for com in [manager.MODELS, manager.BACKBONES, manager.LOSSES,
+                manager.DATASETS, manager.TRANSFORMS, manager.OPTIMIZERS]:
+        com.components_dict
+for name in {components}:
+    manager.MODELS[name]
+print(paddle_cost, time.time() - start)
+'''
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Import time benchmark')
+    parser.add_argument(
+        '--components', nargs='+', default=['SegFormer', 'HarDNet'])
+    parser.add_argument('--repeats', type=int, default=5)
+    return parser.parse_args()
+
+
+def run(eager, components):
+    code = SNIPPET.format(eager=eager, components=repr(list(components)))
+    out = subprocess.check_output(
+        [sys.executable, '-c', code], cwd=ROOT, env=dict(os.environ, PYTHONPATH=ROOT))
+    paddle_cost, total = map(float, out.decode().split()[-2:])
+    return paddle_cost, total
+
+
+def main(args):
+    print('{:>6} {:>12} {:>14} {:>12}'.format('mode', 'paddle (s)',
+                                             'paddleseg (s)', 'total (s)'))
+    results = {}
+    for mode, eager in [('eager', True), ('lazy', False)]:
+        runs = [run(eager, args.components) for _ in range(args.repeats)]
+        paddle_cost = min(r[0] for r in runs)
+        total = min(r[1] for r in runs)
+        results[mode] = total - paddle_cost
+        print('{:>6} {:>12.3f} {:>14.3f} {:>12.3f}'.format(
+            mode, paddle_cost, total - paddle_cost, total))
+    print('paddleseg import is {:.1f}x faster with lazy components.'.format(
+        results['eager'] / max(results['lazy'], 1e-6)))
+
+
+if __name__ == '__main__':
+    main(parse_args())
@@ -0,0 +1,103 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare the per-class loop of `metrics.calculate_area` with the single-bincount
+`metrics.calculate_confusion_matrix`.
+
+Usage:
+    python tests/benchmark/metrics_benchmark.py --num_classes 2 19 150 --size 1024 1024
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import paddle
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+from paddleseg.utils import metrics
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Metrics benchmark')
+    parser.add_argument(
+        '--num_classes', nargs='+', type=int, default=[2, 19, 150])
+    parser.add_argument(
+        '--size',
+        nargs=2,
+        type=int,
+        default=[1024, 1024],
+        help='The height and width of the label.')
+    parser.add_argument('--batch_size', type=int, default=1)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument(
+        '--device',
+        type=str,
+        default=None,
+        choices=['cpu', 'gpu'],
+        help='Default: gpu if Paddle is compiled with CUDA, otherwise cpu.')
+    return parser.parse_args()
+
+
+def timeit(fn, repeats):
+    fn()  # warm up
+    start = time.time()
+    for _ in range(repeats):
+        out = fn()
+        # Synchronize by copying the results to host
+        [o.numpy() for o in (out if isinstance(out, tuple) else (out, ))]
+    return (time.time() - start) / repeats
+
+
+def main(args):
+    device = args.device
+    if device is None:
+        device = 'gpu' if paddle.is_compiled_with_cuda() else 'cpu'
+    paddle.set_device(device)
+    h, w = args.size
+    print('{:>8} {:>12} {:>12} {:>8}'.format('classes', 'loop (ms)',
+                                            'bincount (ms)', 'speedup'))
+    for num_classes in args.num_classes:
+        rng = np.random.RandomState(0)
+        label = rng.randint(0, num_classes, (args.batch_size, 1, h, w))
+        label[:, :, :h // 16] = 255
+        pred = np.where(
+            rng.rand(*label.shape) < 0.8, label,
+            rng.randint(0, num_classes, label.shape))
+        pred[label == 255] = rng.randint(0, num_classes, (label == 255).sum())
+        label = paddle.to_tensor(label, dtype='int64')
+        pred = paddle.to_tensor(pred, dtype='int32')
+
+        t_loop = timeit(
+            lambda: metrics.calculate_area(pred, label, num_classes),
+            args.repeats)
+        t_cm = timeit(
+            lambda: metrics.calculate_confusion_matrix(pred, label, num_classes),
+            args.repeats)
+
+        # Check that both give the same areas
+        cm = metrics.ConfusionMatrix(num_classes)
+        cm.update(pred, label)
+        for a, b in zip(
+                metrics.calculate_area(pred, label, num_classes), cm.areas()):
+            assert np.array_equal(a.numpy(), b.numpy())
+
+        print('{:>8} {:>12.2f} {:>12.2f} {:>7.1f}x'.format(
+            num_classes, t_loop * 1000, t_cm * 1000, t_loop / t_cm))
+
+
+if __name__ == '__main__':
+    main(parse_args())
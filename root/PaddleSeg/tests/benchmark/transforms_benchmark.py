@@ -0,0 +1,153 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Time every transform of a training pipeline on the uint8 fast path and on the
+previous float32 path.
+
+"float32" feeds a float32 image, converts the image back to float32 after every op and
+uses the PIL-based RandomDistort and the three-pass normalize, as Compose did before.
+"uint8" is the current pipeline.
+
+Usage:
+    python tests/benchmark/transforms_benchmark.py --size 1024 1024 --repeats 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+from paddleseg.transforms import transforms as T
+from paddleseg.transforms import functional
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Transforms benchmark')
+    parser.add_argument(
+        '--size',
+        nargs=2,
+        type=int,
+        default=[1024, 1024],
+        help='The height and width of the input image.')
+    parser.add_argument('--repeats', type=int, default=20)
+    return parser.parse_args()
+
+
+class LegacyRandomDistort(T.RandomDistort):
+    """RandomDistort through PIL, as before the uint8 fast path."""
+
+    def __call__(self, data):
+        ops = [
+            functional.brightness, functional.contrast, functional.saturation,
+            functional.sharpness, functional.hue
+        ]
+        random.shuffle(ops)
+        params_dict = {
+            'brightness': (1 - self.brightness_range,
+                           1 + self.brightness_range, self.brightness_prob),
+            'contrast':
+            (1 - self.contrast_range, 1 + self.contrast_range,
+             self.contrast_prob),
+            'saturation': (1 - self.saturation_range,
+                           1 + self.saturation_range, self.saturation_prob),
+            'hue': (-self.hue_range, self.hue_range, self.hue_prob),
+            'sharpness': (1 - self.sharpness_range, 1 + self.sharpness_range,
+                          self.sharpness_prob)
+        }
+        img = Image.fromarray(data['img'].astype('uint8'))
+        for op in ops:
+            lower, upper, prob = params_dict[op.__name__]
+            if np.random.uniform(0, 1) < prob:
+                img = op(img, lower, upper)
+        data['img'] = np.asarray(img).astype('float32')
+        return data
+
+
+class LegacyNormalize(T.Normalize):
+    def __call__(self, data):
+        img = data['img'].astype(np.float32, copy=False) / 255.0
+        img -= self.mean
+        img /= self.std
+        data['img'] = img
+        return data
+
+
+def build_ops(legacy):
+    return [
+        T.ResizeStepScaling(0.75, 1.25, 0.25),
+        T.RandomPaddingCrop(crop_size=(1024, 1024)),
+        T.RandomHorizontalFlip(),
+        (LegacyRandomDistort if legacy else T.RandomDistort)(
+            brightness_range=0.4,
+            contrast_range=0.4,
+            saturation_range=0.4,
+            sharpness_prob=0.5,
+            hue_prob=0.5),
+        T.RandomBlur(prob=0.5),
+        (LegacyNormalize if legacy else T.Normalize)(),
+    ]
+
+
+def run(img, label, legacy, repeats):
+    ops = build_ops(legacy)
+    costs = defaultdict(float)
+    for _ in range(repeats):
+        data = {
+            'img': img.astype('float32') if legacy else img,
+            'label': label,
+            'gt_fields': ['label'],
+            'trans_info': []
+        }
+        for op in ops:
+            start = time.perf_counter()
+            data = op(data)
+            if legacy:
+                data['img'] = data['img'].astype('float32', copy=False)
+            costs[type(op).__name__.replace('Legacy', '')] += \
+                time.perf_counter() - start
+    return {name: cost / repeats * 1000 for name, cost in costs.items()}
+
+
+def main(args):
+    h, w = args.size
+    rng = np.random.RandomState(0)
+    img = rng.randint(0, 256, (h, w, 3)).astype('uint8')
+    label = rng.randint(0, 19, (h, w)).astype('uint8')
+
+    random.seed(0)
+    np.random.seed(0)
+    legacy = run(img, label, True, args.repeats)
+    random.seed(0)
+    np.random.seed(0)
+    fast = run(img, label, False, args.repeats)
+
+    print('{:<20} {:>14} {:>12} {:>8}'.format('transform', 'float32 (ms)',
+                                            'uint8 (ms)', 'speedup'))
+    for name in legacy:
+        print('{:<20} {:>14.2f} {:>12.2f} {:>7.1f}x'.format(
+            name, legacy[name], fast[name], legacy[name] / max(fast[name],
+                                                               1e-6)))
+    total_legacy, total_fast = sum(legacy.values()), sum(fast.values())
+    print('{:<20} {:>14.2f} {:>12.2f} {:>7.1f}x'.format(
+        'total', total_legacy, total_fast, total_legacy / total_fast))
+
+
+if __name__ == '__main__':
+    main(parse_args())
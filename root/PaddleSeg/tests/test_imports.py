@@ -0,0 +1,69 @@
+# Copyright (c) 2022 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Import smoke test of the public subpackages.
+
+Every statement runs in a fresh interpreter, since circular imports only show
+up for some import orders, e.g. `from paddleseg.utils import metrics` before
+anything else imports `paddleseg.models`.
+
+Usage:
+    python -m pytest tests/test_imports.py
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+IMPORT_STATEMENTS = [
+    'import paddleseg',
+    'import paddleseg.core',
+    'import paddleseg.cvlibs',
+    'import paddleseg.datasets',
+    'import paddleseg.models',
+    'import paddleseg.models.backbones',
+    'import paddleseg.models.layers',
+    'import paddleseg.models.losses',
+    'import paddleseg.optimizers',
+    'import paddleseg.transforms',
+    'import paddleseg.utils',
+    'from paddleseg.utils import metrics',
+    'from paddleseg.utils import visualize',
+    'from paddleseg.cvlibs import manager, Config, SegBuilder',
+    'import paddleseg; from paddleseg.core import infer',
+    'import paddleseg; paddleseg.models.SegFormer',
+]
+
+
+@unittest.skipIf(
+    importlib.util.find_spec('paddle') is None, 'paddle is not installed')
+class TestImports(unittest.TestCase):
+
+    def test_import_in_fresh_interpreter(self):
+        for statement in IMPORT_STATEMENTS:
+            with self.subTest(statement=statement):
+                result = subprocess.run([sys.executable, '-c', statement],
+                                        cwd=ROOT,
+                                        stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE,
+                                        universal_newlines=True)
+                self.assertEqual(result.returncode, 0, result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -36,6 +36,11 @@ def parse_args():
         help='Number of workers for data loader. Bigger num_workers can speed up data processing.',
         type=int,
         default=0)
+    parser.add_argument(
+        '--batch_size',
+        help='Number of images evaluated in a forward pass. Images are bucketed by size.',
+        type=int,
+        default=1)
     parser.add_argument(
         '--device',
         help='Set the device place for evaluating model.',
@@ -80,6 +85,16 @@ def parse_args():
         help='The stride of sliding window, the first is width and the second is height.'
         'For example, `--stride 512 512`',
         type=int)
+    parser.add_argument(
+        '--slide_batch_size',
+        help='The number of sliding windows inferred in one forward pass.',
+        type=int,
+        default=None)
+    parser.add_argument(
+        '--slide_blend',
+        help='Blending weights of overlapping sliding windows, "gaussian" or "cosine".',
+        choices=['gaussian', 'cosine'],
+        default=None)
 
     # Other params
     parser.add_argument(
@@ -118,6 +133,10 @@ def merge_test_config(cfg, args):
         test_config['is_slide'] = args.is_slide
         test_config['crop_size'] = args.crop_size
         test_config['stride'] = args.stride
+        if args.slide_batch_size is not None:
+            test_config['slide_batch_size'] = args.slide_batch_size
+        if args.slide_blend is not None:
+            test_config['slide_blend'] = args.slide_blend
     if args.use_multilabel:
         test_config['use_multilabel'] = args.use_multilabel
     return test_config
@@ -152,7 +171,12 @@ def main(args):
         logger.info('Loaded trained weights successfully.')
     val_dataset = builder.val_dataset
 
-    evaluate(model, val_dataset, num_workers=args.num_workers, **test_config)
+    evaluate(
+        model,
+        val_dataset,
+        num_workers=args.num_workers,
+        batch_size=args.batch_size,
+        **test_config)
 
 
 if __name__ == '__main__':
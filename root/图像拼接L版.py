@@ -1,67 +1,224 @@
+import hashlib
+import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import cv2
 import numpy as np
 
 
-def pinjie(path_img, path_save):
+# 默认切割位置和拼接顺序：(第几张图, 第几段)
+DEFAULT_CUTS = (1800, 2850, 3500)
+DEFAULT_ORDER = ((0, 0), (1, 1), (0, 2), (1, 3))
+
+MANIFEST_NAME = '.pinjie_manifest.json'
+
+
+class CutLayout:
     """
-    遍历 path_img 目录树，对每一组 2 张图做指定拼接，
-    并在 path_save 下保持与原目录结构完全一致。
-    拼接结果命名为父文件夹名称.png，保存在"原目录对应位置"。
+    切割与拼接布局
+
+    cuts 把每张图按列切成 len(cuts)+1 段，order 给出拼接时依次取 (图序号, 段序号)。
+    默认值即原脚本的 part1 + part6 + part3 + part8。
     """
+
+    def __init__(self, cuts=DEFAULT_CUTS, order=DEFAULT_ORDER):
+        self.cuts = tuple(int(c) for c in cuts)
+        self.order = tuple((int(i), int(s)) for i, s in order)
+        if list(self.cuts) != sorted(self.cuts):
+            raise ValueError(f"切割位置必须递增: {self.cuts}")
+
+    @property
+    def n_images(self):
+        return max(i for i, _ in self.order) + 1
+
+    def segments(self, width):
+        """返回每段的列范围 [(x0, x1), ...]"""
+        edges = [0] + [min(c, width) for c in self.cuts] + [width]
+        return list(zip(edges[:-1], edges[1:]))
+
+    def key(self):
+        return json.dumps({'cuts': self.cuts, 'order': self.order})
+
+    def stitch(self, images):
+        """按布局把各段写入预分配的结果数组，只复制一次"""
+        ranges = []
+        for img_idx, seg_idx in self.order:
+            img = images[img_idx]
+            x0, x1 = self.segments(img.shape[1])[seg_idx]
+            ranges.append((img, x0, x1))
+
+        height = min(img.shape[0] for img, _, _ in ranges)
+        if any(img.shape[0] != height for img, _, _ in ranges):
+            print(f"警告: 图像高度不一致，按最小高度 {height} 拼接")
+        width = sum(x1 - x0 for _, x0, x1 in ranges)
+        out = np.empty((height, width) + images[0].shape[2:], dtype=images[0].dtype)
+
+        x = 0
+        for img, x0, x1 in ranges:
+            out[:, x:x + x1 - x0] = img[:height, x0:x1]
+            x += x1 - x0
+        return out
+
+
+class OutputCodec:
+    """输出格式和压缩参数：png 压缩级别 0-9，jpg/webp 质量 0-100"""
+
+    def __init__(self, ext='.png', level=None):
+        self.ext = ext if ext.startswith('.') else '.' + ext
+        self.ext = self.ext.lower()
+        if self.ext == '.png':
+            self.params = [int(cv2.IMWRITE_PNG_COMPRESSION), 3 if level is None else int(level)]
+        elif self.ext in ('.jpg', '.jpeg'):
+            self.params = [int(cv2.IMWRITE_JPEG_QUALITY), 95 if level is None else int(level)]
+        elif self.ext == '.webp':
+            self.params = [int(cv2.IMWRITE_WEBP_QUALITY), 95 if level is None else int(level)]
+        else:
+            self.params = []
+
+    def key(self):
+        return f"{self.ext}:{self.params}"
+
+
+def file_signature(path, use_hash=False):
+    """文件签名：大小+修改时间，use_hash 时使用内容的 sha1"""
+    stat = os.stat(path)
+    if use_hash:
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        return {'size': stat.st_size, 'sha1': h.hexdigest()}
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def load_manifest(path_save):
+    manifest_path = os.path.join(path_save, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print('清单文件损坏，将重新生成：', manifest_path)
+    return {}
+
+
+def save_manifest(path_save, manifest):
+    os.makedirs(path_save, exist_ok=True)
+    manifest_path = os.path.join(path_save, MANIFEST_NAME)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, manifest_path)
+
+
+def find_jobs(path_img, path_save, layout, codec):
+    """遍历目录树，每个恰好包含 layout.n_images 张图的文件夹是一个拼接任务"""
+    jobs = []
     for root, dirs, files in os.walk(path_img):
-        if len(files) != 2:
+        dirs.sort()
+        if len(files) != layout.n_images:
             continue
 
-        # 原文件夹完整相对路径
-        rel_dir = os.path.relpath(root, path_img)        # 例如  Data0724COTTON\601
-        out_dir = os.path.join(path_save, rel_dir)       # 目标对应目录
-        
+        # 原文件夹完整相对路径，例如 Data0724COTTON\601
+        rel_dir = os.path.relpath(root, path_img)
+        out_dir = os.path.join(path_save, rel_dir)
+
         # 获取父文件夹名称作为文件名
         parent_folder_name = os.path.basename(root)
-        save_filename = f"{parent_folder_name}.png"
-        
-        # 输出文件完整路径
-        save_path = os.path.join(out_dir, save_filename)
+        save_path = os.path.join(out_dir, parent_folder_name + codec.ext)
 
-        # 如果已存在则跳过
-        if os.path.exists(save_path):
-            continue
+        inputs = [os.path.join(root, f) for f in sorted(files)]
+        jobs.append((rel_dir, inputs, save_path))
+    return jobs
 
-        # 读取两张图
-        img1 = cv2.imread(os.path.join(root, files[0]))
-        img2 = cv2.imread(os.path.join(root, files[1]))
-        if img1 is None or img2 is None:
-            print('读取失败，跳过：', root)
-            continue
 
-        h, w = img1.shape[:2]
+def stitch_one(inputs, save_path, layout, codec):
+    """读取、拼接并保存一组图像，返回 (是否成功, 耗时, 像素数)"""
+    start = time.perf_counter()
+    images = [cv2.imread(p) for p in inputs]
+    if any(img is None for img in images):
+        return False, time.perf_counter() - start, 0
+
+    final_img = layout.stitch(images)
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    ok = cv2.imwrite(save_path, final_img, codec.params)
+    return ok, time.perf_counter() - start, sum(img.size for img in images)
+
+
+def pinjie(path_img, path_save, layout=None, codec=None, workers=None, executor='thread',
+           use_hash=False, force=False):
+    """
+    遍历 path_img 目录树，对每个恰好包含 layout.n_images 张图的文件夹按 layout 切割拼接，
+    并在 path_save 下保持与原目录结构完全一致。
+    拼接结果命名为父文件夹名称 + codec.ext（默认 .png），保存在"原目录对应位置"。
+
+    layout: 切割布局 CutLayout，默认原 1800/2850/3500 切割
+    codec: 输出格式 OutputCodec，默认 PNG 压缩级别 3
+    workers / executor: 并行数以及 'thread' 或 'process'
+    use_hash: 用文件内容哈希而非修改时间判断输入是否变化
+    force: 忽略清单，全部重新拼接
+
+    结果清单 .pinjie_manifest.json 记录输入签名，输入未变且结果存在时跳过。
+    返回统计信息字典。
+    """
+    layout = layout or CutLayout()
+    codec = codec or OutputCodec()
+    workers = workers or os.cpu_count() or 1
 
-        # —————— 切割位置 ——————
-        x1, x2, x3 = 1800, 2850, 3500
-        part1 = img1[:, 0:x1]
-        part2 = img1[:, x1:x2]
-        part3 = img1[:, x2:x3]
-        part4 = img1[:, x3:w]
+    manifest = {} if force else load_manifest(path_save)
+    config_key = layout.key() + codec.key()
 
-        part5 = img2[:, 0:x1]
-        part6 = img2[:, x1:x2]
-        part7 = img2[:, x2:x3]
-        part8 = img2[:, x3:w]
+    todo = []
+    skipped = 0
+    for rel_dir, inputs, save_path in find_jobs(path_img, path_save, layout, codec):
+        signature = [file_signature(p, use_hash) for p in inputs]
+        entry = manifest.get(rel_dir)
+        if not force and os.path.exists(save_path):
+            # 没有清单记录的旧结果沿用原脚本“已存在则跳过”的约定
+            if entry is None or (entry.get('inputs') == signature and entry.get('config') == config_key):
+                skipped += 1
+                continue
+        todo.append((rel_dir, inputs, save_path, signature))
 
-        # —————— 按顺序拼接 ——————
-        final_img = np.hstack([part1, part6, part3, part8])
+    start = time.perf_counter()
+    done = failed = 0
+    pixels = 0
+    pool_cls = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+    with pool_cls(max_workers=workers) as pool:
+        futures = [pool.submit(stitch_one, inputs, save_path, layout, codec)
+                   for _, inputs, save_path, _ in todo]
+        for (rel_dir, inputs, save_path, signature), future in zip(todo, futures):
+            ok, _, n = future.result()
+            if not ok:
+                failed += 1
+                print('读取失败，跳过：', os.path.dirname(inputs[0]))
+                continue
+            done += 1
+            pixels += n
+            manifest[rel_dir] = {'inputs': signature, 'config': config_key,
+                                 'output': os.path.relpath(save_path, path_save)}
+            print('已保存:', save_path)
+    elapsed = time.perf_counter() - start
 
-        # 确保目录存在
-        os.makedirs(out_dir, exist_ok=True)
+    if done:
+        save_manifest(path_save, manifest)
 
-        # 保存
-        cv2.imwrite(save_path, final_img,
-                    [int(cv2.IMWRITE_PNG_COMPRESSION), 0])
-        print('已保存:', save_path)
+    stats = {
+        'done': done,
+        'skipped': skipped,
+        'failed': failed,
+        'seconds': elapsed,
+        'groups_per_s': done / elapsed if elapsed > 0 else 0.0,
+        'megapixels_per_s': pixels / 1e6 / elapsed if elapsed > 0 else 0.0,
+    }
+    print(f"拼接 {done} 组，跳过 {skipped} 组，失败 {failed} 组，耗时 {elapsed:.2f}s，"
+          f"{stats['groups_per_s']:.2f} 组/秒")
+    return stats
 
 
 if __name__ == '__main__':
     path_img = r'G:\2025cotton'   # 原始数据根目录
     path_save = r'G:\out_img_pinjie'     # 拼接结果根目录
-    pinjie(path_img, path_save)
\ No newline at end of file
+    pinjie(path_img, path_save)
@@ -0,0 +1,180 @@
+"""
+回放笔画，比较二值图编辑器原整幅拷贝方式与分块增量方式的耗时和撤销栈内存
+
+笔画文件为JSON列表，每项一笔：{"points": [[x, y], ...], "color": 0或255, "thickness": 画笔大小}。
+不指定 --strokes 时在随机掩膜上生成随机游走笔画，可用 --save 保存下来重复回放。
+两种方式回放后比较最终图像，并检查全部撤销、全部重做后的结果。
+没有安装 PyQt5 时不计 QPixmap 的构建时间，只统计每次需要转换为 QPixmap 的像素数。
+
+    python 填补_回放基准.py --size 8192 --count 30
+    python 填补_回放基准.py --strokes strokes.json --image mask.png
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from 笔画历史 import DeltaHistory, StrokeCanvas, draw_stroke, tiles_in_rect
+
+DISPLAY_TILE = 256
+
+
+def make_mask(size, seed=0):
+    """随机圆斑组成的二值掩膜"""
+    rng = np.random.default_rng(seed)
+    mask = np.zeros((size, size), dtype=np.uint8)
+    for _ in range(size // 16):
+        x, y = (int(v) for v in rng.integers(0, size, 2))
+        cv2.circle(mask, (x, y), int(rng.integers(5, size // 40 + 6)), 255, -1)
+    return mask
+
+
+def make_strokes(shape, count, points=120, seed=0):
+    """随机游走笔画，步长与手绘时相邻两次鼠标事件的距离相近"""
+    rng = np.random.default_rng(seed)
+    h, w = shape
+    strokes = []
+    for _ in range(count):
+        start = rng.integers(0, [w, h])
+        steps = rng.integers(-12, 13, (points - 1, 2))
+        pts = np.clip(np.cumsum(np.vstack([start, steps]), axis=0), 0, [w - 1, h - 1])
+        strokes.append({'points': pts.tolist(), 'color': int(rng.choice([0, 255])),
+                        'thickness': int(rng.integers(3, 40))})
+    return strokes
+
+
+class QtPixmaps:
+    """有 PyQt5 时实际构建 QPixmap，否则只计数"""
+
+    def __init__(self):
+        self.pixels = 0
+        self.app = None
+        try:
+            os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+            from PyQt5.QtGui import QImage, QPixmap
+            from PyQt5.QtWidgets import QApplication
+            self.app = QApplication.instance() or QApplication(sys.argv)
+            self.QImage, self.QPixmap = QImage, QPixmap
+        except ImportError:
+            pass
+
+    def build(self, array):
+        array = np.ascontiguousarray(array)
+        self.pixels += array.size
+        if self.app is not None:
+            h, w = array.shape
+            self.QPixmap.fromImage(self.QImage(array.data, w, h, w, self.QImage.Format_Grayscale8))
+
+
+def replay_full(img, strokes, pixmaps):
+    """原方式：每一笔 deepcopy 整幅图像入栈，每次移动拷贝整幅图像、重画整条轨迹并重建整幅 QPixmap"""
+    history = deque(maxlen=50)
+    move_times = []
+    for stroke in strokes:
+        pts = [tuple(p) for p in stroke['points']]
+        history.append(copy.deepcopy(img))
+        for n in range(2, len(pts) + 1):
+            start = time.perf_counter()
+            temp = img.copy()
+            draw_stroke(temp, pts[:n], stroke['color'], stroke['thickness'])
+            pixmaps.build(temp)
+            move_times.append(time.perf_counter() - start)
+        draw_stroke(img, pts, stroke['color'], stroke['thickness'])
+        pixmaps.build(img)
+    return img, move_times, sum(frame.nbytes for frame in history)
+
+
+def replay_delta(img, strokes, pixmaps, history):
+    """分块方式：原地绘制，只刷新经过的显示分块，每一笔只保存改变的分块；另返回有改变的笔画序号"""
+    move_times = []
+    changed = []
+    for i, stroke in enumerate(strokes):
+        canvas = StrokeCanvas(img, stroke['color'], stroke['thickness'])
+        points = [tuple(p) for p in stroke['points']]
+        canvas.add_point(*points[0])
+        for x, y in points[1:]:
+            start = time.perf_counter()
+            rect = canvas.add_point(x, y)
+            if rect is not None:
+                for tx, ty in tiles_in_rect(rect, DISPLAY_TILE):
+                    pixmaps.build(img[ty:ty + DISPLAY_TILE, tx:tx + DISPLAY_TILE])
+            move_times.append(time.perf_counter() - start)
+        delta = canvas.finish()
+        if delta:
+            changed.append(i)
+        history.record(delta)
+    return img, move_times, changed
+
+
+def summarize(name, move_times, total, history_bytes, pixmaps):
+    times = np.asarray(move_times) * 1000
+    print(f"{name}：总耗时 {total:.2f}s，每次移动 平均 {times.mean():.2f}ms / 最大 {times.max():.2f}ms，"
+          f"撤销栈 {history_bytes / 1024 ** 2:.1f} MB，转换为QPixmap {pixmaps.pixels / 1e6:.1f} M像素")
+
+
+def run(image, strokes):
+    pixmaps_full, pixmaps_delta = QtPixmaps(), QtPixmaps()
+    if pixmaps_full.app is None:
+        print("未安装 PyQt5，不计 QPixmap 构建时间")
+    moves = sum(len(s['points']) - 1 for s in strokes)
+    print(f"图像 {image.shape[1]}x{image.shape[0]}，{len(strokes)} 笔，{moves} 次移动")
+
+    start = time.perf_counter()
+    full, full_times, full_bytes = replay_full(image.copy(), strokes, pixmaps_full)
+    summarize("整幅拷贝", full_times, time.perf_counter() - start, full_bytes, pixmaps_full)
+
+    history = DeltaHistory(max_strokes=50)
+    start = time.perf_counter()
+    delta, delta_times, changed = replay_delta(image.copy(), strokes, pixmaps_delta, history)
+    summarize("分块增量", delta_times, time.perf_counter() - start, history.nbytes, pixmaps_delta)
+
+    print(f"最终图像一致：{np.array_equal(full, delta)}")
+    undone = delta.copy()
+    steps = len(history.undo_stack)
+    while history.undo(undone) is not None:
+        pass
+    # 没有改变图像的笔画不入栈；撤销栈最多保留50笔，全部撤销后应回到其中最早一笔之前的状态
+    first = changed[-steps] if steps else len(strokes)
+    expected = image.copy()
+    for stroke in strokes[:first]:
+        draw_stroke(expected, [tuple(p) for p in stroke['points']], stroke['color'], stroke['thickness'])
+    print(f"全部撤销（{steps} 笔）后一致：{np.array_equal(undone, expected)}")
+    while history.redo(undone) is not None:
+        pass
+    print(f"全部重做后一致：{np.array_equal(undone, delta)}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="回放笔画比较编辑器的两种绘制与撤销方式")
+    parser.add_argument('--image', default=None, help="二值图，默认生成随机掩膜")
+    parser.add_argument('--size', type=int, default=8192, help="随机掩膜边长")
+    parser.add_argument('--strokes', default=None, help="笔画JSON，默认随机生成")
+    parser.add_argument('--count', type=int, default=30, help="随机笔画数")
+    parser.add_argument('--save', default=None, help="把回放的笔画保存为JSON")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.image:
+        image = cv2.imdecode(np.fromfile(args.image, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise SystemExit(f"无法读取 {args.image}")
+    else:
+        image = make_mask(args.size)
+    if args.strokes:
+        with open(args.strokes, 'r', encoding='utf-8') as f:
+            strokes = json.load(f)
+    else:
+        strokes = make_strokes(image.shape, args.count)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(strokes, f)
+    run(image, strokes)
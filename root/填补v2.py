@@ -1,10 +1,8 @@
 # binary_tool.py
 import os
 import sys
-import copy
 import cv2
 import numpy as np
-from collections import deque
 from PyQt5.QtWidgets import (QApplication, QGraphicsView, QGraphicsScene,
                              QGraphicsPixmapItem, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QFileDialog,
@@ -14,6 +12,11 @@ from PyQt5.QtCore import Qt, QPointF, QRectF
 from PyQt5.QtGui import (QPixmap, QImage, QPainter, QPen, QBrush,
                          QColor)
 
+from 笔画历史 import DeltaHistory, StrokeCanvas, tiles_in_rect
+
+# 显示分块边长：画笔只刷新经过的分块，不再重建整幅 QPixmap
+DISPLAY_TILE = 256
+
 # ------------------------------------------------------------
 # 1. GPU 加速 + 连续绘制视图
 # ------------------------------------------------------------
@@ -32,13 +35,12 @@ class SmoothViewer(QGraphicsView):
 
         self.scene = QGraphicsScene(self)
         self.setScene(self.scene)
-        self.pixmap_item = QGraphicsPixmapItem()
-        self.scene.addItem(self.pixmap_item)
+        self.tile_items = {}
 
         # 状态
         self.drawing = False
         self.right_dragging = False
-        self.temp_path = []
+        self.canvas = None
 
     # ---------------- 坐标转换 ----------------
     def map_to_img(self, pos):
@@ -48,28 +50,27 @@ class SmoothViewer(QGraphicsView):
     # ---------------- 载入 ndarray ----------------
     def set_image(self, img):
         h, w = img.shape
-        qimg = QImage(img.data, w, h, w, QImage.Format_Grayscale8)
-        self.pixmap_item.setPixmap(QPixmap.fromImage(qimg))
+        for item in self.tile_items.values():
+            self.scene.removeItem(item)
+        self.tile_items = {}
+        for x, y in tiles_in_rect((0, 0, w, h), DISPLAY_TILE):
+            item = QGraphicsPixmapItem(self._tile_pixmap(img, x, y))
+            item.setOffset(x, y)
+            self.scene.addItem(item)
+            self.tile_items[(x, y)] = item
         self.setSceneRect(QRectF(0, 0, w, h))
         self.resetTransform()
 
-    # ---------------- 工具：一次画完整连续线 ----------------
-    def _stroke_line(self, img, pts, color, thickness):
-        if len(pts) < 2:
-            return
-        pts = np.array(pts, dtype=np.int32)
-        cv2.polylines(img, [pts], isClosed=False,
-                      color=color, thickness=thickness,
-                      lineType=cv2.LINE_AA)
-
     # ---------------- 鼠标事件 ----------------
     def mousePressEvent(self, ev):
         if ev.button() == Qt.LeftButton:
             x, y = self.map_to_img(ev.pos())
             if 0 <= x < self.parent.w and 0 <= y < self.parent.h:
                 self.drawing = True
-                self.parent.save_state()
-                self.temp_path = [(x, y)]
+                color = 0 if self.parent.erase_mode else 255
+                self.canvas = StrokeCanvas(self.parent.current_img, color,
+                                           self.parent.brush_size)
+                self.canvas.add_point(x, y)
         elif ev.button() == Qt.RightButton:
             self.right_dragging = True
             self.last_drag = ev.pos()
@@ -87,8 +88,7 @@ class SmoothViewer(QGraphicsView):
         elif self.drawing:
             x, y = self.map_to_img(ev.pos())
             if 0 <= x < self.parent.w and 0 <= y < self.parent.h:
-                self.temp_path.append((x, y))
-                self.draw_temp()
+                self.draw_temp(x, y)
         # 指示器
         self.mouse_pos = ev.pos()
         self.viewport().update()
@@ -98,7 +98,6 @@ class SmoothViewer(QGraphicsView):
         if ev.button() == Qt.LeftButton and self.drawing:
             self.drawing = False
             self.commit_path()
-            self.temp_path = []
         elif ev.button() == Qt.RightButton:
             self.right_dragging = False
             self.setCursor(Qt.ArrowCursor)
@@ -112,29 +111,29 @@ class SmoothViewer(QGraphicsView):
         else:
             super().wheelEvent(ev)
 
-    # ---------------- 临时绘制 ----------------
-    def draw_temp(self):
-        if len(self.temp_path) < 2:
-            return
-        img = self.parent.current_img.copy()
-        color = 0 if self.parent.erase_mode else 255
-        self._stroke_line(img, self.temp_path, color, self.parent.brush_size)
-        self._update_qpixmap(img)
+    # ---------------- 边画边显示（原地绘制，只刷新经过的分块） ----------------
+    def draw_temp(self, x, y):
+        rect = self.canvas.add_point(x, y)
+        if rect is not None:
+            self.update_rect(self.parent.current_img, rect)
 
-    # ---------------- 提交最终轨迹 ----------------
+    # ---------------- 提交最终轨迹：只记录改变的分块 ----------------
     def commit_path(self):
-        if len(self.temp_path) < 2:
+        if self.canvas is None:
             return
-        color = 0 if self.parent.erase_mode else 255
-        self._stroke_line(self.parent.current_img, self.temp_path,
-                          color, self.parent.brush_size)
-        self.parent.viewer.set_image(self.parent.current_img)
+        self.parent.history.record(self.canvas.finish())
+        self.canvas = None
 
     # ---------------- 更新显示 ----------------
-    def _update_qpixmap(self, img):
-        h, w = img.shape
-        qimg = QImage(img.data, w, h, w, QImage.Format_Grayscale8)
-        self.pixmap_item.setPixmap(QPixmap.fromImage(qimg))
+    def _tile_pixmap(self, img, x, y):
+        tile = np.ascontiguousarray(img[y:y + DISPLAY_TILE, x:x + DISPLAY_TILE])
+        h, w = tile.shape
+        qimg = QImage(tile.data, w, h, w, QImage.Format_Grayscale8)
+        return QPixmap.fromImage(qimg)
+
+    def update_rect(self, img, rect):
+        for x, y in tiles_in_rect(rect, DISPLAY_TILE):
+            self.tile_items[(x, y)].setPixmap(self._tile_pixmap(img, x, y))
 
     # ---------------- 前景指示器 ----------------
     def drawForeground(self, painter, rect):
@@ -166,8 +165,7 @@ class MainWindow(QWidget):
         self.brush_size = 10
         self.erase_mode = True
 
-        self.history = deque(maxlen=50)
-        self.redo_stack = []
+        self.history = DeltaHistory(max_strokes=50)
 
         self.init_ui()
         self.choose_folder()
@@ -231,21 +229,20 @@ class MainWindow(QWidget):
         self.files.sort()
 
     # ---------------- 撤销/重做 ----------------
-    def save_state(self):
-        self.history.append(copy.deepcopy(self.current_img))
-        self.redo_stack.clear()
-
+    # 每一笔只保存改变的分块，撤销/重做时写回并刷新这些分块
     def undo(self):
-        if self.history:
-            self.redo_stack.append(copy.deepcopy(self.current_img))
-            self.current_img = self.history.pop()
-            self.viewer.set_image(self.current_img)
+        if self.viewer.drawing:
+            return
+        rect = self.history.undo(self.current_img)
+        if rect is not None:
+            self.viewer.update_rect(self.current_img, rect)
 
     def redo(self):
-        if self.redo_stack:
-            self.history.append(copy.deepcopy(self.current_img))
-            self.current_img = self.redo_stack.pop()
-            self.viewer.set_image(self.current_img)
+        if self.viewer.drawing:
+            return
+        rect = self.history.redo(self.current_img)
+        if rect is not None:
+            self.viewer.update_rect(self.current_img, rect)
 
     # ---------------- 加载 ----------------
     def load_image(self):
@@ -257,8 +254,6 @@ class MainWindow(QWidget):
             return
         self.h, self.w = self.current_img.shape
         self.history.clear()
-        self.redo_stack.clear()
-        self.save_state()
         self.viewer.set_image(self.current_img)
         self.setWindowTitle(f"{os.path.basename(self.files[self.idx])}  ({self.idx+1}/{len(self.files)})")
 
@@ -0,0 +1,187 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 默认标定：标尺 485 mm 对应 2656 像素
+DEFAULT_RULER_MM = 485
+DEFAULT_RULER_PX = 2656
+
+# 批次标定文件名，放在结果文件所在目录或其任一上级目录中
+CALIBRATION_FILE = 'calibration.json'
+
+RESULT_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+# 换算结果的文件名后缀，查找结果文件时跳过，避免把上次的输出当作输入
+OUTPUT_SUFFIX = '_rs'
+
+# 每种量纲对应的换算指数：像素值 × (mm/px) ** 指数
+DIMENSION_POWER = {
+    'length': 1,
+    'area': 2,
+    'ratio': 0,
+}
+
+# 列名 → 量纲
+TRAIT_DIMENSIONS = {}
+
+
+def register_traits(dimension, columns):
+    """登记一组列的量纲"""
+    if dimension not in DIMENSION_POWER:
+        raise ValueError(f"未知量纲: {dimension}，可选 {list(DIMENSION_POWER)}")
+    for col in columns:
+        TRAIT_DIMENSIONS[col] = dimension
+
+
+register_traits('area', ['area', 'convex_area',
+                         'mass_1_A1', 'mass_1_A2',
+                         'mass_2_A1', 'mass_2_A2',
+                         'mass_3_A1', 'mass_3_A2'])
+register_traits('length', ['length', 'depth', 'width',
+                           'mass_1_L1', 'mass_1_L2',
+                           'mass_2_L1', 'mass_2_L2',
+                           'mass_3_L1', 'mass_3_L2'])
+register_traits('ratio', ['wdRatio', 'sturdiness',
+                          'mass_1_A_Ratio', 'mass_1_L_Ratio',
+                          'mass_2_A_Ratio', 'mass_2_L_Ratio',
+                          'mass_3_A_Ratio', 'mass_3_L_Ratio'])
+
+
+def load_calibration(path):
+    """
+    读取标定文件，返回每像素毫米数
+
+    文件内容为 {"mm_per_pixel": 0.1826} 或 {"ruler_mm": 485, "ruler_px": 2656}。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        cfg = json.load(f)
+    if 'mm_per_pixel' in cfg:
+        return float(cfg['mm_per_pixel'])
+    return float(cfg['ruler_mm']) / float(cfg['ruler_px'])
+
+
+def find_calibration(file_path, root_dir, default=DEFAULT_RULER_MM / DEFAULT_RULER_PX):
+    """从结果文件所在目录向上查找标定文件，直到 root_dir；找不到时使用默认值"""
+    folder = os.path.dirname(os.path.abspath(file_path))
+    root_dir = os.path.abspath(root_dir)
+    while True:
+        candidate = os.path.join(folder, CALIBRATION_FILE)
+        if os.path.exists(candidate):
+            return load_calibration(candidate), candidate
+        if folder == root_dir or os.path.dirname(folder) == folder:
+            return default, None
+        folder = os.path.dirname(folder)
+
+
+def convert_traits(df, mm_per_pixel=DEFAULT_RULER_MM / DEFAULT_RULER_PX, dimensions=None):
+    """
+    按量纲登记表把像素单位的性状列换算为毫米单位
+
+    每列用 pd.to_numeric 整列向量化换算；无法转换为数字的单元格保留原始值。
+    """
+    dimensions = TRAIT_DIMENSIONS if dimensions is None else dimensions
+    df = df.copy()
+    for col in df.columns:
+        dimension = dimensions.get(col)
+        if dimension is None or DIMENSION_POWER[dimension] == 0:
+            continue
+        factor = mm_per_pixel ** DIMENSION_POWER[dimension]
+        numeric = pd.to_numeric(df[col], errors='coerce')
+        bad = numeric.isna() & df[col].notna()
+        if bad.any():
+            logger.warning(f"列 {col} 有 {int(bad.sum())} 个无法转换的值，保留原始值")
+            df[col] = (numeric * factor).astype(object).where(~bad, df[col])
+        else:
+            df[col] = numeric * factor
+    return df
+
+
+def read_table(file_path):
+    """读取Excel或CSV文件为DataFrame"""
+    if file_path.lower().endswith(('.xlsx', '.xls')):
+        return pd.read_excel(file_path)
+    return pd.read_csv(file_path)
+
+
+def find_result_files(root_dir, exclude_dirs=()):
+    """
+    递归列出所有Excel/CSV结果文件
+
+    跳过 exclude_dirs（通常是保存目录）及其子目录，以及文件名以 OUTPUT_SUFFIX 结尾的换算结果。
+    """
+    excluded = {os.path.abspath(d) for d in exclude_dirs}
+    files = []
+    for folder, subfolders, filenames in os.walk(root_dir):
+        subfolders[:] = [d for d in subfolders if os.path.abspath(os.path.join(folder, d)) not in excluded]
+        for filename in sorted(filenames):
+            stem, ext = os.path.splitext(filename)
+            if ext.lower() in RESULT_EXTENSIONS and not stem.endswith(OUTPUT_SUFFIX):
+                files.append(os.path.join(folder, filename))
+    return sorted(files)
+
+
+def convert_file(file_path, root_dir):
+    """读取并换算单个文件，附加来源列，返回 (DataFrame 或 None, 错误信息)"""
+    try:
+        df = read_table(file_path)
+        if df.empty:
+            return None, "文件为空"
+        mm_per_pixel, _ = find_calibration(file_path, root_dir)
+        df = convert_traits(df, mm_per_pixel)
+        df.insert(0, 'source_file', os.path.relpath(file_path, root_dir))
+        df.insert(1, 'batch', os.path.relpath(os.path.dirname(file_path), root_dir))
+        df.insert(2, 'mm_per_pixel', mm_per_pixel)
+        return df, ''
+    except Exception as e:
+        return None, str(e)
+
+
+def convert_to_combined(root_dir, output_path, workers=None, exclude_dirs=()):
+    """
+    并发读取 root_dir 下所有结果文件，换算单位后合并写入一个 CSV 或 Parquet 文件
+
+    保存目录在 root_dir 内时应放入 exclude_dirs，以免读入其中的其他输出。返回合并后的行数。
+    """
+    files = [f for f in find_result_files(root_dir, exclude_dirs)
+             if os.path.abspath(f) != os.path.abspath(output_path)]
+    if not files:
+        logger.warning(f"目录中没有结果文件: {root_dir}")
+        return 0
+
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = [convert_file(f, root_dir) for f in files]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(convert_file, files, [root_dir] * len(files), chunksize=16))
+
+    frames = []
+    for file_path, (df, err) in zip(files, results):
+        if df is None:
+            logger.warning(f"跳过 {file_path}: {err}")
+        else:
+            frames.append(df)
+    if not frames:
+        return 0
+
+    combined = pd.concat(frames, ignore_index=True, sort=False)
+    combined = combined.loc[:, ~combined.columns.astype(str).str.startswith('Unnamed')]
+
+    out_dir = os.path.dirname(output_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    if output_path.lower().endswith('.parquet'):
+        combined.to_parquet(output_path, index=False)
+    else:
+        combined.to_csv(output_path, index=False, encoding='utf-8')
+
+    logger.info(f"合并 {len(frames)} 个文件共 {len(combined)} 行，耗时 {time.perf_counter() - start:.1f}s，"
+                f"已保存到: {output_path}")
+    return len(combined)
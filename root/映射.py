@@ -2,6 +2,9 @@ import os
 import pandas as pd
 import logging
 
+from 性状单位转换 import (DEFAULT_RULER_MM, DEFAULT_RULER_PX, OUTPUT_SUFFIX, TRAIT_DIMENSIONS,
+                        convert_traits, convert_to_combined, find_calibration, find_result_files)
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -26,53 +29,24 @@ def read_data(file_path):
         return pd.DataFrame()
 
 
-def process_column_value(value, is_area):
-    """处理单列值"""
-    try:
-        value = float(value)
-        return (value * 485 * 485) / (2656 * 2656) if is_area else (value * 485) / 2656
-    except (ValueError, TypeError):
-        logger.warning(f"无法转换值 '{value}'，保留原始值")
-        return value
-
-
-def process_dataframe(df):
-    """处理整个DataFrame"""
+def process_dataframe(df, mm_per_pixel=DEFAULT_RULER_MM / DEFAULT_RULER_PX):
+    """处理整个DataFrame，按 性状单位转换.TRAIT_DIMENSIONS 登记的量纲整列换算"""
     if df.empty:
         logger.warning("收到空DataFrame，跳过处理")
         return df
 
-    # 定义需要处理的列及其类型
-    AREA_COLS = ['area', 'convex_area',
-                 'mass_1_A1', 'mass_1_A2',
-                 'mass_2_A1', 'mass_2_A2',
-                 'mass_3_A1', 'mass_3_A2']
-
-    LENGTH_COLS = ['length', 'depth', 'width',
-                   'mass_1_L1', 'mass_1_L2',
-                   'mass_2_L1', 'mass_2_L2',
-                   'mass_3_L1', 'mass_3_L2']
-
     # 查找数据中实际存在的列名
-    actual_area_cols = [col for col in df.columns if col in AREA_COLS]
-    actual_length_cols = [col for col in df.columns if col in LENGTH_COLS]
+    actual_area_cols = [col for col in df.columns if TRAIT_DIMENSIONS.get(col) == 'area']
+    actual_length_cols = [col for col in df.columns if TRAIT_DIMENSIONS.get(col) == 'length']
 
     logger.info(f"找到的面积列: {actual_area_cols}")
     logger.info(f"找到的长度列: {actual_length_cols}")
 
-    # 处理面积列
-    for col in actual_area_cols:
-        df[col] = df[col].apply(lambda x: process_column_value(x, is_area=True))
-
-    # 处理长度列
-    for col in actual_length_cols:
-        df[col] = df[col].apply(lambda x: process_column_value(x, is_area=False))
-
-    return df
+    return convert_traits(df, mm_per_pixel)
 
 
 def convert_files(root_dir, save_dir):
-    """转换指定目录中的所有Excel和CSV文件"""
+    """转换指定目录中的所有Excel和CSV文件，跳过保存目录和已换算的 *_rs 文件"""
     if not os.path.exists(root_dir):
         logger.error(f"源目录不存在: {root_dir}")
         return 0
@@ -80,33 +54,32 @@ def convert_files(root_dir, save_dir):
     os.makedirs(save_dir, exist_ok=True)
     processed_count = 0
 
-    for foldername, subfolders, filenames in os.walk(root_dir):
-        for filename in filenames:
-            if not filename.lower().endswith(('.xlsx', '.xls', '.csv')):
-                continue
-
-            file_path = os.path.join(foldername, filename)
-            logger.info(f"开始处理: {file_path}")
-
-            df = read_data(file_path)
-            if df.empty:
-                logger.warning(f"文件为空或读取失败，跳过: {file_path}")
-                continue
-
-            try:
-                # 处理数据
-                processed_df = process_dataframe(df)
-
-                # 准备保存路径，添加"_rs"后缀
-                base_name = os.path.splitext(filename)[0]
-                save_path = os.path.join(save_dir, f"{base_name}_rs.csv")
-
-                # 保存为CSV
-                processed_df.to_csv(save_path, index=False, encoding='utf-8')
-                logger.info(f"已保存到: {save_path}")
-                processed_count += 1
-            except Exception as e:
-                logger.error(f"处理文件 {filename} 时出错: {e}")
+    for file_path in find_result_files(root_dir, exclude_dirs=[save_dir]):
+        filename = os.path.basename(file_path)
+        logger.info(f"开始处理: {file_path}")
+
+        df = read_data(file_path)
+        if df.empty:
+            logger.warning(f"文件为空或读取失败，跳过: {file_path}")
+            continue
+
+        try:
+            # 处理数据，标定系数取自所在批次目录的 calibration.json
+            mm_per_pixel, calibration_path = find_calibration(file_path, root_dir)
+            if calibration_path:
+                logger.info(f"使用标定文件: {calibration_path}")
+            processed_df = process_dataframe(df, mm_per_pixel)
+
+            # 准备保存路径，添加"_rs"后缀
+            base_name = os.path.splitext(filename)[0]
+            save_path = os.path.join(save_dir, f"{base_name}{OUTPUT_SUFFIX}.csv")
+
+            # 保存为CSV
+            processed_df.to_csv(save_path, index=False, encoding='utf-8')
+            logger.info(f"已保存到: {save_path}")
+            processed_count += 1
+        except Exception as e:
+            logger.error(f"处理文件 {filename} 时出错: {e}")
 
     return processed_count
 
@@ -116,6 +89,14 @@ if __name__ == '__main__':
     ROOT_DIR = r'H:\lmw_python_pr\root\PaddleSeg\cotton_results'
     SAVE_DIR = r'H:\lmw_python_pr\root\PaddleSeg\cotton_results\info_result'
 
+    # True 时并发读取所有文件，合并写入一个表（.parquet 需要 pyarrow）
+    COMBINED = False
+    COMBINED_PATH = os.path.join(SAVE_DIR, 'all_traits_rs.csv')
+
     logger.info(f"开始处理目录: {ROOT_DIR}")
-    count = convert_files(ROOT_DIR, SAVE_DIR)
-    logger.info(f"处理完成! 共转换 {count} 个文件")
\ No newline at end of file
+    if COMBINED:
+        rows = convert_to_combined(ROOT_DIR, COMBINED_PATH, exclude_dirs=[SAVE_DIR])
+        logger.info(f"处理完成! 共合并 {rows} 行")
+    else:
+        count = convert_files(ROOT_DIR, SAVE_DIR)
+        logger.info(f"处理完成! 共转换 {count} 个文件")
@@ -0,0 +1,164 @@
+"""
+二值图编辑器的笔画绘制与增量撤销，不依赖界面
+
+原编辑器每次移动鼠标都拷贝整幅图像重画整条轨迹，每一笔都 deepcopy 整幅图像存入撤销栈，
+8k 掩膜上既卡顿又占用数GB内存。这里改为：
+    StrokeCanvas：在图像上原地绘制，只在第一次碰到某个分块时保存它的原值；每次移动只把
+                  已碰到的分块恢复后重画轨迹，结果与整幅拷贝后重画完全一致，
+                  返回本次可能改变的矩形，界面只需刷新该区域
+    DeltaHistory：一笔结束后只保存确实改变了的分块的前后值，撤销/重做时写回这些分块
+
+回放基准见 填补_回放基准.py。
+"""
+
+from collections import deque
+
+import cv2
+import numpy as np
+
+DELTA_TILE = 128
+
+
+def segment_rect(p, q, thickness, shape):
+    """线段 p-q 以 thickness 绘制时可能改变的矩形 (x0, y0, x1, y1)，右下不含，已裁到图像内"""
+    margin = thickness // 2 + 2
+    h, w = shape[:2]
+    x0 = max(min(p[0], q[0]) - margin, 0)
+    y0 = max(min(p[1], q[1]) - margin, 0)
+    x1 = min(max(p[0], q[0]) + margin + 1, w)
+    y1 = min(max(p[1], q[1]) + margin + 1, h)
+    return x0, y0, x1, y1
+
+
+def tiles_in_rect(rect, tile):
+    """与矩形相交的分块左上角坐标 [(x, y), ...]"""
+    x0, y0, x1, y1 = rect
+    if x1 <= x0 or y1 <= y0:
+        return []
+    return [(x, y)
+            for y in range(y0 // tile * tile, y1, tile)
+            for x in range(x0 // tile * tile, x1, tile)]
+
+
+def draw_stroke(img, pts, color, thickness):
+    """一次画完整条连续轨迹，与编辑器原 _stroke_line 相同"""
+    if len(pts) < 2:
+        return
+    cv2.polylines(img, [np.asarray(pts, dtype=np.int32)], isClosed=False,
+                  color=color, thickness=thickness, lineType=cv2.LINE_AA)
+
+
+class StrokeCanvas:
+    """
+    在 img 上原地绘制一笔
+
+    img: 二维 uint8 图像，会被直接修改
+    color: 0（擦除）或 255（填补）
+    """
+
+    def __init__(self, img, color, thickness, tile=DELTA_TILE):
+        self.img = img
+        self.color = color
+        self.thickness = thickness
+        self.tile = tile
+        self.points = []
+        self.before = {}
+
+    def _snapshot(self, rect):
+        t = self.tile
+        for x, y in tiles_in_rect(rect, t):
+            if (x, y) not in self.before:
+                self.before[(x, y)] = self.img[y:y + t, x:x + t].copy()
+
+    def add_point(self, x, y):
+        """加入一个轨迹点并重画，返回需要刷新的矩形，没有变化时返回 None"""
+        self.points.append((x, y))
+        if len(self.points) < 2:
+            return None
+        rect = segment_rect(self.points[-2], self.points[-1], self.thickness, self.img.shape)
+        self._snapshot(rect)
+        # 已碰到的分块恢复为落笔前的值后整条重画，抗锯齿边缘不会重复叠加
+        t = self.tile
+        for (tx, ty), patch in self.before.items():
+            self.img[ty:ty + t, tx:tx + t] = patch
+        draw_stroke(self.img, self.points, self.color, self.thickness)
+        return rect
+
+    def finish(self):
+        """结束这一笔，返回确实改变了的分块 [(x, y, 原值, 新值), ...]"""
+        t = self.tile
+        delta = []
+        for (x, y), patch in self.before.items():
+            after = self.img[y:y + t, x:x + t]
+            if not np.array_equal(patch, after):
+                delta.append((x, y, patch, after.copy()))
+        self.before = {}
+        return delta
+
+
+def delta_rect(delta):
+    """一笔改变的分块的外接矩形 (x0, y0, x1, y1)，右下不含"""
+    x0 = min(x for x, _, _, _ in delta)
+    y0 = min(y for _, y, _, _ in delta)
+    x1 = max(x + before.shape[1] for x, _, before, _ in delta)
+    y1 = max(y + before.shape[0] for _, y, before, _ in delta)
+    return x0, y0, x1, y1
+
+
+class DeltaHistory:
+    """
+    按笔画保存分块差异的撤销/重做栈
+
+    max_strokes: 最多保留的笔画数
+    max_bytes: 撤销栈中分块占用的字节上限，超出时丢弃最早的笔画
+    """
+
+    def __init__(self, max_strokes=50, max_bytes=256 * 1024 ** 2):
+        self.max_strokes = max_strokes
+        self.max_bytes = max_bytes
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.nbytes = 0
+
+    @staticmethod
+    def _size(delta):
+        return sum(before.nbytes + after.nbytes for _, _, before, after in delta)
+
+    def _push(self, delta):
+        self.undo_stack.append(delta)
+        self.nbytes += self._size(delta)
+        while self.undo_stack and (len(self.undo_stack) > self.max_strokes or self.nbytes > self.max_bytes):
+            self.nbytes -= self._size(self.undo_stack.popleft())
+
+    def record(self, delta):
+        """记录一笔，空笔画不记录；新的一笔会清空重做栈"""
+        if not delta:
+            return
+        self._push(delta)
+        self.redo_stack.clear()
+
+    def undo(self, img):
+        """把最近一笔改变的分块写回原值，返回需要刷新的矩形，没有可撤销的笔画时返回 None"""
+        if not self.undo_stack:
+            return None
+        delta = self.undo_stack.pop()
+        self.nbytes -= self._size(delta)
+        for x, y, before, _ in delta:
+            img[y:y + before.shape[0], x:x + before.shape[1]] = before
+        self.redo_stack.append(delta)
+        return delta_rect(delta)
+
+    def redo(self, img):
+        """重新应用最近撤销的一笔，返回需要刷新的矩形"""
+        if not self.redo_stack:
+            return None
+        delta = self.redo_stack.pop()
+        for x, y, _, after in delta:
+            img[y:y + after.shape[0], x:x + after.shape[1]] = after
+        self._push(delta)
+        return delta_rect(delta)
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.nbytes = 0
@@ -7,7 +7,8 @@
 import os
 import tempfile
 import shutil
-from root.图像拼接L版 import pinjie
+import time
+from root.图像拼接L版 import pinjie, OutputCodec
 
 def test_filename_generation():
     """测试文件名生成功能"""
@@ -71,6 +72,51 @@ def test_filename_generation():
             print(f"❌ 测试失败: {e}")
             return False
 
+def test_throughput_benchmark(n_groups=8, height=600):
+    """拼接吞吐量基准：原串行无压缩写法 vs 并行+压缩，并验证重复运行会跳过未变化的输入"""
+    print("🧪 图像拼接吞吐量基准")
+
+    import numpy as np
+    import cv2
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        test_root = os.path.join(temp_dir, "bench_cotton")
+        # 平滑渐变加轻微噪声，比纯随机噪声更接近真实照片的可压缩性
+        rng = np.random.default_rng(0)
+        yy, xx = np.mgrid[0:height, 0:4000]
+        img = np.dstack([(xx // 16) % 256, (yy // 4) % 256, ((xx + yy) // 32) % 256]).astype(np.uint8)
+        img = cv2.add(img, rng.integers(0, 8, img.shape, dtype=np.uint8))
+        for i in range(n_groups):
+            sample_dir = os.path.join(test_root, f"sample{i:03d}")
+            os.makedirs(sample_dir, exist_ok=True)
+            cv2.imwrite(os.path.join(sample_dir, "img1.jpg"), img)
+            cv2.imwrite(os.path.join(sample_dir, "img2.jpg"), img[:, ::-1])
+
+        results = {}
+        for name, kwargs in [
+            ("串行, PNG压缩0", dict(workers=1, codec=OutputCodec('.png', 0))),
+            ("并行, PNG压缩3", dict(codec=OutputCodec('.png', 3))),
+            ("并行, JPG质量95", dict(codec=OutputCodec('.jpg', 95))),
+        ]:
+            output_dir = os.path.join(temp_dir, f"out_{len(results)}")
+            start = time.perf_counter()
+            stats = pinjie(test_root, output_dir, **kwargs)
+            elapsed = time.perf_counter() - start
+            out_size = sum(os.path.getsize(os.path.join(r, f))
+                           for r, _, fs in os.walk(output_dir) for f in fs)
+            results[name] = (elapsed, out_size)
+            assert stats['done'] == n_groups
+
+            # 输入未变化时重复运行应全部跳过
+            rerun = pinjie(test_root, output_dir, **kwargs)
+            assert rerun['done'] == 0 and rerun['skipped'] == n_groups
+
+        print(f"\n{'方案':<16}{'耗时(s)':>10}{'组/秒':>10}{'输出(MB)':>12}")
+        for name, (elapsed, out_size) in results.items():
+            print(f"{name:<16}{elapsed:>10.2f}{n_groups / elapsed:>10.1f}{out_size / 1e6:>12.1f}")
+
+
 if __name__ == "__main__":
     test_filename_generation()
+    test_throughput_benchmark()
     print("\n✅ 测试完成！")
\ No newline at end of file
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试标签统计的分位数：没有白板时按原始值的范围建直方图，有白板时按反射率 [0, 1]
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '高光谱'))
+from 标签统计 import label_statistics
+from 高光谱读写 import create_envi
+
+
+def write_cube(path, array, dtype=np.uint16):
+    """把 (lines, samples, bands) 数组写成ENVI数据"""
+    lines, samples, bands = array.shape
+    cube = create_envi(path, lines, samples, bands, dtype=dtype, interleave='bil')
+    cube.view()[:] = array
+    cube.flush()
+    return path
+
+
+@pytest.fixture
+def raw_cube(tmp_path):
+    rng = np.random.default_rng(0)
+    means = np.array([2000, 2050, 2100, 2000, 2150])
+    array = rng.normal(means, 150, (60, 40, 5)).clip(0, 65535).astype(np.uint16)
+    labels = np.zeros((60, 40), dtype=np.int32)
+    labels[5:30, 3:20] = 1
+    labels[35:55, 10:38] = 2
+    return write_cube(str(tmp_path / 'raw.hdr'), array), array, labels
+
+
+def expected_quantiles(array, labels, label, q):
+    return np.quantile(array[labels == label].astype(np.float64), q, axis=0)
+
+
+def test_uncalibrated_quantiles_use_data_range(raw_cube):
+    path, array, labels = raw_cube
+    df = label_statistics(path, labels, block_lines=7)
+    for label in (1, 2):
+        rows = df[df['label'] == label]
+        width = (array[labels > 0].max(axis=0) - array[labels > 0].min(axis=0)) / 512
+        for column, q in (('q25', 0.25), ('median', 0.5), ('q75', 0.75)):
+            expected = expected_quantiles(array, labels, label, q)
+            assert np.all(np.abs(rows[column].to_numpy() - expected) <= width + 1e-6), column
+        assert np.allclose(rows['mean'], array[labels == label].mean(axis=0))
+
+
+def test_explicit_value_range_is_kept(raw_cube):
+    path, array, labels = raw_cube
+    df = label_statistics(path, labels, value_range=(0, 65536), bins=65536)
+    rows = df[df['label'] == 1]
+    assert np.allclose(rows['median'], expected_quantiles(array, labels, 1, 0.5), atol=1)
+
+
+def test_calibrated_quantiles_use_unit_range(raw_cube, tmp_path):
+    path, array, labels = raw_cube
+    white = write_cube(str(tmp_path / 'white.hdr'), np.full((4, 40, 5), 4000, dtype=np.uint16))
+    df = label_statistics(path, labels, white_path=white)
+    rows = df[df['label'] == 2]
+    expected = expected_quantiles(array / 4000.0, labels, 2, 0.5)
+    assert np.all(np.abs(rows['median'].to_numpy() - expected) <= 1 / 512 + 1e-6)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试株高提取的直方图聚类与原 sklearn KMeans 结果一致
+"""
+
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '高光谱'))
+from 株高提取 import depth_histogram, kmeans_1d, middle_cluster_depth
+
+KMeans = pytest.importorskip('sklearn.cluster').KMeans
+
+
+def make_depths(rng, means, proportions, total=10000, std=5):
+    """按比例生成几类深度值（毫米，uint16）"""
+    counts = [max(1, int(total * p)) for p in proportions]
+    values = np.concatenate([rng.normal(m, std, c) for m, c in zip(means, counts)])
+    return values.clip(0).round().astype(np.uint16)
+
+
+def sklearn_middle_depth(values, seeds=range(5)):
+    """原界面版的做法：KMeans(3) 聚类后取中间一类的均值，多个随机种子取误差最小的一次"""
+    x = values.reshape(-1, 1).astype(np.float64)
+    km = min((KMeans(3, n_init=1, random_state=s).fit(x) for s in seeds), key=lambda k: k.inertia_)
+    middle = np.argsort(km.cluster_centers_.ravel())[1]
+    return values[km.labels_ == middle].mean()
+
+
+def inertia(hist, centers, intervals):
+    depths = np.arange(len(hist))
+    return sum((hist[a:b] * (depths[a:b] - c) ** 2).sum() for c, (a, b) in zip(centers, intervals))
+
+
+@pytest.mark.parametrize('means, proportions', [
+    ((1000, 1500, 1750), (0.6, 0.3, 0.1)),
+    ((1000, 1500, 1750), (0.1, 0.3, 0.6)),
+    ((800, 1300, 1400), (0.05, 0.9, 0.05)),
+    ((900, 1200, 1700), (0.9, 0.08, 0.02)),
+    ((1100, 1600, 1650), (0.02, 0.18, 0.8)),
+])
+def test_unbalanced_clusters_match_sklearn(means, proportions):
+    """某一类占大多数时也不能把这一类拆开"""
+    rng = np.random.default_rng(0)
+    values = make_depths(rng, means, proportions)
+    assert abs(middle_cluster_depth(values) - sklearn_middle_depth(values)) < 0.01
+    assert abs(middle_cluster_depth(values) - means[1]) < 2
+
+
+def test_global_optimum_not_worse_than_sklearn():
+    """随机的重叠分布上，误差平方和不大于 sklearn 多次初始化的最好结果"""
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        means = np.sort(rng.uniform(400, 2000, 3))
+        values = make_depths(rng, means, rng.dirichlet([1, 1, 1]), total=int(rng.integers(300, 5000)),
+                             std=float(rng.uniform(2, 60)))
+        hist = depth_histogram(values)
+        centers, intervals = kmeans_1d(hist)
+        x = values.reshape(-1, 1).astype(np.float64)
+        best = min(KMeans(3, n_init=1, random_state=s).fit(x).inertia_ for s in range(5))
+        assert inertia(hist, centers, intervals) <= best * (1 + 1e-9)
+
+
+def test_matches_exhaustive_search():
+    """少量非空深度时枚举所有切分点，误差平方和与穷举的最优值相同"""
+    rng = np.random.default_rng(2)
+    for _ in range(200):
+        n = int(rng.integers(3, 25))
+        hist = np.zeros(int(rng.integers(n, 60)), dtype=np.int64)
+        depths = np.sort(rng.choice(len(hist), n, replace=False))
+        hist[depths] = rng.integers(1, 30, n)
+        d = np.arange(len(hist))
+        best = np.inf
+        for a, b in itertools.combinations(depths[1:], 2):
+            intervals = [(0, a), (a, b), (b, len(hist))]
+            centers = [(hist[x:y] * d[x:y]).sum() / hist[x:y].sum() for x, y in intervals]
+            best = min(best, inertia(hist, centers, intervals))
+        centers, intervals = kmeans_1d(hist)
+        assert inertia(hist, centers, intervals) == pytest.approx(best, rel=1e-9, abs=1e-6)
+
+
+def test_wide_range_box_is_fast():
+    """1000x200 的框、上万个不同深度时，每个框的聚类远快于原来的 sklearn KMeans"""
+    rng = np.random.default_rng(3)
+    values = make_depths(rng, (3000, 6000, 8750), (0.3, 0.5, 0.2), total=200000, std=1000)
+    assert np.count_nonzero(depth_histogram(values)) > 9000
+    middle_cluster_depth(values)
+    start = time.perf_counter()
+    for _ in range(10):
+        middle_cluster_depth(values)
+    elapsed = (time.perf_counter() - start) / 10
+    start = time.perf_counter()
+    KMeans(3, n_init=1, random_state=0).fit(values.reshape(-1, 1).astype(np.float64))
+    sklearn_elapsed = time.perf_counter() - start
+    assert elapsed < 0.05
+    assert elapsed < sklearn_elapsed
+
+
+def test_few_depths():
+    """非空深度少于类数时返回全部像素的平均深度"""
+    values = np.array([1000, 1000, 1200], dtype=np.uint16)
+    assert middle_cluster_depth(values) == pytest.approx(3200 / 3)
+    hist = depth_histogram(values)
+    centers, intervals = kmeans_1d(hist)
+    assert len(centers) == 2
+    assert intervals[0][0] == 0 and intervals[-1][1] == len(hist)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试行分割的行投影分割线与原界面版逐行扫描一致
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip('skimage')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '高光谱'))
+from 行分割 import detect_gap_lines
+
+
+def detect_auto_lines(pruned):
+    """原 2-2单行掩膜图像-优化.py 中的逐行扫描实现"""
+    boundaries = []
+    current_bound = None
+    for y in range(pruned.shape[0]):
+        if np.all(pruned[y, :] == 0):
+            if current_bound is None:
+                current_bound = [y, y]
+            else:
+                current_bound[1] = y
+        else:
+            if current_bound is not None:
+                boundaries.append(tuple(current_bound))
+                current_bound = None
+
+    auto_lines = []
+    for (upper, lower) in boundaries:
+        center_y = (upper + lower) // 2
+        region = pruned[upper:lower, :]
+        with np.errstate(invalid='ignore'):
+            if np.mean(region) <= 5:
+                auto_lines.append(center_y)
+    return auto_lines
+
+
+def random_pruned(rng, height, width, empty_ratio):
+    """每行以 empty_ratio 的概率全为0，其余行有少量前景像素"""
+    pruned = np.zeros((height, width), dtype=np.uint8)
+    rows = np.flatnonzero(rng.random(height) >= empty_ratio)
+    for y in rows:
+        pruned[y, rng.integers(0, width, int(rng.integers(1, 4)))] = 255
+    return pruned
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_random_masks_match_old_loop():
+    rng = np.random.default_rng(0)
+    for i in range(300):
+        height = int(rng.integers(1, 200))
+        pruned = random_pruned(rng, height, int(rng.integers(1, 50)), rng.uniform(0, 1))
+        assert detect_gap_lines(pruned) == detect_auto_lines(pruned), i
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+@pytest.mark.parametrize('empty_rows, expected', [
+    ([], []),
+    ([3], []),              # 只有一行的空白段不是分割线
+    ([3, 4], [3]),
+    ([0, 1, 2], [1]),       # 从第一行开始的空白段
+    ([8, 9], []),           # 延伸到最后一行的空白段不算
+    ([2, 3, 4, 5, 6], [4]),
+    (list(range(10)), []),  # 全空
+])
+def test_edge_cases(empty_rows, expected):
+    pruned = np.full((10, 5), 255, dtype=np.uint8)
+    pruned[empty_rows] = 0
+    assert detect_gap_lines(pruned) == expected
+    assert detect_auto_lines(pruned) == expected
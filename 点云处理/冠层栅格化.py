@@ -0,0 +1,239 @@
+import numpy as np
+from scipy import ndimage
+from typing import Iterable, Optional, Tuple
+
+
+class GridGeometry:
+    """规则栅格的几何描述：原点、分辨率和形状
+
+    单元 (row, col) 覆盖 [x0 + col*res, x0 + (col+1)*res) × [y0 + row*res, y0 + (row+1)*res)，
+    与原先逐单元循环版本的网格划分一致。
+    """
+
+    def __init__(self, origin: Tuple[float, float], resolution: float, shape: Tuple[int, int]):
+        if resolution <= 0:
+            raise ValueError(f"分辨率必须为正数: {resolution}")
+        self.origin = (float(origin[0]), float(origin[1]))
+        self.resolution = float(resolution)
+        self.shape = (int(shape[0]), int(shape[1]))
+
+    @classmethod
+    def from_bounds(cls, xy_min: Tuple[float, float], xy_max: Tuple[float, float],
+                    resolution: float, margin: float = 1.0) -> 'GridGeometry':
+        """根据点云XY范围创建网格，四周各外扩 margin"""
+        x_min, y_min = xy_min[0] - margin, xy_min[1] - margin
+        x_max, y_max = xy_max[0] + margin, xy_max[1] + margin
+        # 与 np.arange(x_min, x_max, resolution) 的长度保持一致
+        n_cols = int(np.ceil((x_max - x_min) / resolution))
+        n_rows = int(np.ceil((y_max - y_min) / resolution))
+        return cls((x_min, y_min), resolution, (n_rows, n_cols))
+
+    @classmethod
+    def from_points(cls, points: np.ndarray, resolution: float, margin: float = 1.0) -> 'GridGeometry':
+        """根据点坐标数组创建网格"""
+        return cls.from_bounds(np.min(points[:, :2], axis=0), np.max(points[:, :2], axis=0),
+                               resolution, margin)
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[np.ndarray], resolution: float, margin: float = 1.0) -> 'GridGeometry':
+        """流式扫描一遍分块点云，只统计XY范围后创建网格"""
+        xy_min = np.array([np.inf, np.inf])
+        xy_max = np.array([-np.inf, -np.inf])
+        for chunk in chunks:
+            if len(chunk) == 0:
+                continue
+            xy_min = np.minimum(xy_min, np.min(chunk[:, :2], axis=0))
+            xy_max = np.maximum(xy_max, np.max(chunk[:, :2], axis=0))
+        if not np.all(np.isfinite(xy_min)):
+            raise ValueError("点云为空，无法确定网格范围")
+        return cls.from_bounds(xy_min, xy_max, resolution, margin)
+
+    @property
+    def size(self) -> int:
+        return self.shape[0] * self.shape[1]
+
+    def cell_rows_cols(self, xy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """向量化计算每个点所在的行列号（可能越界）"""
+        cols = np.floor((xy[:, 0] - self.origin[0]) / self.resolution).astype(np.int64)
+        rows = np.floor((xy[:, 1] - self.origin[1]) / self.resolution).astype(np.int64)
+        return rows, cols
+
+    def cell_index(self, xy: np.ndarray) -> np.ndarray:
+        """向量化计算每个点的扁平单元索引，网格外的点记为 -1"""
+        rows, cols = self.cell_rows_cols(xy)
+        inside = (rows >= 0) & (rows < self.shape[0]) & (cols >= 0) & (cols < self.shape[1])
+        return np.where(inside, rows * self.shape[1] + cols, -1)
+
+    def __repr__(self) -> str:
+        return f"GridGeometry(origin={self.origin}, resolution={self.resolution}, shape={self.shape})"
+
+
+class GridBinner:
+    """单遍分箱统计引擎：一次扫描得到每个单元的 max/min/mean/count
+
+    支持多次调用 add() 累加分块点云，因此可以处理超出内存的点云。
+    """
+
+    def __init__(self, geometry: GridGeometry):
+        self.geometry = geometry
+        n = geometry.size
+        self._count = np.zeros(n, dtype=np.int64)
+        self._sum = np.zeros(n, dtype=np.float64)
+        self._max = np.full(n, -np.inf, dtype=np.float64)
+        self._min = np.full(n, np.inf, dtype=np.float64)
+
+    def add(self, points: np.ndarray) -> None:
+        """累加一块点 (N, 3)，网格外的点被忽略"""
+        if len(points) == 0:
+            return
+        idx = self.geometry.cell_index(points[:, :2])
+        valid = idx >= 0
+        if not np.all(valid):
+            idx = idx[valid]
+            z = points[valid, 2]
+        else:
+            z = points[:, 2]
+        z = np.asarray(z, dtype=np.float64)
+
+        n = self.geometry.size
+        self._count += np.bincount(idx, minlength=n)
+        self._sum += np.bincount(idx, weights=z, minlength=n)
+        np.maximum.at(self._max, idx, z)
+        np.minimum.at(self._min, idx, z)
+
+    def add_chunks(self, chunks: Iterable[np.ndarray]) -> 'GridBinner':
+        for chunk in chunks:
+            self.add(chunk)
+        return self
+
+    def _reshape(self, flat: np.ndarray) -> np.ndarray:
+        return flat.reshape(self.geometry.shape)
+
+    @property
+    def count(self) -> np.ndarray:
+        return self._reshape(self._count.copy())
+
+    @property
+    def empty(self) -> np.ndarray:
+        """没有任何点落入的单元"""
+        return self._reshape(self._count == 0)
+
+    def max(self) -> np.ndarray:
+        """每个单元的最高点，空单元为 NaN"""
+        out = self._max.copy()
+        out[self._count == 0] = np.nan
+        return self._reshape(out)
+
+    def min(self) -> np.ndarray:
+        """每个单元的最低点，空单元为 NaN"""
+        out = self._min.copy()
+        out[self._count == 0] = np.nan
+        return self._reshape(out)
+
+    def mean(self) -> np.ndarray:
+        """每个单元的平均高度，空单元为 NaN"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out = self._sum / self._count
+        out[self._count == 0] = np.nan
+        return self._reshape(out)
+
+
+def fill_empty_cells(grid: np.ndarray, sigma: float = 1.0, fill_value: float = 0.0) -> np.ndarray:
+    """用归一化高斯卷积插值填充 NaN 空洞
+
+    只有有效单元参与加权，远离数据（权重为0）的单元填充为 fill_value。
+    """
+    grid = np.asarray(grid, dtype=np.float64)
+    empty = np.isnan(grid)
+    if not np.any(empty):
+        return grid.copy()
+
+    valid = (~empty).astype(np.float64)
+    values = np.where(empty, 0.0, grid)
+    num = ndimage.gaussian_filter(values, sigma=sigma, mode='nearest')
+    den = ndimage.gaussian_filter(valid, sigma=sigma, mode='nearest')
+
+    filled = grid.copy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        interp = num / den
+    interp[den < 1e-6] = fill_value
+    filled[empty] = interp[empty]
+    return filled
+
+
+def rasterize_max_height(points: Optional[np.ndarray] = None,
+                         resolution: float = 0.1,
+                         geometry: Optional[GridGeometry] = None,
+                         chunks: Optional[Iterable[np.ndarray]] = None,
+                         fill: bool = True,
+                         sigma: float = 1.0) -> Tuple[np.ndarray, GridGeometry]:
+    """生成最高点栅格(CHM)
+
+    传入 points 时一次性处理；传入 chunks 时逐块累加（此时需给定 geometry，
+    或先用 GridGeometry.from_chunks 扫描一遍范围）。
+    """
+    if points is None and chunks is None:
+        raise ValueError("必须提供 points 或 chunks")
+    if geometry is None:
+        if points is None:
+            raise ValueError("分块模式下必须提供 geometry")
+        geometry = GridGeometry.from_points(points, resolution)
+
+    binner = GridBinner(geometry)
+    if points is not None:
+        binner.add(points)
+    if chunks is not None:
+        binner.add_chunks(chunks)
+
+    chm = binner.max()
+    if fill:
+        chm = fill_empty_cells(chm, sigma=sigma)
+    return chm, geometry
+
+
+class GroupIndex:
+    """按整数键（单元号、树编号等）排序的点索引
+
+    构建一次 O(N log N)，之后取任意键的点子集只是排序索引上的一段切片。
+    """
+
+    def __init__(self, keys: np.ndarray, n_groups: Optional[int] = None):
+        keys = np.asarray(keys, dtype=np.int64)
+        valid = keys >= 0
+        if n_groups is None:
+            n_groups = int(keys[valid].max()) + 1 if np.any(valid) else 0
+        self.n_groups = n_groups
+        self.order = np.argsort(np.where(valid, keys, n_groups), kind='stable')
+        counts = np.bincount(keys[valid], minlength=n_groups)
+        self.offsets = np.zeros(n_groups + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+
+    @classmethod
+    def from_cells(cls, geometry: GridGeometry, xy: np.ndarray) -> 'GroupIndex':
+        """按点所在网格单元建立索引"""
+        return cls(geometry.cell_index(xy), geometry.size)
+
+    def counts(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def indices(self, key: int) -> np.ndarray:
+        """返回键为 key 的所有点在原数组中的下标（视图，不复制）"""
+        if key < 0 or key >= self.n_groups:
+            return self.order[:0]
+        return self.order[self.offsets[key]:self.offsets[key + 1]]
+
+    def __iter__(self):
+        """依次产出 (键, 下标)，跳过空组"""
+        for key in np.flatnonzero(self.counts()):
+            yield int(key), self.indices(key)
+
+
+def sample_grid(grid: np.ndarray, geometry: GridGeometry, xy: np.ndarray, fill_value=0) -> np.ndarray:
+    """向量化地取出每个点所在单元的栅格值，网格外的点为 fill_value"""
+    if grid.shape != geometry.shape:
+        raise ValueError(f"栅格形状 {grid.shape} 与网格几何 {geometry.shape} 不一致")
+    idx = geometry.cell_index(xy)
+    out = np.full(len(idx), fill_value, dtype=grid.dtype)
+    inside = idx >= 0
+    out[inside] = grid.ravel()[idx[inside]]
+    return out
@@ -0,0 +1,77 @@
+import argparse
+import time
+
+import numpy as np
+
+from 冠层栅格化 import GridGeometry, GridBinner, rasterize_max_height
+
+
+def legacy_chm_rows(points: np.ndarray, resolution: float, max_rows: int) -> tuple:
+    """原逐单元循环实现，只计算前 max_rows 行，返回 (耗时, 已算行数, 总行数)"""
+    x_min, y_min = np.min(points[:, :2], axis=0) - 1
+    x_max, y_max = np.max(points[:, :2], axis=0) + 1
+    x_grid = np.arange(x_min, x_max, resolution)
+    y_grid = np.arange(y_min, y_max, resolution)
+    chm = np.zeros((len(y_grid), len(x_grid)))
+
+    n_rows = min(max_rows, len(y_grid))
+    start = time.perf_counter()
+    for i in range(n_rows):
+        for j in range(len(x_grid)):
+            mask = (points[:, 0] >= x_grid[j]) & (points[:, 0] < x_grid[j] + resolution) & \
+                   (points[:, 1] >= y_grid[i]) & (points[:, 1] < y_grid[i] + resolution)
+            if np.sum(mask) > 0:
+                chm[i, j] = np.max(points[mask, 2])
+    return time.perf_counter() - start, n_rows, len(y_grid)
+
+
+def synthetic_cloud(n_points: int, extent: float, seed: int = 0) -> np.ndarray:
+    """生成起伏呈“树冠”状的合成点云"""
+    rng = np.random.default_rng(seed)
+    points = np.empty((n_points, 3), dtype=np.float64)
+    points[:, :2] = rng.uniform(0, extent, size=(n_points, 2))
+    points[:, 2] = 3.0 + 3.0 * np.sin(points[:, 0]) * np.cos(points[:, 1]) + rng.normal(0, 0.05, n_points)
+    return points
+
+
+def iter_chunks(points: np.ndarray, chunk_size: int):
+    for start in range(0, len(points), chunk_size):
+        yield points[start:start + chunk_size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CHM栅格化：单遍分箱 vs 原逐单元循环')
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1e6, 5e6, 1e7, 5e7],
+                        help='合成点云点数')
+    parser.add_argument('--extent', type=float, default=30.0, help='样地边长(米)')
+    parser.add_argument('--resolution', type=float, default=0.1, help='栅格分辨率(米)')
+    parser.add_argument('--chunk-size', type=int, default=2_000_000, help='分块模式每块点数')
+    parser.add_argument('--legacy-rows', type=int, default=2,
+                        help='原循环实现只跑前N行，其余按行外推')
+    args = parser.parse_args()
+
+    print(f"{'点数':>12} {'单次(s)':>10} {'分块(s)':>10} {'原循环(s,外推)':>16} {'加速比':>10}")
+    for size in args.sizes:
+        n = int(size)
+        points = synthetic_cloud(n, args.extent)
+
+        start = time.perf_counter()
+        chm, geometry = rasterize_max_height(points, resolution=args.resolution)
+        t_single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        binner = GridBinner(GridGeometry.from_chunks(iter_chunks(points, args.chunk_size), args.resolution))
+        binner.add_chunks(iter_chunks(points, args.chunk_size))
+        chunked = binner.max()
+        t_chunked = time.perf_counter() - start
+        assert np.array_equal(np.isnan(chunked), binner.empty)
+
+        t_rows, done_rows, total_rows = legacy_chm_rows(points, args.resolution, args.legacy_rows)
+        t_legacy = t_rows / max(done_rows, 1) * total_rows
+
+        print(f"{n:>12,d} {t_single:>10.2f} {t_chunked:>10.2f} {t_legacy:>16.1f} {t_legacy / t_single:>9.0f}x")
+        del points
+
+
+if __name__ == "__main__":
+    main()
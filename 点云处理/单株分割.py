@@ -8,6 +8,8 @@ from osgeo import gdal
 import matplotlib.pyplot as plt
 from typing import Tuple, Optional, Dict, List
 
+from 冠层栅格化 import GridGeometry, GroupIndex, rasterize_max_height, sample_grid
+
 
 class TreeSegmentationPipeline:
     def __init__(self, config: Dict = None):
@@ -23,6 +25,9 @@ class TreeSegmentationPipeline:
             'rgb_weight': 0.3,
             'hyperspectral_weight': 0.5
         }
+        self.chm_geometry: Optional[GridGeometry] = None
+        self.point_labels: Optional[np.ndarray] = None
+        self.tree_point_index: Optional[GroupIndex] = None
 
     def process(self, point_cloud_path: str,
                 rgb_path: Optional[str] = None,
@@ -60,6 +65,10 @@ class TreeSegmentationPipeline:
         # 将分割结果映射回点云
         segmented_pcd = self.map_segmentation_to_point_cloud(non_ground_cloud, labels, chm)
 
+        # 每棵树的点下标是排序索引上的切片
+        for tree in tree_instances:
+            tree['point_indices'] = self.tree_point_index.indices(tree['label'])
+
         return {
             'canopy_height_model': chm,
             'segmentation_labels': labels,
@@ -107,33 +116,11 @@ class TreeSegmentationPipeline:
 
     def create_canopy_height_model(self, pcd: o3d.geometry.PointCloud,
                                    resolution: float = 0.1) -> np.ndarray:
-        """从点云创建冠层高度模型(CHM)"""
+        """从点云创建冠层高度模型(CHM)，单遍分箱取每个单元的最高点"""
         points = np.asarray(pcd.points)
 
-        # 计算边界
-        x_min, y_min = np.min(points[:, :2], axis=0) - 1
-        x_max, y_max = np.max(points[:, :2], axis=0) + 1
-
-        # 创建网格
-        x_grid = np.arange(x_min, x_max, resolution)
-        y_grid = np.arange(y_min, y_max, resolution)
-        xx, yy = np.meshgrid(x_grid, y_grid)
-
-        # 初始化CHM为零
-        chm = np.zeros_like(xx)
-
-        # 对每个网格单元，找到最高点
-        for i in range(len(y_grid)):
-            for j in range(len(x_grid)):
-                mask = (points[:, 0] >= x_grid[j]) & (points[:, 0] < x_grid[j] + resolution) & \
-                       (points[:, 1] >= y_grid[i]) & (points[:, 1] < y_grid[i] + resolution)
-
-                if np.sum(mask) > 0:
-                    chm[i, j] = np.max(points[mask, 2])
-
-        # 插值填充空洞
-        mask = np.isnan(chm)
-        chm[mask] = ndimage.gaussian_filter(chm, sigma=1, mode='nearest')[mask]
+        # 网格四周外扩1个单位，空单元用高斯插值填充
+        chm, self.chm_geometry = rasterize_max_height(points, resolution=resolution)
 
         return chm
 
@@ -299,36 +286,34 @@ class TreeSegmentationPipeline:
                                         labels: np.ndarray, chm: np.ndarray) -> o3d.geometry.PointCloud:
         """将分割结果映射回点云"""
         points = np.asarray(pcd.points)
-        x_min, y_min = np.min(points[:, :2], axis=0) - 1
-        resolution = (np.max(points[:, 0]) - np.min(points[:, 0])) / chm.shape[1]
 
-        # 为每个点分配标签
-        point_labels = np.zeros(len(points), dtype=np.int32)
+        # 与CHM共用同一网格几何，避免重新估算分辨率导致标签错位
+        geometry = self.chm_geometry
+        if geometry is None or geometry.shape != chm.shape:
+            raise ValueError("缺少与CHM一致的网格几何，请先调用 create_canopy_height_model")
 
-        for i, (x, y, z) in enumerate(points):
-            col = int((x - x_min) / resolution)
-            row = int((y - y_min) / resolution)
+        # 向量化为每个点分配标签，并按标签建立排序索引
+        point_labels = sample_grid(labels, geometry, points[:, :2]).astype(np.int32)
+        self.point_labels = point_labels
+        self.tree_point_index = GroupIndex(point_labels)
 
-            if 0 <= row < labels.shape[0] and 0 <= col < labels.shape[1]:
-                point_labels[i] = labels[row, col]
+        # 为每个标签分配随机颜色，背景为黑色
+        palette = np.random.rand(self.tree_point_index.n_groups + 1, 3)
+        palette[0] = 0
+        colors = palette[point_labels]
 
         # 创建彩色点云
         segmented_pcd = pcd.clone()
-        colors = np.zeros((len(points), 3))
-
-        # 为每个标签分配随机颜色
-        for label in np.unique(point_labels):
-            if label == 0:  # 背景
-                continue
-
-            mask = point_labels == label
-            color = np.random.rand(3)
-            colors[mask] = color
-
         segmented_pcd.colors = o3d.utility.Vector3dVector(colors)
 
         return segmented_pcd
 
+    def extract_tree_points(self, pcd: o3d.geometry.PointCloud, label: int) -> o3d.geometry.PointCloud:
+        """取出单株树木对应的点，基于排序索引切片而非整云掩码"""
+        if self.tree_point_index is None:
+            raise ValueError("请先调用 map_segmentation_to_point_cloud")
+        return pcd.select_by_index(self.tree_point_index.indices(label).tolist())
+
     def visualize_results(self, results: Dict):
         """可视化分割结果"""
         # 创建一个3x2的子图布局
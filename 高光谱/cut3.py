@@ -8,6 +8,8 @@ import spectral as spy
 import threading
 import re
 
+from 高光谱读写 import EnviCube, open_envi, write_roi
+
 # 设置matplotlib支持中文显示
 import matplotlib.pyplot as plt
 
@@ -268,8 +270,8 @@ class HyperspectralCutterApp:
                 with open(self.hyperspectral_path, 'r') as f:
                     self.original_hdr_content = f.read()
 
-                # 加载数据
-                self.hyperspectral_data = spy.open_image(self.hyperspectral_path)
+                # 以内存映射方式加载数据
+                self.hyperspectral_data = open_envi(self.hyperspectral_path)
             elif self.hyperspectral_format == 'dat':
                 # 加载DAT文件
                 try:
@@ -301,12 +303,8 @@ class HyperspectralCutterApp:
                     'byte order': 0
                 }
 
-                # 打开DAT文件
-                self.hyperspectral_data = spy.envi.open_memmap(
-                    None,
-                    envi_header,
-                    image=self.hyperspectral_path
-                )
+                # 以内存映射方式打开DAT文件
+                self.hyperspectral_data = EnviCube(self.hyperspectral_path, envi_header)
             else:
                 self.root.after(0, lambda: messagebox.showerror("错误", "不支持的高光谱数据格式"))
                 return
@@ -526,24 +524,6 @@ class HyperspectralCutterApp:
             self.status_var.set(f"切割高光谱数据失败: {str(e)}")
             messagebox.showerror("错误", f"切割高光谱数据失败: {str(e)}")
 
-    def _modify_hdr_content(self, original_content, new_samples, new_lines, x_start, y_start):
-        """修改头文件时，保留所有原始元数据（如 Wavelength、fwhm 等）"""
-        # 仅更新 samples/lines/x start/y start，其他字段原样保留
-        lines = original_content.split('\n')
-        modified = []
-        for line in lines:
-            if line.lower().startswith('samples ='):
-                modified.append(f"samples = {new_samples}")
-            elif line.lower().startswith('lines ='):
-                modified.append(f"lines = {new_lines}")
-            elif line.lower().startswith('x start ='):
-                modified.append(f"x start = {x_start}")
-            elif line.lower().startswith('y start ='):
-                modified.append(f"y start = {y_start}")
-            else:
-                modified.append(line)
-        return '\n'.join(modified)
-
     def _cut_hyperspectral_data_thread(self, x_min, y_min, x_max, y_max):
         try:
             # 切割高光谱数据
@@ -552,56 +532,9 @@ class HyperspectralCutterApp:
             # 构建输出文件名
             base_name = os.path.splitext(os.path.basename(self.hyperspectral_path))[0]
             output_hdr = os.path.join(self.output_path, f"{base_name}_cut_{x_min}_{y_min}_{x_max}_{y_max}.hdr")
-            output_img = os.path.join(self.output_path, f"{base_name}_cut_{x_min}_{y_min}_{x_max}_{y_max}.dat")
-
-            # 保存切割后的数据
-            if self.hyperspectral_format == 'envi':
-                # 对于ENVI格式，保留原始HDR格式
-                new_samples = x_max - x_min
-                new_lines = y_max - y_min
-
-                # 修改原始HDR内容
-                modified_hdr = self._modify_hdr_content(
-                    self.original_hdr_content,
-                    new_samples,
-                    new_lines,
-                    x_min,
-                    y_min
-                )
-
-                # 保存修改后的HDR文件
-                with open(output_hdr, 'w') as f:
-                    f.write(modified_hdr)
-
-                # 保存图像数据
-                # 确保数据格式与原始一致
-                if self.hyperspectral_data.metadata['interleave'] != 'bsq':
-                    cut_data_bsq = self._convert_to_bsq(cut_data, self.hyperspectral_data.metadata['interleave'])
-                else:
-                    cut_data_bsq = cut_data
-                cut_data_bsq.tofile(output_img)
-
-            elif self.hyperspectral_format == 'dat':
-                # 使用DAT参数保存
-                envi_header = {
-                    'file type': 'ENVI Standard',
-                    'samples': cut_data.shape[1],
-                    'lines': cut_data.shape[0],
-                    'bands': cut_data.shape[2],
-                    'data type': self._get_envi_data_type(self.dat_info['dtype']),
-                    'interleave': self.dat_info['interleave'],
-                    'byte order': 0
-                }
-
-                # 保存头文件和数据
-                spy.envi.write_envi_header(output_hdr, envi_header)
 
-                # 确保数据格式与原始一致
-                if self.dat_info['interleave'] != 'bsq':
-                    cut_data_bsq = self._convert_to_bsq(cut_data, self.dat_info['interleave'])
-                else:
-                    cut_data_bsq = cut_data
-                cut_data_bsq.tofile(output_img)
+            # 按行块从内存映射流式写出，保留原始头文件中的波长等元数据，交错格式与原始数据一致
+            write_roi(self.hyperspectral_data, output_hdr, x_min, y_min, x_max, y_max)
 
             # 更新状态
             self.root.after(0, lambda: self.status_var.set(f"高光谱数据切割成功，已保存至: {output_hdr}"))
@@ -618,25 +551,6 @@ class HyperspectralCutterApp:
             self.root.after(0, lambda: self.status_var.set(f"切割高光谱数据失败: {str(e)}"))
             self.root.after(0, lambda: messagebox.showerror("错误", f"切割高光谱数据失败: {str(e)}"))
 
-    def _convert_to_bsq(self, data, original_interleave):
-        """将数据转换为BSQ格式"""
-        if original_interleave == 'bsq':
-            return data
-
-        lines, samples, bands = data.shape
-        bsq_data = np.zeros((lines, samples, bands), dtype=data.dtype)
-
-        if original_interleave == 'bip':
-            # BIP -> BSQ
-            for b in range(bands):
-                bsq_data[:, :, b] = data[:, :, b]
-        elif original_interleave == 'bil':
-            # BIL -> BSQ
-            for b in range(bands):
-                bsq_data[:, :, b] = data[:, :, b]
-
-        return bsq_data
-
     def _show_cut_result(self, cut_data):
         """显示切割结果"""
         try:
@@ -2,11 +2,14 @@ import numpy as np
 import matplotlib.pyplot as plt
 from spectral import envi, open_image
 import os
-import re
 from tqdm import tqdm
 import pandas as pd
 from PIL import Image  # 新增库用于处理PNG图像
 
+from 反射率校正 import calibrate_reflectance
+from 标签统计 import label_statistics, load_label_mask
+from 高光谱读写 import open_envi
+
 
 class HyperspectralProcessor:
     def __init__(self, data_path, dark_path=None, white_path=None, file_format='envi'):
@@ -60,18 +63,10 @@ class HyperspectralProcessor:
         self._print_data_shapes()
 
     def _print_data_shapes(self):
-        """打印数据形状信息"""
-        if self.data:
-            data_shape = self.data.load().shape if hasattr(self.data, 'load') else self.data.data.shape
-            print(f"数据形状: {data_shape}")
-
-        if self.dark:
-            dark_shape = self.dark.load().shape if hasattr(self.dark, 'load') else self.dark.data.shape
-            print(f"暗电流形状: {dark_shape}")
-
-        if self.white:
-            white_shape = self.white.load().shape if hasattr(self.white, 'load') else self.white.data.shape
-            print(f"白板形状: {white_shape}")
+        """打印数据形状信息（只用头文件中的行列波段数，不读取数据）"""
+        for name, image in (("数据", self.data), ("暗电流", self.dark), ("白板", self.white)):
+            if image is not None:
+                print(f"{name}形状: {tuple(image.shape)}")
 
     def _load_hyperspectral_data(self, path):
         """加载高光谱数据"""
@@ -111,157 +106,16 @@ class HyperspectralProcessor:
             return self._load_manual_format(path)
 
     def _load_manual_format(self, path):
-        """手动解析数据文件"""
+        """手动解析头文件，以内存映射方式打开数据文件（不整体读入内存）"""
         try:
-            if path.endswith('.hdr'):
-                # 读取头文件
-                with open(path, 'r') as f:
-                    hdr_lines = f.readlines()
-
-                # 解析头文件中的关键参数
-                metadata = {}
-                in_bands_section = False
-                wavelengths = []
-
-                for line in hdr_lines:
-                    line = line.strip()
-                    if not line or line.startswith(';'):
-                        continue
-
-                    # 处理等号分隔的键值对
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        key = key.strip().lower()
-                        value = value.strip()
-
-                        if key == 'bands':
-                            metadata['bands'] = int(value)
-                        elif key == 'lines':
-                            metadata['lines'] = int(value)
-                        elif key == 'samples':
-                            metadata['samples'] = int(value)
-                        elif key == 'data type':
-                            metadata['data type'] = int(value)
-                        elif key == 'interleave':
-                            metadata['interleave'] = value.lower()
-                        elif key == 'byte order':
-                            metadata['byte order'] = int(value)
-                        elif key == 'wavelength':
-                            in_bands_section = True
-                            wavelengths = []
-
-                    # 处理波长数据
-                    elif in_bands_section:
-                        # 提取括号内的所有数值
-                        values = re.findall(r'[-+]?\d*\.\d+|\d+', line)
-                        if values:
-                            wavelengths.extend([float(v) for v in values])
-
-                        # 检查波段部分是否结束
-                        if '}' in line:
-                            in_bands_section = False
-                            metadata['wavelength'] = wavelengths
-
-                # 构建数据路径
-                dat_path = os.path.splitext(path)[0] + '.dat'
-                if not os.path.exists(dat_path):
-                    print(f"找不到数据文件: {dat_path}")
-                    return None
-
-                # 根据数据类型确定numpy数据类型
-                dtype_map = {
-                    1: np.uint8,
-                    2: np.int16,
-                    3: np.int32,
-                    4: np.float32,
-                    5: np.float64,
-                    12: np.uint16,
-                    13: np.uint32,
-                    14: np.int64,
-                    15: np.uint64
-                }
-                data_type = metadata.get('data type', 4)  # 默认float32
-                dtype = dtype_map.get(data_type, np.float32)
-
-                # 确定字节序
-                byte_order = metadata.get('byte order', 0)
-                if byte_order == 1:
-                    dtype = dtype.newbyteorder('>')  # 大端字节序
-
-                # 获取文件大小（用于进度条）
-                file_size = os.path.getsize(dat_path)
-                chunk_size = 1024 * 1024  # 1MB块大小
-
-                # 使用进度条读取大数据文件
-                print(f"正在读取数据文件: {dat_path}")
-                data_chunks = []
-                with open(dat_path, 'rb') as f:
-                    with tqdm(total=file_size, unit='B', unit_scale=True, desc="读取数据") as pbar:
-                        while True:
-                            chunk = f.read(chunk_size)
-                            if not chunk:
-                                break
-                            data_chunk = np.frombuffer(chunk, dtype=dtype)
-                            data_chunks.append(data_chunk)
-                            pbar.update(len(chunk))
-
-                # 合并所有块
-                data = np.concatenate(data_chunks)
-
-                # 确定数据维度
-                lines = metadata.get('lines', 0)
-                samples = metadata.get('samples', 0)
-                bands = metadata.get('bands', 0)
-
-                if lines * samples * bands != len(data):
-                    print(f"数据维度不匹配: lines={lines}, samples={samples}, bands={bands}, data_len={len(data)}")
-                    # 尝试估计维度
-                    if lines == 0 and samples > 0 and bands > 0:
-                        lines = len(data) // (samples * bands)
-                        print(f"估计行数: {lines}")
-                        if lines * samples * bands == len(data):
-                            metadata['lines'] = lines
-                        else:
-                            print("无法正确估计数据维度")
-                            return None
-                    else:
-                        return None
-
-                # 根据交错格式重塑数据
-                interleave = metadata.get('interleave', 'bsq')
-
-                print("正在重塑数据维度...")
-                if interleave == 'bsq':
-                    # 波段顺序（Band Sequential）
-                    data = data.reshape(bands, lines, samples).transpose(1, 2, 0)
-                elif interleave == 'bil':
-                    # 波段按行交错（Band Interleaved by Line）
-                    data = data.reshape(lines, bands, samples).transpose(0, 2, 1)
-                elif interleave == 'bip':
-                    # 波段按像素交错（Band Interleaved by Pixel）
-                    data = data.reshape(lines, samples, bands)
-                else:
-                    print(f"不支持的交错格式: {interleave}，默认使用BIP")
-                    data = data.reshape(lines, samples, bands)
-
-                # 存储波长信息
-                if 'wavelength' in metadata:
-                    self.wavelengths = np.array(metadata['wavelength'])
-
-                # 创建一个模拟的spectral.Image对象
-                class MockImage:
-                    def __init__(self, data, metadata):
-                        self.data = data
-                        self.metadata = metadata
-
-                    def load(self):
-                        return self.data
+            cube = open_envi(path)
+            print(f"已映射数据文件: {cube.data_path} {cube.shape} {cube.interleave}")
 
-                return MockImage(data, metadata)
+            # 存储波长信息
+            if cube.wavelengths is not None:
+                self.wavelengths = cube.wavelengths
 
-            else:
-                print(f"不支持的文件格式: {path}")
-                return None
+            return cube
         except Exception as e:
             print(f"手动加载失败: {e}")
             return None
@@ -285,11 +139,8 @@ class HyperspectralProcessor:
         if data is None or reference is None:
             return True
 
-        data_shape = data.shape if isinstance(data, np.ndarray) else data.load().shape
-        ref_shape = reference.shape if isinstance(reference, np.ndarray) else reference.load().shape
-
-        # 只检查行数和列数
-        return data_shape[0] == ref_shape[0] and data_shape[1] == ref_shape[1]
+        # 只检查行数和列数；ndarray、spectral 与 EnviCube 对象都有 shape，不需要读取数据
+        return data.shape[0] == reference.shape[0] and data.shape[1] == reference.shape[1]
 
     def calculate_reflectance(self):
         """计算反射率"""
@@ -399,6 +250,26 @@ class HyperspectralProcessor:
         self.reflectance = reflectance
         return reflectance
 
+    def calculate_reflectance_chunked(self, output_path, block_lines=256, workers=1, interleave=None):
+        """
+        分块计算反射率，适用于内存放不下的大数据
+
+        以内存映射方式读取原始数据，暗电流/白板取每列平均值后广播参与计算，
+        结果按行块直接写入float32的ENVI文件，self.reflectance 为输出文件的内存映射视图。
+
+        参数:
+        output_path: 输出文件路径（不含或含.hdr后缀）
+        block_lines: 每块处理的行数
+        workers: 线程数，大于1时并行处理行块
+        interleave: 输出交错格式，默认与原始数据一致
+        """
+        self.reflectance = calibrate_reflectance(
+            self.data_path, output_path,
+            dark_path=self.dark_path, white_path=self.white_path,
+            block_lines=block_lines, workers=workers, interleave=interleave
+        )
+        return self.reflectance
+
     def extract_spectrum(self, row, col):
         """
         提取指定像元的光谱
@@ -605,6 +476,46 @@ class HyperspectralProcessor:
 
         return df
 
+    def extract_label_reflectance(self, label_mask, output_csv=None, stats=('mean', 'std', 'min', 'max'),
+                                  quantiles=(0.25, 0.5, 0.75), connectivity=None, block_lines=256,
+                                  value_range=None, bins=512):
+        """
+        按标签掩膜一次统计所有标签（如每株植物）的反射率，不需要先计算整幅反射率
+
+        只用到数据与暗电流/白板的路径，由 标签统计.label_statistics 按行块内存映射读取，
+        不需要整幅数据在内存中；不需要本类其他功能时可直接调用 label_statistics，
+        多个数据用 batch_label_statistics。
+
+        参数:
+        label_mask: 标签图数组或路径，0为背景，其余每个值为一个区域
+        output_csv: 输出CSV文件路径，如果为None则不导出
+        stats: 需要计算的统计量，可选值: 'mean', 'std', 'min', 'max'
+        quantiles: 需要计算的分位数，由直方图近似，精度为 (value_range上限 - 下限) / bins
+        value_range: 直方图范围，None 时有白板取 (0, 1)，没有白板时取各波段原始值的范围
+        connectivity: 为4或8时把二值掩膜按连通区域编号（仅对路径有效）
+        block_lines: 每次读取的行数
+
+        返回:
+        整洁格式的DataFrame，每行一个 (标签, 波段)
+        """
+        if isinstance(label_mask, str):
+            label_mask = load_label_mask(label_mask, connectivity)
+
+        print("正在按标签统计反射率...")
+        df = label_statistics(self.data_path, label_mask, self.dark_path, self.white_path, stats=stats,
+                              quantiles=quantiles, value_range=value_range, bins=bins,
+                              block_lines=block_lines)
+        print(f"统计了 {df['label'].nunique()} 个标签")
+
+        if output_csv:
+            output_dir = os.path.dirname(output_csv)
+            if output_dir and not os.path.exists(output_dir):
+                os.makedirs(output_dir)
+            df.to_csv(output_csv, index=False, encoding='utf-8-sig')
+            print(f"统计结果已保存至: {output_csv}")
+
+        return df
+
     def plot_roi_spectrum(self, binary_mask, ax=None, label=None, title=None):
         """
         绘制感兴趣区域的平均光谱曲线
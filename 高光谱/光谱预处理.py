@@ -0,0 +1,272 @@
+import abc
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.signal import savgol_filter
+
+
+class Stage(abc.ABC):
+    """预处理步骤基类：输入输出均为 (样本数, 波段数) 数组
+
+    需要全局统计量的步骤（MSC参考光谱、按列标准化/归一化）设置 needs_fit=True，
+    通过 partial_fit 逐块累加统计量，因此可以在分块读取的大文件上使用。
+    """
+    needs_fit = False
+
+    def partial_fit(self, x):
+        pass
+
+    @abc.abstractmethod
+    def __call__(self, x):
+        pass
+
+    def columns(self, columns):
+        """输出列名，默认与输入相同"""
+        return columns
+
+
+class SNV(Stage):
+    """标准正态变量变换，逐条光谱减均值除标准差"""
+
+    def __call__(self, x):
+        mean = x.mean(axis=1, keepdims=True)
+        std = x.std(axis=1, keepdims=True)
+        return (x - mean) / std
+
+
+class MSC(Stage):
+    """
+    多元散射校正，闭式向量化实现
+
+    对每条光谱 x 拟合 x ≈ a + b·ref：b = cov(x, ref) / var(ref)，a = mean(x) - b·mean(ref)，
+    结果 (x - a) / b 与逐条 np.polyfit(ref, x, 1) 一致。reference 为None时使用全部数据的平均光谱。
+    """
+    needs_fit = True
+
+    def __init__(self, reference=None):
+        self.reference = None if reference is None else np.asarray(reference, dtype=np.float64)
+        self.needs_fit = reference is None
+        self._sum = None
+        self._count = 0
+
+    def partial_fit(self, x):
+        if self._sum is None:
+            self._sum = np.zeros(x.shape[1], dtype=np.float64)
+        self._sum += x.sum(axis=0)
+        self._count += x.shape[0]
+        self.reference = self._sum / self._count
+
+    def __call__(self, x):
+        if self.reference is None:
+            raise ValueError("MSC 需要先拟合参考光谱")
+        ref = self.reference
+        ref_centered = ref - ref.mean()
+        x_mean = x.mean(axis=1)
+        slope = (x - x_mean[:, None]) @ ref_centered / (ref_centered @ ref_centered)
+        intercept = x_mean - slope * ref.mean()
+        return (x - intercept[:, None]) / slope[:, None]
+
+
+class SavitzkyGolay(Stage):
+    """Savitzky-Golay 平滑，deriv>0 时同时求导"""
+
+    def __init__(self, window_length=11, poly_order=3, deriv=0):
+        self.window_length = window_length
+        self.poly_order = poly_order
+        self.deriv = deriv
+
+    def __call__(self, x):
+        return savgol_filter(x, self.window_length, self.poly_order, deriv=self.deriv, axis=1)
+
+
+class Derivative(Stage):
+    """差分求导，order 阶导数使波段数减少 order"""
+
+    def __init__(self, order=1):
+        self.order = order
+
+    def __call__(self, x):
+        return np.diff(x, n=self.order, axis=1)
+
+    def columns(self, columns):
+        return list(columns)[self.order:]
+
+
+class Standardize(Stage):
+    """按列（波段）标准化，与 sklearn StandardScaler 相同"""
+    needs_fit = True
+
+    def __init__(self):
+        self._count = 0
+        self._sum = None
+        self._sumsq = None
+
+    def partial_fit(self, x):
+        if self._sum is None:
+            self._sum = np.zeros(x.shape[1])
+            self._sumsq = np.zeros(x.shape[1])
+        self._count += x.shape[0]
+        self._sum += x.sum(axis=0)
+        self._sumsq += np.square(x).sum(axis=0)
+
+    def __call__(self, x):
+        mean = self._sum / self._count
+        std = np.sqrt(np.maximum(self._sumsq / self._count - mean ** 2, 0))
+        std[std == 0] = 1.0
+        return (x - mean) / std
+
+
+class Normalize(Stage):
+    """按列（波段）最小-最大归一化到[0, 1]，与 sklearn MinMaxScaler 相同"""
+    needs_fit = True
+
+    def __init__(self):
+        self._min = None
+        self._max = None
+
+    def partial_fit(self, x):
+        if self._min is None:
+            self._min = x.min(axis=0)
+            self._max = x.max(axis=0)
+        else:
+            np.minimum(self._min, x.min(axis=0), out=self._min)
+            np.maximum(self._max, x.max(axis=0), out=self._max)
+
+    def __call__(self, x):
+        scale = self._max - self._min
+        scale[scale == 0] = 1.0
+        return (x - self._min) / scale
+
+
+class Pipeline:
+    """按顺序串联多个预处理步骤，对一块数据一次性完成"""
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+
+    def transform_until(self, x, stop):
+        for stage in self.stages[:stop]:
+            x = stage(x)
+        return x
+
+    def __call__(self, x):
+        return self.transform_until(x, len(self.stages))
+
+    def columns(self, columns):
+        for stage in self.stages:
+            columns = stage.columns(columns)
+        return list(columns)
+
+    def fit(self, chunk_source):
+        """
+        依次拟合需要全局统计量的步骤
+
+        chunk_source 为返回光谱块迭代器的可调用对象；每个待拟合步骤需要遍历一次数据，
+        其输入是前面各步骤的输出。
+        """
+        fit_pipelines([self], chunk_source)
+        return self
+
+
+def fit_pipelines(pipelines, chunk_source):
+    """
+    同时拟合多个方案中需要全局统计量的步骤
+
+    各方案的第 k 个待拟合步骤共用第 k 次遍历，遍历次数等于单个方案中待拟合步骤的最多个数，
+    而不是所有方案待拟合步骤的总数。
+    """
+    rounds = [[(p, i) for i, stage in enumerate(p.stages) if stage.needs_fit] for p in pipelines]
+    for k in range(max(map(len, rounds), default=0)):
+        current = [r[k] for r in rounds if len(r) > k]
+        for x in chunk_source():
+            for pipeline, i in current:
+                pipeline.stages[i].partial_fit(pipeline.transform_until(x, i))
+    return pipelines
+
+
+def iter_table(path, chunksize=100000, columns=None):
+    """分块读取CSV或Parquet，产出DataFrame"""
+    if path.lower().endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("读取Parquet需要安装 pyarrow")
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        for df in pd.read_csv(path, chunksize=chunksize, usecols=columns):
+            yield df
+
+
+class TableWriter:
+    """逐块追加写出结果，.parquet 使用 pyarrow 列式写出，其余写CSV"""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet = path.lower().endswith('.parquet')
+        self._writer = None
+        self._header_written = False
+
+    def write(self, df):
+        if self._parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a' if self._header_written else 'w',
+                      header=not self._header_written, index=False)
+            self._header_written = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def run_preprocessing(input_path, variants, output_path, id_columns=2, chunksize=100000, dtype=np.float32):
+    """
+    对光谱表执行多个预处理方案，结果写入一个文件
+
+    input_path: CSV或Parquet，前 id_columns 列为样本信息，其余为各波段
+    variants: {方案名: Pipeline 或 Stage 列表}
+    output_path: 输出文件，列为样本信息列 + 每个方案的 "方案名|波段名" 列
+    """
+    variants = {name: (p if isinstance(p, Pipeline) else Pipeline(p)) for name, p in variants.items()}
+
+    first = next(iter_table(input_path, chunksize=1))
+    id_cols = list(first.columns[:id_columns])
+    band_cols = list(first.columns[id_columns:])
+
+    def spectra_chunks():
+        for df in iter_table(input_path, chunksize):
+            yield df[band_cols].to_numpy(dtype=np.float64)
+
+    start = time.perf_counter()
+    fit_pipelines(variants.values(), spectra_chunks)
+
+    out_columns = {name: [f"{name}|{c}" for c in p.columns(band_cols)] for name, p in variants.items()}
+
+    out_dir = os.path.dirname(output_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    writer = TableWriter(output_path)
+    n_rows = 0
+    try:
+        for df in iter_table(input_path, chunksize):
+            x = df[band_cols].to_numpy(dtype=np.float64)
+            parts = [df[id_cols].reset_index(drop=True)]
+            for name, pipeline in variants.items():
+                parts.append(pd.DataFrame(pipeline(x).astype(dtype), columns=out_columns[name]))
+            writer.write(pd.concat(parts, axis=1))
+            n_rows += len(df)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"已处理 {n_rows} 条光谱，{len(variants)} 个方案，耗时 {elapsed:.1f}s，结果保存至 {output_path}")
+    return output_path
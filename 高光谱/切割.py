@@ -12,7 +12,8 @@ matplotlib.use('TkAgg')
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 from matplotlib.figure import Figure
 import threading
-import time
+
+from 高光谱读写 import open_envi
 
 # 配置中文字体支持
 plt.rcParams["font.family"] = ["SimHei", "Microsoft YaHei", "Heiti TC"]
@@ -119,42 +120,13 @@ class HyperspectralCutter:
 
             # 加载高光谱数据
             self.status_var.set("正在加载高光谱数据...")
-            if self.hyperspectral_path.lower().endswith('.hdr'):
-                img = envi.open(self.hyperspectral_path)
-            else:
-                base_path = os.path.splitext(self.hyperspectral_path)[0]
-                hdr_path = base_path + '.hdr'
-                if os.path.exists(hdr_path):
-                    img = envi.open(hdr_path, self.hyperspectral_path)
-                else:
-                    raise FileNotFoundError(f"找不到对应的头文件: {hdr_path}")
-
-            self.metadata = img.metadata
-            self.status_var.set("正在读取高光谱数据内容...")
-
-            # 处理大型数据（分块加载）
-            lines = int(self.metadata.get('lines', 0))
-            samples = int(self.metadata.get('samples', 0))
-            bands = int(self.metadata.get('bands', 0))
-
-            if lines * samples * bands > 1e8:  # 数据量超过1亿，分块加载
-                self.hyperspectral_data = np.empty((lines, samples, bands), dtype=np.float32)
-                block_size = 200  # 每次加载200行
-                total_blocks = (lines + block_size - 1) // block_size
-
-                for i in range(total_blocks):
-                    start = i * block_size
-                    end = min((i + 1) * block_size, lines)
-                    self.hyperspectral_data[start:end] = img.read_subregion((start, end), (0, samples))
-
-                    progress = 20 + (i + 1) / total_blocks * 70
-                    self.progress_var.set(progress)
-                    self.status_var.set(f"正在加载高光谱数据: 块 {i + 1}/{total_blocks}")
-                    time.sleep(0.05)
-            else:
-                # 小型数据直接加载
-                self.hyperspectral_data = img.load()
-                self.progress_var.set(90)
+            # 以内存映射方式打开，切割时只读取框选区域
+            cube = open_envi(self.hyperspectral_path)
+            self.metadata = cube.metadata
+            self.hyperspectral_data = cube.view()
+
+            lines, samples, bands = cube.shape
+            self.progress_var.set(90)
 
             # 验证尺寸匹配性
             rgb_h, rgb_w = self.rgb_image.shape[:2]
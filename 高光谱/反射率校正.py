@@ -0,0 +1,140 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from tqdm import tqdm
+
+from 高光谱读写 import create_envi, open_envi
+
+
+# 暗电流/白板平均值的缓存，批量处理同一组参考数据时只读取一次
+_REFERENCE_CACHE = {}
+
+
+def reference_mean(path, bands, block_lines=256):
+    """按行块累加求暗电流/白板每列每波段的平均值，返回只读的 (samples, bands) float32
+
+    参考数据波段数多于主数据时截断，少于主数据时补零，与原逐行实现保持一致。
+    结果按文件路径与修改时间缓存。
+    """
+    cube = open_envi(path)
+    key = (os.path.abspath(cube.data_path), os.stat(cube.data_path).st_mtime_ns, bands)
+    if key in _REFERENCE_CACHE:
+        return _REFERENCE_CACHE[key]
+    lines, samples, ref_bands = cube.shape
+    total = np.zeros((samples, ref_bands), dtype=np.float64)
+    for _, _, block in cube.iter_line_blocks(block_lines):
+        total += block.sum(axis=0, dtype=np.float64)
+    mean = (total / max(lines, 1)).astype(np.float32)
+
+    if ref_bands > bands:
+        mean = mean[:, :bands]
+    elif ref_bands < bands:
+        mean = np.pad(mean, ((0, 0), (0, bands - ref_bands)))
+    mean.setflags(write=False)
+    _REFERENCE_CACHE[key] = mean
+    return mean
+
+
+class ReflectanceCalibrator:
+    """分块反射率校正引擎：reflectance = (raw - dark) / (white - dark)
+
+    原始数据和输出都以 np.memmap 方式访问，每次只处理 block_lines 行；暗电流和白板
+    只保留每列的平均值 (samples, bands)，通过广播参与计算，不再展开成整幅数组。
+    """
+
+    def __init__(self, data_path, dark_path=None, white_path=None, block_lines=256, workers=1):
+        self.data_path = data_path
+        self.block_lines = max(1, int(block_lines))
+        self.workers = max(1, int(workers))
+
+        self.image = open_envi(data_path)
+        self.cube = self.image.view()
+        self.lines, self.samples, self.bands = self.cube.shape
+
+        self.dark = self._load_reference(dark_path, '暗电流')
+        self.white = self._load_reference(white_path, '白板')
+
+        # 预先计算分母和有效掩码，避免在每个行块中重复计算
+        if self.white is not None:
+            denom = self.white - self.dark if self.dark is not None else self.white
+            self.valid = denom > 0
+            self.scale = np.zeros_like(denom)
+            self.scale[self.valid] = 1.0 / denom[self.valid]
+        else:
+            self.valid = None
+            self.scale = None
+
+    def _load_reference(self, path, name):
+        if not path:
+            return None
+        if not os.path.exists(path) and not os.path.exists(os.path.splitext(path)[0] + '.hdr'):
+            print(f"警告: {name}文件不存在: {path}")
+            return None
+        ref = reference_mean(path, self.bands, self.block_lines)
+        if ref.shape[0] != self.samples:
+            raise ValueError(f"{name}数据列数 ({ref.shape[0]}) 与主数据 ({self.samples}) 不兼容")
+        return ref
+
+    def _output_metadata(self):
+        metadata = dict(self.image.metadata)
+        metadata.pop('data ignore value', None)
+        return metadata
+
+    def calibrate_block(self, start, stop, out):
+        """校正 [start, stop) 行并写入 out 的对应位置"""
+        block = np.asarray(self.cube[start:stop], dtype=np.float32)
+        if self.dark is not None:
+            block -= self.dark
+        if self.scale is not None:
+            block *= self.scale
+            block[:, ~self.valid] = 0
+        out[start:stop] = block
+
+    def calibrate_pixels(self, pixels, cols):
+        """就地校正若干像元 (n, bands) float32，cols 为每个像元所在的列"""
+        if self.dark is not None:
+            pixels -= self.dark[cols]
+        if self.scale is not None:
+            pixels *= self.scale[cols]
+            pixels[~self.valid[cols]] = 0
+        return pixels
+
+    def run(self, output_path, interleave=None):
+        """把反射率以float32写入ENVI文件，返回输出的内存映射视图 (lines, samples, bands)"""
+        output_hdr = output_path if output_path.lower().endswith('.hdr') else output_path + '.hdr'
+        interleave = interleave or self.image.interleave
+        out_cube = create_envi(output_hdr, self.lines, self.samples, self.bands, dtype=np.float32,
+                               interleave=interleave, metadata=self._output_metadata())
+        out = out_cube.view()
+
+        blocks = [(s, min(s + self.block_lines, self.lines)) for s in range(0, self.lines, self.block_lines)]
+        start_time = time.perf_counter()
+        with tqdm(total=self.lines, desc="计算反射率") as pbar:
+            if self.workers == 1:
+                for s, e in blocks:
+                    self.calibrate_block(s, e, out)
+                    pbar.update(e - s)
+            else:
+                # NumPy运算会释放GIL，各行块写入互不重叠的区域
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    futures = [pool.submit(self.calibrate_block, s, e, out) for s, e in blocks]
+                    for (s, e), future in zip(blocks, futures):
+                        future.result()
+                        pbar.update(e - s)
+        out_cube.flush()
+        elapsed = time.perf_counter() - start_time
+
+        size_mb = self.lines * self.samples * self.bands * 4 / 1024 ** 2
+        print(f"反射率已写入: {output_hdr} ({size_mb:.1f} MB, {elapsed:.1f}s, {size_mb / max(elapsed, 1e-9):.1f} MB/s)")
+
+        del out, out_cube
+        return open_envi(output_hdr).view()
+
+
+def calibrate_reflectance(data_path, output_path, dark_path=None, white_path=None,
+                          block_lines=256, workers=1, interleave=None):
+    """分块计算反射率并写入ENVI文件的便捷函数"""
+    calibrator = ReflectanceCalibrator(data_path, dark_path, white_path, block_lines, workers)
+    return calibrator.run(output_path, interleave=interleave)
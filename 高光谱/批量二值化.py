@@ -0,0 +1,261 @@
+import ast
+import csv
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+import numpy as np
+
+from 高光谱读写 import open_envi
+
+
+class BandExpression:
+    """
+    波段表达式，例如 "b8 / b143"、"(b120 - b60) / (b120 + b60)"
+
+    bN 表示第N个波段（从0开始）；只允许四则运算、括号和数字。
+    除数为0、结果为NaN/Inf的像素记为0，与原批量脚本的处理方式一致。
+    """
+
+    _ALLOWED = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Name, ast.Load, ast.Constant,
+                ast.Add, ast.Sub, ast.Mult, ast.Div, ast.USub, ast.UAdd)
+
+    def __init__(self, expression):
+        self.expression = expression
+        self._tree = ast.parse(expression, mode='eval')
+        bands = set()
+        for node in ast.walk(self._tree):
+            if not isinstance(node, self._ALLOWED):
+                raise ValueError(f"表达式中不允许的语法: {type(node).__name__} ({expression})")
+            if isinstance(node, ast.Name):
+                if not (node.id.startswith('b') and node.id[1:].isdigit()):
+                    raise ValueError(f"未知变量 {node.id}，波段请写成 b<序号>")
+                bands.add(int(node.id[1:]))
+        self.bands = sorted(bands)
+
+    @classmethod
+    def ratio(cls, numerator, denominator):
+        return cls(f"b{numerator} / b{denominator}")
+
+    @classmethod
+    def ndvi(cls, nir, red):
+        return cls(f"(b{nir} - b{red}) / (b{nir} + b{red})")
+
+    def evaluate(self, band_data):
+        """band_data: {波段号: 二维float32数组}，返回float32结果"""
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            result = self._eval(self._tree.body, band_data)
+        result = np.asarray(result, dtype=np.float32)
+        np.nan_to_num(result, copy=False, nan=0, posinf=0, neginf=0)
+        return result
+
+    def _eval(self, node, band_data):
+        if isinstance(node, ast.Name):
+            return band_data[int(node.id[1:])]
+        if isinstance(node, ast.Constant):
+            return np.float32(node.value)
+        if isinstance(node, ast.UnaryOp):
+            value = self._eval(node.operand, band_data)
+            return -value if isinstance(node.op, ast.USub) else value
+        left = self._eval(node.left, band_data)
+        right = self._eval(node.right, band_data)
+        if isinstance(node.op, ast.Add):
+            return left + right
+        if isinstance(node.op, ast.Sub):
+            return left - right
+        if isinstance(node.op, ast.Mult):
+            return left * right
+        return np.divide(left, right)
+
+    @property
+    def key(self):
+        """与空格、多余括号无关的表达式标识，用于判断输出是否由同一表达式生成"""
+        return ast.dump(self._tree)
+
+    def __repr__(self):
+        return f"BandExpression({self.expression!r})"
+
+
+def normalize_to_uint8(index):
+    """线性拉伸到0-255"""
+    min_val = float(np.min(index))
+    max_val = float(np.max(index))
+    if max_val <= min_val:
+        return np.zeros(index.shape, dtype=np.uint8)
+    scale = 255.0 / (max_val - min_val)
+    np.subtract(index, min_val, out=index)
+    np.multiply(index, scale, out=index)
+    return np.clip(index, 0, 255).astype(np.uint8)
+
+
+def params_path(output_path):
+    """记录输出所用参数的旁路文件：名称.png -> 名称.png.json"""
+    return output_path + '.json'
+
+
+def read_params(output_path):
+    try:
+        with open(params_path(output_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_params(output_path, expression, invert):
+    with open(params_path(output_path), 'w', encoding='utf-8') as f:
+        json.dump({'expression': expression.expression, 'invert': bool(invert)}, f, ensure_ascii=False)
+
+
+def is_up_to_date(output_path, cube_path, expression=None, invert=False):
+    """
+    输出存在、比头文件和数据文件都新，且由相同的表达式与 invert 生成时视为最新
+
+    expression 为 None 时只比较修改时间；否则参数记录缺失或不同都视为过期。
+    """
+    if not os.path.exists(output_path):
+        return False
+    if expression is not None:
+        params = read_params(output_path)
+        if not params or bool(params.get('invert')) != bool(invert):
+            return False
+        try:
+            if BandExpression(params['expression']).key != expression.key:
+                return False
+        except (KeyError, TypeError, ValueError, SyntaxError):
+            return False
+    out_mtime = os.path.getmtime(output_path)
+    inputs = [cube_path]
+    base = os.path.splitext(cube_path)[0]
+    inputs += [base + ext for ext in ('.dat', '.img', '.raw') if os.path.exists(base + ext)]
+    return all(out_mtime >= os.path.getmtime(p) for p in inputs)
+
+
+def binarize_cube(hdr_path, output_path, expression, invert=False):
+    """
+    处理单个数据：只读取表达式用到的波段，计算指数、归一化、OTSU二值化并保存PNG
+
+    所用的表达式与 invert 记录在 params_path(output_path)，供下次判断是否需要重新生成。
+    返回该数据的耗时统计，供汇总清单使用。
+    """
+    record = {'cube': hdr_path, 'output': output_path, 'status': 'done', 'error': ''}
+    start = time.perf_counter()
+    try:
+        expr = BandExpression(expression) if isinstance(expression, str) else expression
+        cube = open_envi(hdr_path)
+        record['lines'], record['samples'], record['bands'] = cube.shape
+
+        band_data = {b: np.asarray(cube.read_band(b), dtype=np.float32) for b in expr.bands}
+        t_read = time.perf_counter()
+
+        normalized = normalize_to_uint8(expr.evaluate(band_data))
+        threshold, binary = cv2.threshold(normalized, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        if invert:
+            binary = 255 - binary
+        t_compute = time.perf_counter()
+
+        out_dir = os.path.dirname(output_path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        if not cv2.imwrite(output_path, binary):
+            raise IOError(f"无法写入 {output_path}")
+        write_params(output_path, expr, invert)
+        t_write = time.perf_counter()
+
+        record.update({
+            'threshold': threshold,
+            'read_s': round(t_read - start, 4),
+            'compute_s': round(t_compute - t_read, 4),
+            'write_s': round(t_write - t_compute, 4),
+        })
+    except Exception as e:
+        record['status'] = 'failed'
+        record['error'] = str(e)
+    record['total_s'] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def find_cubes(parent_dir, output_dir, suffix='.png'):
+    """按原批量脚本的目录约定列出 (头文件, 输出路径)：parent/子文件夹/*.hdr -> output/子文件夹/名称.png"""
+    jobs = []
+    for subdir in sorted(os.listdir(parent_dir)):
+        subdir_path = os.path.join(parent_dir, subdir)
+        if not os.path.isdir(subdir_path):
+            continue
+        for hdr_file in sorted(f for f in os.listdir(subdir_path) if f.endswith('.hdr')):
+            file_name = hdr_file.split('.')[0]
+            jobs.append((os.path.join(subdir_path, hdr_file),
+                         os.path.join(output_dir, subdir, file_name + suffix)))
+    return jobs
+
+
+MANIFEST_FIELDS = ['cube', 'output', 'status', 'lines', 'samples', 'bands', 'threshold',
+                   'read_s', 'compute_s', 'write_s', 'total_s', 'error']
+
+
+def write_manifest(records, manifest_path):
+    with open(manifest_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def batch_binarize(jobs, expression, workers=None, max_in_flight=None, invert=False,
+                   overwrite=False, manifest_path=None):
+    """
+    用进程池批量二值化
+
+    jobs: [(头文件路径, 输出路径), ...]
+    expression: 波段表达式字符串或 BandExpression
+    max_in_flight: 同时在处理中的数据个数上限，默认等于进程数，避免大量数据同时占用内存
+    overwrite: False 时跳过已是最新且由相同表达式、invert 生成的输出
+    manifest_path: 每个数据的耗时与状态写入该CSV
+    """
+    expression = expression.expression if isinstance(expression, BandExpression) else expression
+    expr = BandExpression(expression)  # 提前检查表达式
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers
+
+    records = []
+    pending = []
+    for hdr_path, output_path in jobs:
+        if not overwrite and is_up_to_date(output_path, hdr_path, expr, invert):
+            records.append({'cube': hdr_path, 'output': output_path, 'status': 'skipped', 'error': ''})
+        else:
+            pending.append((hdr_path, output_path))
+
+    start = time.perf_counter()
+    if workers == 1:
+        for hdr_path, output_path in pending:
+            records.append(binarize_cube(hdr_path, output_path, expression, invert))
+            print(f"[{records[-1]['status']}] {output_path}")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            queue = iter(pending)
+            running = set()
+            while True:
+                while len(running) < max_in_flight:
+                    job = next(queue, None)
+                    if job is None:
+                        break
+                    running.add(pool.submit(binarize_cube, job[0], job[1], expression, invert))
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record = future.result()
+                    records.append(record)
+                    print(f"[{record['status']}] {record['output']}")
+    elapsed = time.perf_counter() - start
+
+    counts = {s: sum(r['status'] == s for r in records) for s in ('done', 'skipped', 'failed')}
+    rate = counts['done'] / elapsed if elapsed > 0 else 0.0
+    print(f"完成 {counts['done']}，跳过 {counts['skipped']}，失败 {counts['failed']}，"
+          f"耗时 {elapsed:.1f}s（{rate:.2f} 个/秒）")
+
+    if manifest_path:
+        write_manifest(records, manifest_path)
+        print(f"汇总清单已保存至：{manifest_path}")
+    return records
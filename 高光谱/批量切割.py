@@ -0,0 +1,195 @@
+"""
+按清单批量切割高光谱数据，不需要界面
+
+清单为CSV或JSON，每行/每项一个区域：
+    cube, x0, y0, x1, y1, name[, interleave]
+cube 为.hdr或数据文件路径（相对路径相对于清单所在目录），坐标为像素列/行，
+区域为 [y0:y1, x0:x1]；name 省略时为 "<数据名>_cut_x0_y0_x1_y1"。
+JSON 可以是这些项组成的列表，或 {"rois": [...]}。
+
+每个数据只以内存映射打开一次，其下所有区域按行块流式写出；不同数据在进程池中并行。
+
+    python 批量切割.py rois.csv -o 输出目录 --interleave bsq --workers 4
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from 高光谱读写 import open_envi, parse_envi_header, roi_metadata, write_roi
+
+ROI_FIELDS = ['cube', 'x0', 'y0', 'x1', 'y1', 'name', 'interleave']
+RESULT_FIELDS = ['cube', 'name', 'output', 'status', 'x0', 'y0', 'x1', 'y1', 'lines', 'samples',
+                 'bands', 'interleave', 'mb', 'seconds', 'error']
+
+
+def read_manifest(manifest_path):
+    """读取CSV/JSON清单，返回区域字典列表（坐标为整数并按大小排好顺序）"""
+    if manifest_path.lower().endswith('.json'):
+        with open(manifest_path, 'r', encoding='utf-8-sig') as f:
+            items = json.load(f)
+        if isinstance(items, dict):
+            items = items['rois']
+    else:
+        with open(manifest_path, 'r', newline='', encoding='utf-8-sig') as f:
+            items = list(csv.DictReader(f))
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    rois = []
+    for i, item in enumerate(items):
+        item = {str(k).strip().lower(): v for k, v in item.items() if k is not None}
+        missing = [k for k in ROI_FIELDS[:5] if item.get(k) in (None, '')]
+        if missing:
+            raise ValueError(f"清单第 {i + 1} 项缺少字段: {', '.join(missing)}")
+        x0, y0, x1, y1 = (int(float(item[k])) for k in ('x0', 'y0', 'x1', 'y1'))
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        cube = os.path.normpath(os.path.join(base_dir, str(item['cube']).strip()))
+        name = str(item.get('name') or '').strip()
+        if not name:
+            base_name = os.path.splitext(os.path.basename(cube))[0]
+            name = f"{base_name}_cut_{x0}_{y0}_{x1}_{y1}"
+        interleave = str(item.get('interleave') or '').strip().lower() or None
+        rois.append({'cube': cube, 'x0': x0, 'y0': y0, 'x1': x1, 'y1': y1,
+                     'name': name, 'interleave': interleave})
+
+    names = [r['name'] for r in rois]
+    duplicated = sorted({n for n in names if names.count(n) > 1})
+    if duplicated:
+        raise ValueError(f"清单中的输出名称重复: {', '.join(duplicated)}")
+    return rois
+
+
+def is_up_to_date(hdr_path, cube, roi, interleave):
+    """
+    输出的头文件和数据文件都存在、比源数据新，且头文件中的区域和交错格式与本次相同时视为最新
+
+    区域由输出头文件的 samples/lines 与 x start/y start 确定（roi_metadata 在源数据起点上加偏移），
+    清单改了坐标或交错格式时会重新写出。
+    """
+    data_path = os.path.splitext(hdr_path)[0] + '.dat'
+    if not (os.path.exists(hdr_path) and os.path.exists(data_path)):
+        return False
+    out_mtime = min(os.path.getmtime(hdr_path), os.path.getmtime(data_path))
+    inputs = [cube.data_path] + ([cube.hdr_path] if cube.hdr_path else [])
+    if not all(out_mtime >= os.path.getmtime(p) for p in inputs):
+        return False
+
+    header = parse_envi_header(hdr_path)
+    expected = roi_metadata(cube.metadata, roi['x0'], roi['y0'], roi['x1'], roi['y1'])
+    expected['bands'] = cube.bands
+    try:
+        if any(int(float(header[k])) != int(expected[k])
+               for k in ('samples', 'lines', 'bands', 'x start', 'y start')):
+            return False
+    except (KeyError, TypeError, ValueError):
+        return False
+    return str(header.get('interleave', 'bsq')).strip().lower() == interleave
+
+
+def cut_cube(cube_path, rois, output_dir, interleave=None, block_lines=256, overwrite=False):
+    """
+    打开一个数据并写出其下的所有区域
+
+    interleave 为清单中没有指定时使用的交错格式，默认与源数据相同。
+    单个区域失败只记录错误，不影响其余区域。
+    """
+    records = []
+    try:
+        cube = open_envi(cube_path)
+    except Exception as e:
+        return [dict(roi, output='', status='failed', error=str(e)) for roi in rois]
+
+    for roi in rois:
+        hdr_path = os.path.join(output_dir, roi['name'] + '.hdr')
+        target = roi['interleave'] or interleave or cube.interleave
+        record = dict(roi, output=hdr_path, status='done', lines=roi['y1'] - roi['y0'],
+                      samples=roi['x1'] - roi['x0'], bands=cube.bands, interleave=target, error='')
+        start = time.perf_counter()
+        try:
+            if not overwrite and is_up_to_date(hdr_path, cube, roi, target):
+                record['status'] = 'skipped'
+            else:
+                write_roi(cube, hdr_path, roi['x0'], roi['y0'], roi['x1'], roi['y1'],
+                          interleave=target, block_lines=block_lines)
+                nbytes = record['lines'] * record['samples'] * cube.bands * cube.dtype.itemsize
+                record['mb'] = round(nbytes / 1024 ** 2, 2)
+        except Exception as e:
+            record['status'] = 'failed'
+            record['error'] = str(e)
+        record['seconds'] = round(time.perf_counter() - start, 4)
+        records.append(record)
+    return records
+
+
+def batch_cut(rois, output_dir, workers=None, interleave=None, block_lines=256, overwrite=False,
+              result_path=None):
+    """
+    按数据分组批量切割，每个数据由一个进程处理
+
+    rois: read_manifest 的结果
+    workers: 进程数，默认为CPU核数与数据个数的较小值；为1时在当前进程中顺序处理
+    result_path: 每个区域的状态与耗时写入该CSV
+    """
+    groups = OrderedDict()
+    for roi in rois:
+        groups.setdefault(roi['cube'], []).append(roi)
+    os.makedirs(output_dir, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(groups)))
+
+    records = []
+    start = time.perf_counter()
+
+    def report(cube_records):
+        records.extend(cube_records)
+        for r in cube_records:
+            print(f"[{r['status']}] {r['name']}" + (f"：{r['error']}" if r['error'] else ''))
+
+    if workers == 1:
+        for cube_path, cube_rois in groups.items():
+            report(cut_cube(cube_path, cube_rois, output_dir, interleave, block_lines, overwrite))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(cut_cube, cube_path, cube_rois, output_dir, interleave,
+                                   block_lines, overwrite)
+                       for cube_path, cube_rois in groups.items()]
+            for future in as_completed(futures):
+                report(future.result())
+    elapsed = time.perf_counter() - start
+
+    counts = {s: sum(r['status'] == s for r in records) for s in ('done', 'skipped', 'failed')}
+    total_mb = sum(r.get('mb', 0) for r in records)
+    rate = total_mb / elapsed if elapsed > 0 else 0.0
+    print(f"{len(groups)} 个数据，完成 {counts['done']}，跳过 {counts['skipped']}，失败 {counts['failed']}，"
+          f"写出 {total_mb:.1f} MB，耗时 {elapsed:.1f}s（{rate:.1f} MB/s）")
+
+    if result_path:
+        with open(result_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(records)
+        print(f"切割结果已保存至：{result_path}")
+    return records
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="按清单批量切割高光谱数据")
+    parser.add_argument('manifest', help="CSV或JSON清单：cube, x0, y0, x1, y1, name[, interleave]")
+    parser.add_argument('-o', '--output_dir', required=True, help="输出文件夹")
+    parser.add_argument('--interleave', choices=['bsq', 'bil', 'bip'], default=None,
+                        help="输出交错格式，默认与源数据相同")
+    parser.add_argument('--workers', type=int, default=None, help="并行进程数，默认CPU核数")
+    parser.add_argument('--block_lines', type=int, default=256, help="每次拷贝的行数")
+    parser.add_argument('--overwrite', action='store_true', help="重新写出已是最新的区域")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    batch_cut(read_manifest(args.manifest), args.output_dir, workers=args.workers,
+              interleave=args.interleave, block_lines=args.block_lines, overwrite=args.overwrite,
+              result_path=os.path.join(args.output_dir, "cut_results.csv"))
@@ -2,9 +2,11 @@ import numpy as np
 import matplotlib.pyplot as plt
 from spectral import envi, open_image
 import os
-import re
 from tqdm import tqdm
 
+from 反射率校正 import calibrate_reflectance
+from 高光谱读写 import open_envi
+
 
 class HyperspectralProcessor:
     def __init__(self, data_path, dark_path=None, white_path=None, file_format='envi'):
@@ -58,18 +60,10 @@ class HyperspectralProcessor:
         self._print_data_shapes()
 
     def _print_data_shapes(self):
-        """打印数据形状信息"""
-        if self.data:
-            data_shape = self.data.load().shape if hasattr(self.data, 'load') else self.data.data.shape
-            print(f"数据形状: {data_shape}")
-
-        if self.dark:
-            dark_shape = self.dark.load().shape if hasattr(self.dark, 'load') else self.dark.data.shape
-            print(f"暗电流形状: {dark_shape}")
-
-        if self.white:
-            white_shape = self.white.load().shape if hasattr(self.white, 'load') else self.white.data.shape
-            print(f"白板形状: {white_shape}")
+        """打印数据形状信息（只用头文件中的行列波段数，不读取数据）"""
+        for name, image in (("数据", self.data), ("暗电流", self.dark), ("白板", self.white)):
+            if image is not None:
+                print(f"{name}形状: {tuple(image.shape)}")
 
     def _load_hyperspectral_data(self, path):
         """加载高光谱数据"""
@@ -109,157 +103,16 @@ class HyperspectralProcessor:
             return self._load_manual_format(path)
 
     def _load_manual_format(self, path):
-        """手动解析数据文件"""
+        """手动解析头文件，以内存映射方式打开数据文件（不整体读入内存）"""
         try:
-            if path.endswith('.hdr'):
-                # 读取头文件
-                with open(path, 'r') as f:
-                    hdr_lines = f.readlines()
-
-                # 解析头文件中的关键参数
-                metadata = {}
-                in_bands_section = False
-                wavelengths = []
-
-                for line in hdr_lines:
-                    line = line.strip()
-                    if not line or line.startswith(';'):
-                        continue
-
-                    # 处理等号分隔的键值对
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        key = key.strip().lower()
-                        value = value.strip()
-
-                        if key == 'bands':
-                            metadata['bands'] = int(value)
-                        elif key == 'lines':
-                            metadata['lines'] = int(value)
-                        elif key == 'samples':
-                            metadata['samples'] = int(value)
-                        elif key == 'data type':
-                            metadata['data type'] = int(value)
-                        elif key == 'interleave':
-                            metadata['interleave'] = value.lower()
-                        elif key == 'byte order':
-                            metadata['byte order'] = int(value)
-                        elif key == 'wavelength':
-                            in_bands_section = True
-                            wavelengths = []
-
-                    # 处理波长数据
-                    elif in_bands_section:
-                        # 提取括号内的所有数值
-                        values = re.findall(r'[-+]?\d*\.\d+|\d+', line)
-                        if values:
-                            wavelengths.extend([float(v) for v in values])
-
-                        # 检查波段部分是否结束
-                        if '}' in line:
-                            in_bands_section = False
-                            metadata['wavelength'] = wavelengths
-
-                # 构建数据路径
-                dat_path = os.path.splitext(path)[0] + '.dat'
-                if not os.path.exists(dat_path):
-                    print(f"找不到数据文件: {dat_path}")
-                    return None
-
-                # 根据数据类型确定numpy数据类型
-                dtype_map = {
-                    1: np.uint8,
-                    2: np.int16,
-                    3: np.int32,
-                    4: np.float32,
-                    5: np.float64,
-                    12: np.uint16,
-                    13: np.uint32,
-                    14: np.int64,
-                    15: np.uint64
-                }
-                data_type = metadata.get('data type', 4)  # 默认float32
-                dtype = dtype_map.get(data_type, np.float32)
-
-                # 确定字节序
-                byte_order = metadata.get('byte order', 0)
-                if byte_order == 1:
-                    dtype = dtype.newbyteorder('>')  # 大端字节序
-
-                # 获取文件大小（用于进度条）
-                file_size = os.path.getsize(dat_path)
-                chunk_size = 1024 * 1024  # 1MB块大小
-
-                # 使用进度条读取大数据文件
-                print(f"正在读取数据文件: {dat_path}")
-                data_chunks = []
-                with open(dat_path, 'rb') as f:
-                    with tqdm(total=file_size, unit='B', unit_scale=True, desc="读取数据") as pbar:
-                        while True:
-                            chunk = f.read(chunk_size)
-                            if not chunk:
-                                break
-                            data_chunk = np.frombuffer(chunk, dtype=dtype)
-                            data_chunks.append(data_chunk)
-                            pbar.update(len(chunk))
-
-                # 合并所有块
-                data = np.concatenate(data_chunks)
-
-                # 确定数据维度
-                lines = metadata.get('lines', 0)
-                samples = metadata.get('samples', 0)
-                bands = metadata.get('bands', 0)
-
-                if lines * samples * bands != len(data):
-                    print(f"数据维度不匹配: lines={lines}, samples={samples}, bands={bands}, data_len={len(data)}")
-                    # 尝试估计维度
-                    if lines == 0 and samples > 0 and bands > 0:
-                        lines = len(data) // (samples * bands)
-                        print(f"估计行数: {lines}")
-                        if lines * samples * bands == len(data):
-                            metadata['lines'] = lines
-                        else:
-                            print("无法正确估计数据维度")
-                            return None
-                    else:
-                        return None
-
-                # 根据交错格式重塑数据
-                interleave = metadata.get('interleave', 'bsq')
-
-                print("正在重塑数据维度...")
-                if interleave == 'bsq':
-                    # 波段顺序（Band Sequential）
-                    data = data.reshape(bands, lines, samples).transpose(1, 2, 0)
-                elif interleave == 'bil':
-                    # 波段按行交错（Band Interleaved by Line）
-                    data = data.reshape(lines, bands, samples).transpose(0, 2, 1)
-                elif interleave == 'bip':
-                    # 波段按像素交错（Band Interleaved by Pixel）
-                    data = data.reshape(lines, samples, bands)
-                else:
-                    print(f"不支持的交错格式: {interleave}，默认使用BIP")
-                    data = data.reshape(lines, samples, bands)
-
-                # 存储波长信息
-                if 'wavelength' in metadata:
-                    self.wavelengths = np.array(metadata['wavelength'])
-
-                # 创建一个模拟的spectral.Image对象
-                class MockImage:
-                    def __init__(self, data, metadata):
-                        self.data = data
-                        self.metadata = metadata
-
-                    def load(self):
-                        return self.data
+            cube = open_envi(path)
+            print(f"已映射数据文件: {cube.data_path} {cube.shape} {cube.interleave}")
 
-                return MockImage(data, metadata)
+            # 存储波长信息
+            if cube.wavelengths is not None:
+                self.wavelengths = cube.wavelengths
 
-            else:
-                print(f"不支持的文件格式: {path}")
-                return None
+            return cube
         except Exception as e:
             print(f"手动加载失败: {e}")
             return None
@@ -283,11 +136,8 @@ class HyperspectralProcessor:
         if data is None or reference is None:
             return True
 
-        data_shape = data.shape if isinstance(data, np.ndarray) else data.load().shape
-        ref_shape = reference.shape if isinstance(reference, np.ndarray) else reference.load().shape
-
-        # 只检查行数和列数
-        return data_shape[0] == ref_shape[0] and data_shape[1] == ref_shape[1]
+        # 只检查行数和列数；ndarray、spectral 与 EnviCube 对象都有 shape，不需要读取数据
+        return data.shape[0] == reference.shape[0] and data.shape[1] == reference.shape[1]
 
     def calculate_reflectance(self):
         """计算反射率"""
@@ -397,6 +247,26 @@ class HyperspectralProcessor:
         self.reflectance = reflectance
         return reflectance
 
+    def calculate_reflectance_chunked(self, output_path, block_lines=256, workers=1, interleave=None):
+        """
+        分块计算反射率，适用于内存放不下的大数据
+
+        以内存映射方式读取原始数据，暗电流/白板取每列平均值后广播参与计算，
+        结果按行块直接写入float32的ENVI文件，self.reflectance 为输出文件的内存映射视图。
+
+        参数:
+        output_path: 输出文件路径（不含或含.hdr后缀）
+        block_lines: 每块处理的行数
+        workers: 线程数，大于1时并行处理行块
+        interleave: 输出交错格式，默认与原始数据一致
+        """
+        self.reflectance = calibrate_reflectance(
+            self.data_path, output_path,
+            dark_path=self.dark_path, white_path=self.white_path,
+            block_lines=block_lines, workers=workers, interleave=interleave
+        )
+        return self.reflectance
+
     def extract_spectrum(self, row, col):
         """
         提取指定像元的光谱
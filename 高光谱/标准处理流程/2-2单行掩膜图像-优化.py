@@ -2,7 +2,6 @@ import os
 import sys
 import cv2
 import numpy as np
-from skimage.morphology import skeletonize
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QLabel,
                              QSpinBox, QVBoxLayout, QHBoxLayout, QPushButton,
                              QFileDialog, QCheckBox, QMessageBox, QSplitter,
@@ -11,6 +10,10 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QLabel,
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QPointF
 from PyQt5.QtGui import QImage, QPixmap, QPainter, QPen, QCursor, QTransform
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from 行分割 import detect_gap_lines, row_bands, row_names, skeleton_and_prune
+
 
 class ImageProcessor(QThread):
     update_signal = pyqtSignal(np.ndarray, list, np.ndarray)
@@ -37,55 +40,18 @@ class ImageProcessor(QThread):
         self.params[key] = value
 
     def detect_auto_lines(self, pruned):
-        boundaries = []
-        current_bound = None
-        for y in range(pruned.shape[0]):
-            if np.all(pruned[y, :] == 0):
-                if current_bound is None:
-                    current_bound = [y, y]
-                else:
-                    current_bound[1] = y
-            else:
-                if current_bound is not None:
-                    boundaries.append(tuple(current_bound))
-                    current_bound = None
-
-        auto_lines = []
-        for (upper, lower) in boundaries:
-            center_y = (upper + lower) // 2
-            region = pruned[upper:lower, :]
-            if np.mean(region) <= 5:
-                auto_lines.append(center_y)
-        return auto_lines
+        # 行投影中全为0的连续行段取中线
+        return detect_gap_lines(pruned)
 
     def process_image(self):
         try:
             img = self.original_image.copy()
-            _, binary = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-            opened = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel,
-                                      iterations=self.params['open_iter'])
-
-            skeleton = skeletonize(opened / 255).astype(np.uint8) * 255
-
-            num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(skeleton, connectivity=8)
-            denoised = np.zeros_like(skeleton)
-            for label in range(1, num_labels):
-                if stats[label, cv2.CC_STAT_AREA] >= self.params['min_area']:
-                    denoised[labels == label] = 255
-            skeleton = denoised
+            skeleton, pruned = skeleton_and_prune(
+                img, open_iter=self.params['open_iter'], min_area=self.params['min_area'],
+                prune_iter=self.params['prune_iter'], dilate_iter=self.params['dilate_iter'])
 
             self.skeleton_img = cv2.cvtColor(skeleton, cv2.COLOR_GRAY2BGR)
 
-            pruned = skeleton.copy()
-            endpoint_kernel = np.array([[1, 1, 1], [1, 10, 1], [1, 1, 1]], dtype=np.uint8)
-            for _ in range(self.params['prune_iter']):
-                conv = cv2.filter2D(pruned, cv2.CV_8U, endpoint_kernel)
-                endpoints = (conv == 11).astype(np.uint8) * 255
-                branches = cv2.dilate(endpoints, None, iterations=self.params['dilate_iter'])
-                pruned = cv2.subtract(pruned, branches)
-
             self.auto_red_lines = self.detect_auto_lines(pruned)
             result = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
             self.update_signal.emit(result, self.auto_red_lines, self.skeleton_img)
@@ -381,30 +347,14 @@ class MainWindow(QMainWindow):
 
         start_num = self.start_num_spin.value()
         suffix_digits = self.suffix_digits_spin.value()
-        total_files = len(manual_lines) - 1
-
-        for i in range(total_files):
-            y1 = int(manual_lines[i])
-            y2 = int(manual_lines[i + 1])
-            if y1 > y2:
-                y1, y2 = y2, y1
+        bands = row_bands(manual_lines, original.shape[0])
+        names = row_names(len(bands), base_name, start_num, suffix_digits)
+        total_files = len(bands)
 
+        for (start, end), filename in zip(bands, names):
             mask = np.zeros_like(original)
-            h, w = original.shape
-            start = max(0, min(y1, h - 1))
-            end = max(0, min(y2, h - 1))
             mask[start:end + 1, :] = original[start:end + 1, :]
 
-            # 生成文件名
-            if suffix_digits == 1:
-                file_num = start_num + i
-                filename = f"{base_name}{file_num}"
-            else:
-                group = i // suffix_digits
-                subgroup = i % suffix_digits + 1
-                main_num = start_num + group
-                filename = f"{base_name}{main_num}-{subgroup}"
-
             if not filename.lower().endswith(('.png', '.jpg', '.bmp', '.tif')):
                 filename += ".png"
 
@@ -1,65 +1,27 @@
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
-from scipy.signal import savgol_filter, argrelextrema
+import os
+import sys
 
-# 变量定义
-data_filepath = "你的数据文件路径.csv"
-window_length, poly_order = 11, 3  # 调整成你认为合适的值
-
-# 导入数据
-data = pd.read_csv(data_filepath)
-spectra = data.iloc[:, 2:].values
-
-# 预处理方法定义
-
-def snv(input_data):
-    mean = input_data.mean(axis=1, keepdims=True)
-    std = input_data.std(axis=1, keepdims=True)
-    return (input_data - mean) / std
-
-def msc(input_data):
-    ref = np.mean(input_data, axis=0)
-    msc_result = input_data.copy()
-    for i in range(input_data.shape[0]):
-        fit = np.polyfit(ref, input_data[i, :], 1, full=True)
-        msc_result[i, :] = (input_data[i, :] - fit[0][1]) / fit[0][0]
-    return msc_result
-
-def standardize(input_data):
-    scaler = StandardScaler().fit(input_data)
-    standardized = scaler.transform(input_data)
-    return standardized
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def sg_filter(input_data, window_length, poly_order):
-    sg_result = savgol_filter(input_data, window_length, poly_order)
-    return sg_result
+from 光谱预处理 import (SNV, MSC, Standardize, SavitzkyGolay, Derivative, Normalize,
+                        run_preprocessing)
 
-def first_derivative(input_data):
-    derivative = np.diff(input_data, axis=1)
-    return derivative
-
-def second_derivative(input_data):
-    derivative2 = np.diff(input_data, n=2, axis=1)
-    return derivative2
-
-def normalize(input_data):
-    min_max_scaler = MinMaxScaler()
-    normalized = min_max_scaler.fit_transform(input_data)
-    return normalized
-
-# 预处理方法使用和结果保存
-
-def save_preprocess_resuls(method_name, func, *params):
-    processed_data = func(spectra, *params)
-    df = pd.concat([data.iloc[:, :2], pd.DataFrame(processed_data, columns=data.columns[2:])], axis=1)
-    df.to_csv(f"{method_name}_preprocessed.csv", index=False)
+# 变量定义
+data_filepath = "你的数据文件路径.csv"  # 也可以是 .parquet
+output_filepath = "preprocessed.csv"  # 改为 .parquet 可写出列式文件（需要 pyarrow）
+window_length, poly_order = 11, 3  # 调整成你认为合适的值
 
-save_preprocess_resuls("snv", snv)
-save_preprocess_resuls("msc", msc)
-save_preprocess_resuls("standardization", standardize)
-save_preprocess_resuls("sg", sg_filter, window_length, poly_order)
-save_preprocess_resuls("first_derivative", first_derivative)
-save_preprocess_resuls("second_derivative", second_derivative)
-save_preprocess_resuls("normalization", normalize)
\ No newline at end of file
+# 预处理方案：每个方案是若干步骤的串联，例如 [SNV(), SavitzkyGolay(11, 3, deriv=1)]
+variants = {
+    "snv": [SNV()],
+    "msc": [MSC()],
+    "standardization": [Standardize()],
+    "sg": [SavitzkyGolay(window_length, poly_order)],
+    "first_derivative": [Derivative(1)],
+    "second_derivative": [Derivative(2)],
+    "normalization": [Normalize()],
+}
+
+if __name__ == "__main__":
+    # 前两列为样本信息，其余为光谱；所有方案分块处理后写入同一个文件
+    run_preprocessing(data_filepath, variants, output_filepath, id_columns=2)
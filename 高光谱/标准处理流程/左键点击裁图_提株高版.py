@@ -2,11 +2,14 @@ from tkinter import *
 from tkinter import filedialog
 from PIL import Image, ImageTk
 import os
+import re
+import sys
 import cv2
 import numpy as np
-from scipy.cluster.vq import kmeans, vq
-import matplotlib.pyplot as plt
-from sklearn.cluster import KMeans
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from 株高提取 import crop_box, middle_cluster_depth, plant_height
 
 
 class ImageCropper:
@@ -210,6 +213,10 @@ class ImageCropper:
             # print(plant_height)
             with open(self.file_path, 'a') as file:
                  file.write(f"{plant_height}\n")
+            # 同时记录框坐标，供 株高提取.py 批量重算
+            with open(os.path.splitext(self.file_path)[0] + '_boxes.txt', 'a', encoding='utf-8') as file:
+                file.write("{} {} {} {} {}\n".format(os.path.basename(self.depth_image_paths[image_index]),
+                                                    *self.crop_box_coordinates))
 
 
 
@@ -245,68 +252,23 @@ class ImageCropper:
                 print(f"An exception of type {type(e).__name__} occurred with message: {str(e)}")
 
     def print_grayscale_values(self, image, x1, y1, x2, y2):
-
-        height, width = image.shape
-        pixel_values = []
-        # print("x1y1x2y2",x1, y1, x2, y2)
-        for y in range(y1, y2 + 1):
-            for x in range(x1, x2 + 1):
-                if x >= 0 and x < width and y >= 0 and y < height:
-                    pixel_value = image[y, x]
-                    pixel_values.append(pixel_value)
-                    # print(f"像素 ({x}, {y}) 的灰度值为：{pixel_value}")
-        depth = self.cluster_filter(pixel_values)
+        # 框内像素直接切片，超出图像的部分被裁掉
+        depth = self.cluster_filter(crop_box(image, x1, y1, x2, y2))
         # print("depth", depth)
-        plant_height = int((self.cam_fix_height - depth)/10)
-        # print("该区域平均深度为为：", plant_height)
-        return plant_height
+        return plant_height(depth, self.cam_fix_height)
 
+    def cluster_filter(self, array):
+        # 深度聚成3类，去掉均值最大和最小的两类（框到的沟等），返回剩下一类的平均值
+        # 在深度直方图上做一维k-means，结果与原 sklearn KMeans 一致，见 株高提取.py
+        return middle_cluster_depth(array, n_clusters=3)
 
 
+if __name__ == "__main__":
+    # 创建主窗口
+    root = Tk()
 
-    def cluster_filter(self, array):
-        array = np.array(array)
-        array = array.astype(float)
-        # # 初级聚类方法，使用kmeans聚类，出问题的原因是框大了，把两边的沟也框进去了，但也不太稳定
-        # # 将数组聚类
-        # centroids, _ = kmeans(array, 3)  # 聚成3类
-        # groups, _ = vq(array, centroids)
-        # # 计算每个聚类的平均值
-        # cluster_means = [np.mean(array[groups == i]) for i in range(len(centroids))]
-        # 高级聚类方法，聚类效果提升
-        # 使用 KMeans 聚类
-        array_2d = array.reshape(-1, 1)
-        kmeans = KMeans(n_clusters=3, init='k-means++', max_iter=200)  # 聚成3类
-        kmeans.fit(array_2d)
-        centroids = kmeans.cluster_centers_
-        groups = kmeans.labels_
-        # print(len(centroids))
-        # 计算每个聚类的平均值
-        cluster_means = [np.mean(array[groups == i]) for i in range(len(centroids))]
-
-        # 找到平均值最大和最小的两类
-        max_mean_index = np.argmax(cluster_means)
-        min_mean_index = np.argmin(cluster_means)
-
-        # 去掉平均值最大和最小的两类
-        filtered_array = array[np.logical_and(groups != max_mean_index, groups != min_mean_index)]
-
-        # 计算剩下聚类的平均值
-        average_value = np.mean(filtered_array)
-
-        # print("原始数组:", array)
-        # print("聚类平均值:", cluster_means)
-        # print("去除最大和最小平均值后的数组:", filtered_array)
-        # print("剩下聚类的平均值:", average_value)
-        return average_value
-
-
-
-# 创建主窗口
-root = Tk()
-
-# 创建ImageCropper实例
-cropper = ImageCropper(root)
-
-# 启动主循环
-root.mainloop()
+    # 创建ImageCropper实例
+    cropper = ImageCropper(root)
+
+    # 启动主循环
+    root.mainloop()
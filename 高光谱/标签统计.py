@@ -0,0 +1,271 @@
+"""
+按标签掩膜一次遍历统计每株（每个标签）每个波段的反射率
+
+标签图中 0 为背景，其余每个值为一个区域（例如一株植物）。原始数据以内存映射按行块读取，
+只取出有标签的像元，暗电流/白板校正在这些像元上即时完成，不生成整幅反射率数据；
+像元按标签排序后用 reduceat 一次得到该行块内所有标签的和、平方和、最小值、最大值。
+分位数由每个标签、每个波段的固定区间直方图得到，精度为 (上限 - 下限) / bins；
+校正后的反射率默认取 [0, 1]，没有暗电流/白板时先遍历一次有标签的行，取各波段原始值的范围。
+
+入口为 label_statistics（一个数据）和 batch_label_statistics（多个数据，可多进程），
+只需要数据路径；roi提取.py 中的 HyperspectralProcessor.extract_label_reflectance 是前者的包装。
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from 反射率校正 import ReflectanceCalibrator
+
+STATS = ('mean', 'std', 'min', 'max')
+
+
+def load_label_mask(path, connectivity=None):
+    """
+    读取标签图（保留16位），返回二维整型数组
+
+    connectivity 为4或8时，把掩膜的前景按连通区域重新编号，适用于所有植株同为255的二值掩膜。
+    """
+    mask = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if mask is None:
+        raise ValueError(f"无法读取标签图: {path}")
+    if mask.ndim == 3:
+        mask = mask[:, :, 0]
+    if connectivity:
+        _, mask = cv2.connectedComponents((mask > 0).astype(np.uint8), connectivity=connectivity)
+    return mask.astype(np.int32, copy=False)
+
+
+class LabelStatistics:
+    """
+    逐行块累加的分标签、分波段统计量
+
+    labels: 本数据中出现的标签值（不含背景0）
+    quantiles: 需要的分位数，例如 (0.25, 0.5, 0.75)；为空时不建直方图
+    value_range, bins: 分位数直方图的取值范围与区间数，超出范围的值计入两端区间；
+        范围的上下限可以是标量或每个波段一个值
+    """
+
+    def __init__(self, labels, bands, quantiles=(), value_range=(0.0, 1.0), bins=512):
+        self.labels = np.asarray(labels)
+        self.bands = bands
+        self.quantiles = tuple(quantiles)
+        self.lo = np.broadcast_to(np.asarray(value_range[0], dtype=np.float64), (bands,)).copy()
+        self.hi = np.broadcast_to(np.asarray(value_range[1], dtype=np.float64), (bands,)).copy()
+        # 只有一个取值的波段给一个单位宽的范围，避免除以0
+        self.hi[self.hi <= self.lo] = self.lo[self.hi <= self.lo] + 1.0
+        self.bins = int(bins)
+
+        k = len(self.labels)
+        self.count = np.zeros(k, dtype=np.int64)
+        self.sum = np.zeros((k, bands), dtype=np.float64)
+        self.sumsq = np.zeros((k, bands), dtype=np.float64)
+        self.min = np.full((k, bands), np.inf, dtype=np.float32)
+        self.max = np.full((k, bands), -np.inf, dtype=np.float32)
+        self.hist = np.zeros((k, bands, self.bins), dtype=np.uint32) if self.quantiles else None
+
+    def update(self, index, pixels):
+        """index: 每个像元的标签序号 (n,)；pixels: 对应的反射率 (n, bands) float32"""
+        order = np.argsort(index, kind='stable')
+        index = index[order]
+        pixels = pixels[order]
+        present, starts = np.unique(index, return_index=True)
+        counts = np.diff(np.append(starts, len(index)))
+
+        self.count[present] += counts
+        self.sum[present] += np.add.reduceat(pixels, starts, axis=0, dtype=np.float64)
+        self.sumsq[present] += np.add.reduceat(np.square(pixels, dtype=np.float64), starts, axis=0)
+        self.min[present] = np.minimum(self.min[present], np.minimum.reduceat(pixels, starts, axis=0))
+        self.max[present] = np.maximum(self.max[present], np.maximum.reduceat(pixels, starts, axis=0))
+
+        if self.hist is not None:
+            # 每个 (行块内标签, 波段, 区间) 组合一个计数，一次 bincount 完成
+            scale = self.bins / (self.hi - self.lo)
+            bin_index = np.clip((pixels - self.lo) * scale, 0, self.bins - 1).astype(np.int64)
+            local = np.repeat(np.arange(len(present)), counts)
+            flat = (local[:, None] * self.bands + np.arange(self.bands)) * self.bins + bin_index
+            hist = np.bincount(flat.ravel(), minlength=len(present) * self.bands * self.bins)
+            self.hist[present] += hist.reshape(len(present), self.bands, self.bins).astype(np.uint32)
+
+    def _order_value(self, cum, rank):
+        """第 rank 个（从0开始）值的近似：它在累计计数中占 [rank, rank + 1)，取所在区间内的对应位置"""
+        target = rank + 0.5
+        bin_index = np.minimum((cum <= target[:, :, None]).sum(axis=2), self.bins - 1)
+        in_bin = np.take_along_axis(self.hist, bin_index[:, :, None], axis=2)[:, :, 0].astype(np.float64)
+        before = np.take_along_axis(cum, bin_index[:, :, None], axis=2)[:, :, 0] - in_bin
+        frac = np.clip((target - before) / np.maximum(in_bin, 1), 0, 1)
+        return self.lo + (bin_index + frac) * (self.hi - self.lo) / self.bins
+
+    def quantile(self, q):
+        """
+        由直方图得到分位数 (k, bands)，并限制在该标签的最小值、最大值之间
+
+        与 np.quantile 一致，在第 floor(p)、ceil(p) 个值之间线性插值，p = q * (n - 1)。
+        """
+        cum = np.cumsum(self.hist, axis=2, dtype=np.int64)
+        position = q * np.maximum(self.count - 1, 0)[:, None].astype(np.float64)
+        position = np.broadcast_to(position, (len(self.count), self.bands))
+        lower = np.floor(position)
+        low_value = self._order_value(cum, lower)
+        high_value = self._order_value(cum, np.ceil(position))
+        value = low_value + (position - lower) * (high_value - low_value)
+        return np.clip(value, self.min, self.max)
+
+    def result(self, stats=STATS):
+        """返回 {统计量名: (k, bands)}，没有像元的标签为 NaN"""
+        n = np.maximum(self.count, 1)[:, None].astype(np.float64)
+        mean = self.sum / n
+        results = {}
+        if 'mean' in stats:
+            results['mean'] = mean
+        if 'std' in stats:
+            results['std'] = np.sqrt(np.maximum(self.sumsq / n - mean ** 2, 0))
+        if 'min' in stats:
+            results['min'] = self.min.astype(np.float64)
+        if 'max' in stats:
+            results['max'] = self.max.astype(np.float64)
+        for q in self.quantiles:
+            results[quantile_name(q)] = self.quantile(q)
+        empty = self.count == 0
+        for values in results.values():
+            values[empty] = np.nan
+        return results
+
+
+def quantile_name(q):
+    return 'median' if q == 0.5 else f"q{q * 100:g}"
+
+
+def iter_labeled_pixels(calibrator, labels, block_lines=256):
+    """按行块产出 (标签值, 校正后的像元 (n, bands) float32)，只读取含标签的行"""
+    cube = calibrator.cube
+    rows_with_labels = np.flatnonzero((labels > 0).any(axis=1))
+    if not len(rows_with_labels):
+        return
+    first, last = rows_with_labels[0], rows_with_labels[-1] + 1
+    for start in range(first, last, block_lines):
+        stop = min(start + block_lines, last)
+        block_labels = labels[start:stop]
+        rows, cols = np.nonzero(block_labels > 0)
+        if not len(rows):
+            continue
+        pixels = np.asarray(cube[start:stop][rows, cols], dtype=np.float32)
+        calibrator.calibrate_pixels(pixels, cols)
+        yield block_labels[rows, cols], pixels
+
+
+def labeled_value_range(calibrator, labels, block_lines=256):
+    """有标签像元每个波段的 (最小值, 最大值)，没有标签像元时为 (0, 1)"""
+    bands = calibrator.cube.shape[2]
+    lo = np.full(bands, np.inf)
+    hi = np.full(bands, -np.inf)
+    for _, pixels in iter_labeled_pixels(calibrator, labels, block_lines):
+        np.minimum(lo, pixels.min(axis=0), out=lo)
+        np.maximum(hi, pixels.max(axis=0), out=hi)
+    if not np.isfinite(lo).all():
+        return 0.0, 1.0
+    return lo, hi
+
+
+def label_statistics(data_path, labels, dark_path=None, white_path=None, stats=STATS,
+                     quantiles=(0.25, 0.5, 0.75), value_range=None, bins=512,
+                     block_lines=256, name=None):
+    """
+    统计一个数据中所有标签的反射率，返回整洁格式的 DataFrame
+
+    每行一个 (数据, 标签, 波段)：cube, label, pixels, band, wavelength, 以及各统计量列。
+    labels 为标签图数组或路径（路径按原值读取，不做连通区域编号）。
+    没有暗电流/白板时按原始值统计。value_range 为分位数直方图的范围，None 时校正后的反射率取
+    (0, 1)，原始值先多遍历一次有标签的行，取每个波段的最小、最大值。
+    """
+    if isinstance(labels, str):
+        labels = load_label_mask(labels)
+    calibrator = ReflectanceCalibrator(data_path, dark_path, white_path, block_lines)
+    cube = calibrator.cube
+    lines, samples, bands = cube.shape
+    if labels.shape != (lines, samples):
+        raise ValueError(f"标签图形状 ({labels.shape}) 与数据 ({lines}, {samples}) 不匹配")
+
+    values = np.unique(labels)
+    values = values[values != 0]
+    # 标签值 -> 统计数组中的序号，背景为 -1
+    lut = np.full(int(labels.max()) + 1 if labels.size else 1, -1, dtype=np.int64)
+    lut[values] = np.arange(len(values))
+    if value_range is None:
+        if calibrator.scale is not None:
+            value_range = (0.0, 1.0)
+        elif quantiles:
+            value_range = labeled_value_range(calibrator, labels, block_lines)
+        else:
+            value_range = (0.0, 1.0)  # 不建直方图，范围不起作用
+    acc = LabelStatistics(values, bands, quantiles, value_range, bins)
+
+    for pixel_labels, pixels in iter_labeled_pixels(calibrator, labels, block_lines):
+        acc.update(lut[pixel_labels], pixels)
+
+    results = acc.result(stats)
+    wavelengths = calibrator.image.wavelengths
+    if wavelengths is None or len(wavelengths) != bands:
+        wavelengths = np.full(bands, np.nan)
+    k = len(values)
+    table = {
+        'cube': name or os.path.splitext(os.path.basename(data_path))[0],
+        'label': np.repeat(values, bands),
+        'pixels': np.repeat(acc.count, bands),
+        'band': np.tile(np.arange(bands), k),
+        'wavelength': np.tile(wavelengths, k),
+    }
+    for stat, array in results.items():
+        table[stat] = array.ravel()
+    return pd.DataFrame(table)
+
+
+def _label_statistics_job(job, kwargs):
+    data_path, label_path = job
+    start = time.perf_counter()
+    labels = load_label_mask(label_path, kwargs.pop('connectivity', None))
+    df = label_statistics(data_path, labels, **kwargs)
+    return df, time.perf_counter() - start
+
+
+def batch_label_statistics(jobs, output_csv=None, dark_path=None, white_path=None, workers=1,
+                           connectivity=None, **kwargs):
+    """
+    批量统计多个数据，合并为一张整洁表
+
+    jobs: [(数据路径, 标签图路径), ...]
+    connectivity: 为4或8时把二值掩膜按连通区域编号
+    workers: 进程数，大于1时各数据并行
+    其余参数见 label_statistics
+    """
+    kwargs = dict(kwargs, dark_path=dark_path, white_path=white_path, connectivity=connectivity)
+    frames = []
+    start = time.perf_counter()
+    if workers <= 1:
+        for job in jobs:
+            df, cost = _label_statistics_job(job, dict(kwargs))
+            frames.append(df)
+            print(f"[done] {job[0]}：{df['label'].nunique()} 个标签，{cost:.1f}s")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_label_statistics_job, job, dict(kwargs)): job for job in jobs}
+            for future in as_completed(futures):
+                df, cost = future.result()
+                frames.append(df)
+                print(f"[done] {futures[future][0]}：{df['label'].nunique()} 个标签，{cost:.1f}s")
+    result = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if len(result):
+        result = result.sort_values(['cube', 'label', 'band'], kind='stable', ignore_index=True)
+    print(f"共 {len(jobs)} 个数据，耗时 {time.perf_counter() - start:.1f}s")
+
+    if output_csv:
+        output_dir = os.path.dirname(output_csv)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        result.to_csv(output_csv, index=False, encoding='utf-8-sig')
+        print(f"统计结果已保存至: {output_csv}")
+    return result
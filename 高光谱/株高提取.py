@@ -0,0 +1,282 @@
+"""
+根据深度图批量提取株高，不需要逐张点击
+
+框坐标文件（txt）每行一个框，空格、制表符或逗号分隔：
+    x1 y1 x2 y2            对所有深度图使用该框
+    图像名 x1 y1 x2 y2     只对该深度图使用（图像名为文件名，可不带后缀）
+以 # 开头的行为注释。左键点击裁图_提株高版.py 在保存株高的同时，把每次点击的框按
+第二种格式追加到 "<株高txt名>_boxes.txt"，可以直接作为本脚本的输入。
+
+框内深度按与原 KMeans 相同的思路处理：把深度值聚成3类，去掉均值最大、最小的两类
+（框到的沟和过近的杂物），取中间一类的均值。聚类在深度直方图上进行：一维k-means的
+每一类都是连续区间，用分治的动态规划求误差平方和的全局最优，不再对每个像素调用 sklearn。
+
+    python 株高提取.py 深度图文件夹 boxes.txt -o plant_height.csv --workers 8
+"""
+
+import argparse
+import csv
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff')
+RESULT_FIELDS = ['image', 'box', 'x1', 'y1', 'x2', 'y2', 'pixels', 'depth', 'plant_height', 'error']
+
+
+def sort_by_number(file_name):
+    """按文件名中的数字大小排序，与界面版一致"""
+    return [float(num) for num in re.findall(r'\d+\.\d+|\d+', os.path.basename(file_name))]
+
+
+def list_depth_images(folder):
+    paths = [os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS)]
+    return sorted(paths, key=sort_by_number)
+
+
+def read_boxes(txt_path):
+    """
+    读取框坐标文件
+
+    返回 (所有图像共用的框列表, {图像名(不带后缀): 框列表})，框为 (x1, y1, x2, y2)。
+    """
+    common, per_image = [], {}
+    with open(txt_path, 'r', encoding='utf-8-sig') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = [p for p in re.split(r'[\s,]+', line) if p]
+            if len(parts) == 4:
+                common.append(tuple(int(float(p)) for p in parts))
+            elif len(parts) == 5:
+                name = os.path.splitext(parts[0])[0]
+                per_image.setdefault(name, []).append(tuple(int(float(p)) for p in parts[1:]))
+            else:
+                raise ValueError(f"{txt_path} 第 {line_no} 行格式错误: {line}")
+    return common, per_image
+
+
+def crop_box(image, x1, y1, x2, y2):
+    """取框内像素，框含右下角且超出图像的部分被裁掉，与原逐像素循环一致"""
+    height, width = image.shape[:2]
+    return image[max(y1, 0):min(y2 + 1, height), max(x1, 0):min(x2 + 1, width)]
+
+
+def depth_histogram(values):
+    """深度值的整数直方图；浮点深度四舍五入到整数，负值记为0"""
+    values = np.asarray(values).ravel()
+    if values.dtype.kind == 'f':
+        values = np.rint(np.nan_to_num(values)).clip(0).astype(np.int64)
+    elif values.dtype.kind == 'i':
+        values = values.clip(0)
+    return np.bincount(values)
+
+
+def _split_layer(prev, cost, m, n):
+    """
+    best[j] = min(prev[i] + cost(i, j), m <= i < j)，j = m+1..n，返回 (best, split)
+
+    一维 k-means 的最优切分点随 j 单调不减，按分治法求解：先求区间中点 j 的最优 i，
+    左半区间只在它左边找、右半区间只在它右边找。同一层递归的所有区间一起向量化计算，
+    每层只算 O(n) 个候选，共 O(log n) 层。
+    """
+    best = np.full(n + 1, np.inf)
+    split = np.zeros(n + 1, dtype=np.int64)
+    # 待求的 j 区间 [lo, hi] 及其最优 i 所在的范围 [opt_lo, opt_hi]
+    lo, hi = np.array([m + 1]), np.array([n])
+    opt_lo, opt_hi = np.array([m]), np.array([n - 1])
+    while len(lo):
+        mid = (lo + hi) // 2
+        counts = np.minimum(opt_hi, mid - 1) - opt_lo + 1
+        offsets = np.cumsum(counts) - counts
+        seg = np.repeat(np.arange(len(mid)), counts)
+        i = opt_lo[seg] + np.arange(counts.sum()) - offsets[seg]
+        total = prev[i] + cost(i, mid[seg])
+        mins = np.minimum.reduceat(total, offsets)
+        # 每个区间取最左的最优 i
+        hits = np.flatnonzero(total == mins[seg])
+        opt = i[hits[np.searchsorted(seg[hits], np.arange(len(mid)))]]
+        best[mid] = mins
+        split[mid] = opt
+
+        left = lo < mid
+        right = mid < hi
+        lo, hi, opt_lo, opt_hi = (np.concatenate((lo[left], mid[right] + 1)),
+                                  np.concatenate((mid[left] - 1, hi[right])),
+                                  np.concatenate((opt_lo[left], opt[right])),
+                                  np.concatenate((opt[left], opt_hi[right])))
+    return best, split
+
+
+def kmeans_1d(hist, n_clusters=3):
+    """
+    直方图上的精确一维 k-means
+
+    一维 k-means 的最优解中每类都是按深度排序后的连续一段，因此在非空深度上做动态规划：
+    cost(i, j) 为第 i..j-1 个非空深度归为一类的平方误差和，由累计和直接得到，
+    best[m, j] 为前 j 个非空深度分成 m + 1 类的最小误差。每一层用 _split_layer 的分治法，
+    共 O(k·n·log n)；最后一层只需要 j = n。得到的是全局最优，不会像从分位数出发的迭代那样，
+    在某一类像素占大多数时把这一类拆开。
+    返回 (中心, 每类的 [起, 止) 区间)，按中心从小到大排列，区间覆盖整个直方图。
+    """
+    depths = np.flatnonzero(hist)
+    n = len(depths)
+    k = max(1, min(n_clusters, n))
+    weights = hist[depths].astype(np.float64)
+    # 减去均值后再求平方和的累计，减少大深度值相减时的精度损失
+    values = depths - (weights * depths).sum() / weights.sum()
+    count_cum = np.concatenate(([0], np.cumsum(weights)))
+    sum_cum = np.concatenate(([0], np.cumsum(weights * values)))
+    sq_cum = np.concatenate(([0], np.cumsum(weights * values ** 2)))
+
+    def cost(i, j):
+        s = sum_cum[j] - sum_cum[i]
+        return sq_cum[j] - sq_cum[i] - s * s / (count_cum[j] - count_cum[i])
+
+    best = np.concatenate(([np.inf], cost(0, np.arange(1, n + 1))))
+    splits = []
+    for m in range(1, k - 1):
+        best, split = _split_layer(best, cost, m, n)
+        splits.append(split)
+
+    # 回溯每类在非空深度中的起点；最后一类的起点直接在所有候选中取最优
+    bounds = [n]
+    if k > 1:
+        starts = np.arange(k - 1, n)
+        bounds.append(int(starts[np.argmin(best[starts] + cost(starts, n))]))
+    for split in reversed(splits):
+        bounds.append(int(split[bounds[-1]]))
+    bounds.append(0)
+    bounds = bounds[::-1]
+
+    centers = np.array([(weights[a:b] * depths[a:b]).sum() / weights[a:b].sum()
+                        for a, b in zip(bounds[:-1], bounds[1:])])
+    # 非空深度序号换成直方图区间：每类从自己的第一个深度到下一类的第一个深度
+    edges = [0] + [int(depths[b]) for b in bounds[1:-1]] + [len(hist)]
+    return centers, list(zip(edges[:-1], edges[1:]))
+
+
+def middle_cluster_depth(values, n_clusters=3):
+    """
+    聚成 n_clusters 类后去掉均值最大、最小的两类，返回其余像素的平均深度
+
+    像素数不足或其余类为空时返回全部像素的平均值。
+    """
+    hist = depth_histogram(values)
+    total = hist.sum()
+    if total == 0:
+        return float('nan')
+    depths = np.arange(len(hist), dtype=np.float64)
+    if np.count_nonzero(hist) < n_clusters:
+        return float((hist * depths).sum() / total)
+
+    _, intervals = kmeans_1d(hist, n_clusters)
+    count = 0
+    depth_sum = 0.0
+    for start, stop in intervals[1:-1]:
+        count += hist[start:stop].sum()
+        depth_sum += (hist[start:stop] * depths[start:stop]).sum()
+    if count == 0:
+        return float((hist * depths).sum() / total)
+    return float(depth_sum / count)
+
+
+def plant_height(depth, cam_fix_height=1800):
+    """相机固定高度（毫米）减去深度，换算为厘米，与界面版一致"""
+    return int((cam_fix_height - depth) / 10)
+
+
+def process_image(depth_path, boxes, cam_fix_height=1800):
+    """读取一张深度图并计算其所有框的株高，返回结果行列表"""
+    name = os.path.basename(depth_path)
+    try:
+        image = cv2.imdecode(np.fromfile(depth_path, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise ValueError("无法读取深度图")
+        if image.ndim == 3:
+            image = image[:, :, 0]
+    except Exception as e:
+        return [{'image': name, 'box': i, 'x1': b[0], 'y1': b[1], 'x2': b[2], 'y2': b[3], 'error': str(e)}
+                for i, b in enumerate(boxes)]
+
+    rows = []
+    for i, (x1, y1, x2, y2) in enumerate(boxes):
+        row = {'image': name, 'box': i, 'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2, 'error': ''}
+        region = crop_box(image, x1, y1, x2, y2)
+        row['pixels'] = region.size
+        if region.size == 0:
+            row['error'] = '框不在图像内'
+        else:
+            depth = middle_cluster_depth(region)
+            row['depth'] = round(depth, 2)
+            row['plant_height'] = plant_height(depth, cam_fix_height)
+        rows.append(row)
+    return rows
+
+
+def batch_plant_height(depth_paths, box_path, output_csv, workers=None, cam_fix_height=1800):
+    """
+    批量计算株高并写入一个CSV
+
+    depth_paths: 深度图路径列表（或文件夹）
+    box_path: 框坐标文件
+    workers: 进程数，默认CPU核数；为1时在当前进程中顺序处理
+    """
+    if isinstance(depth_paths, str):
+        depth_paths = list_depth_images(depth_paths)
+    common, per_image = read_boxes(box_path)
+
+    jobs = []
+    for path in depth_paths:
+        boxes = common + per_image.get(os.path.splitext(os.path.basename(path))[0], [])
+        if boxes:
+            jobs.append((path, boxes))
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+
+    start = time.perf_counter()
+    results = {}
+    if workers == 1:
+        for path, boxes in jobs:
+            results[path] = process_image(path, boxes, cam_fix_height)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(process_image, path, boxes, cam_fix_height): path for path, boxes in jobs}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    # 按图像原顺序输出
+    rows = [row for path, _ in jobs for row in results[path]]
+    elapsed = time.perf_counter() - start
+
+    output_dir = os.path.dirname(output_csv)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_csv, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+    failed = sum(bool(r['error']) for r in rows)
+    print(f"{len(jobs)} 张深度图，{len(rows)} 个框，失败 {failed}，耗时 {elapsed:.1f}s")
+    print(f"株高结果已保存至：{output_csv}")
+    return rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="根据深度图批量提取株高")
+    parser.add_argument('depth_dir', help="深度图文件夹")
+    parser.add_argument('boxes', help="框坐标txt")
+    parser.add_argument('-o', '--output', default='plant_height.csv', help="输出CSV")
+    parser.add_argument('--workers', type=int, default=None, help="并行进程数，默认CPU核数")
+    parser.add_argument('--cam_fix_height', type=float, default=1800, help="相机固定高度（毫米）")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    batch_plant_height(args.depth_dir, args.boxes, args.output, workers=args.workers,
+                       cam_fix_height=args.cam_fix_height)
@@ -0,0 +1,223 @@
+"""
+按行分割掩膜图像，不需要界面
+
+处理流程与 2-2单行掩膜图像-优化.py 相同：OTSU二值化 → 开运算 → 骨架化 → 去小连通区域
+（查找表一次重映射）→ 修剪骨架末端；之后对修剪结果按行计数得到行投影，
+全为0的连续行段即行间空隙，其中线为分割线，相邻两条分割线之间为一行。
+
+输出不再是每行一张与原图同尺寸的掩膜，而是：
+    crop：每行只保存所在的横条，偏移写入汇总表 row_split.csv（y_start, y_end 等）
+    label：每张图一张标签图，第 i 行的前景像素值为 i（从1开始），可直接用于 标签统计.py
+
+    python 行分割.py 掩膜文件夹 -o 输出文件夹 --mode crop --workers 8
+"""
+
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+from skimage.morphology import skeletonize
+
+from 掩膜后处理 import IMAGE_EXTENSIONS, remove_small_components
+
+DEFAULT_PARAMS = {
+    'open_iter': 2,
+    'min_area': 100,
+    'prune_iter': 2,
+    'dilate_iter': 5,
+}
+RESULT_FIELDS = ['image', 'name', 'file', 'y_start', 'y_end', 'height', 'width', 'pixels']
+
+
+def skeleton_and_prune(img, open_iter=2, min_area=100, prune_iter=2, dilate_iter=5):
+    """返回 (去小区域后的骨架, 修剪末端后的骨架)，均为 0/255 的 uint8 图像"""
+    _, binary = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+    opened = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel, iterations=open_iter)
+
+    skeleton = skeletonize(opened > 0).astype(np.uint8) * 255
+    skeleton = remove_small_components(skeleton, min_area, connectivity=8)
+
+    pruned = skeleton.copy()
+    endpoint_kernel = np.array([[1, 1, 1], [1, 10, 1], [1, 1, 1]], dtype=np.uint8)
+    for _ in range(prune_iter):
+        conv = cv2.filter2D(pruned, cv2.CV_8U, endpoint_kernel)
+        endpoints = (conv == 11).astype(np.uint8) * 255
+        branches = cv2.dilate(endpoints, None, iterations=dilate_iter)
+        pruned = cv2.subtract(pruned, branches)
+    return skeleton, pruned
+
+
+def detect_gap_lines(pruned):
+    """
+    由行投影找分割线：全为0的连续行段取中线 (上界 + 下界) // 2
+
+    与原逐行扫描一致：延伸到最后一行的空白段不算空隙；只有一行的空白段也不算
+    （原实现对 pruned[upper:lower] 求均值，一行时为空切片，均值为 NaN）。
+    """
+    empty = np.count_nonzero(pruned, axis=1) == 0
+    edges = np.diff(np.concatenate(([0], empty.astype(np.int8), [0])))
+    uppers = np.flatnonzero(edges == 1)
+    lowers = np.flatnonzero(edges == -1) - 1
+    keep = (lowers < len(empty) - 1) & (lowers > uppers)
+    return ((uppers[keep] + lowers[keep]) // 2).tolist()
+
+
+def row_bands(lines, height):
+    """相邻分割线之间的行范围 [(y_start, y_end), ...]，y_end 含在内，与原生成掩膜一致"""
+    lines = sorted(int(y) for y in lines)
+    bands = []
+    for y1, y2 in zip(lines[:-1], lines[1:]):
+        start = max(0, min(y1, height - 1))
+        end = max(0, min(y2, height - 1))
+        bands.append((start, end))
+    return bands
+
+
+def row_names(count, base_name='line', start_num=1, suffix_digits=0):
+    """
+    每行掩膜的文件名（不含后缀）
+
+    suffix_digits 不大于1时为 base_name + 编号；否则每 suffix_digits 行为一组，
+    命名为 base_name + 组号 - 组内序号。
+    """
+    names = []
+    for i in range(count):
+        if suffix_digits <= 1:
+            names.append(f"{base_name}{start_num + i}")
+        else:
+            names.append(f"{base_name}{start_num + i // suffix_digits}-{i % suffix_digits + 1}")
+    return names
+
+
+def label_image(mask, bands):
+    """把各行前景编号为 1..N 的标签图，行数不超过255时为uint8，否则为uint16"""
+    dtype = np.uint8 if len(bands) <= 255 else np.uint16
+    labels = np.zeros(mask.shape, dtype=dtype)
+    foreground = mask > 0
+    for i, (start, end) in enumerate(bands, 1):
+        labels[start:end + 1][foreground[start:end + 1]] = i
+    return labels
+
+
+def full_size_mask(band, y_start, shape):
+    """由横条和偏移还原与原图同尺寸的掩膜"""
+    mask = np.zeros(shape, dtype=band.dtype)
+    mask[y_start:y_start + band.shape[0]] = band
+    return mask
+
+
+def write_png(path, image):
+    """支持中文路径的PNG写出"""
+    ok, buffer = cv2.imencode('.png', image)
+    if ok:
+        buffer.tofile(path)
+    return ok
+
+
+def split_image(src_path, output_dir, mode='crop', base_name='line', start_num=1, suffix_digits=0,
+                params=None):
+    """处理一张掩膜图像，返回 (汇总行列表, 错误信息)"""
+    stem = os.path.splitext(os.path.basename(src_path))[0]
+    image = cv2.imdecode(np.fromfile(src_path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return [], "无法读取图像"
+
+    _, pruned = skeleton_and_prune(image, **dict(DEFAULT_PARAMS, **(params or {})))
+    bands = row_bands(detect_gap_lines(pruned), image.shape[0])
+    names = row_names(len(bands), base_name, start_num, suffix_digits)
+    width = image.shape[1]
+
+    rows = []
+    if mode == 'label':
+        labels = label_image(image, bands)
+        file_path = os.path.join(output_dir, f"{stem}_labels.png")
+        if not write_png(file_path, labels):
+            return [], "无法写入图像"
+        for i, (name, (start, end)) in enumerate(zip(names, bands), 1):
+            rows.append({'image': stem, 'name': name, 'file': os.path.basename(file_path), 'y_start': start,
+                         'y_end': end, 'height': end - start + 1, 'width': width,
+                         'pixels': int(np.count_nonzero(labels[start:end + 1] == i))})
+    else:
+        image_dir = os.path.join(output_dir, stem)
+        os.makedirs(image_dir, exist_ok=True)
+        for name, (start, end) in zip(names, bands):
+            band = image[start:end + 1]
+            file_path = os.path.join(image_dir, name + '.png')
+            if not write_png(file_path, band):
+                return rows, "无法写入图像"
+            rows.append({'image': stem, 'name': name, 'file': os.path.join(stem, name + '.png'),
+                         'y_start': start, 'y_end': end, 'height': end - start + 1, 'width': width,
+                         'pixels': int(np.count_nonzero(band))})
+    return rows, ""
+
+
+def batch_split_rows(input_dir, output_dir, mode='crop', workers=None, base_name='line', start_num=1,
+                     suffix_digits=0, **params):
+    """
+    并行分割文件夹中的所有掩膜图像，汇总表写入 output_dir/row_split.csv
+
+    mode: 'crop' 每行保存横条，'label' 每张图保存一张标签图
+    params: 处理参数，见 DEFAULT_PARAMS
+    """
+    if mode not in ('crop', 'label'):
+        raise ValueError(f"未知的输出方式: {mode}")
+    os.makedirs(output_dir, exist_ok=True)
+    files = sorted(f for f in os.listdir(input_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+    paths = [os.path.join(input_dir, f) for f in files]
+    args = (output_dir, mode, base_name, start_num, suffix_digits, params)
+
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    if workers == 1:
+        results = [split_image(path, *args) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(split_image, path, *args) for path in paths]
+            results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    rows = []
+    failed = 0
+    for path, (image_rows, error) in zip(paths, results):
+        if error:
+            failed += 1
+            print(f"处理失败 {path}: {error}")
+        rows.extend(image_rows)
+
+    manifest_path = os.path.join(output_dir, 'row_split.csv')
+    with open(manifest_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print(f"处理 {len(paths) - failed} 张（失败 {failed}），共 {len(rows)} 行，耗时 {elapsed:.2f}s")
+    print(f"汇总表已保存至：{manifest_path}")
+    return rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="按行分割掩膜图像")
+    parser.add_argument('input_dir', help="掩膜图像文件夹")
+    parser.add_argument('-o', '--output_dir', required=True, help="输出文件夹")
+    parser.add_argument('--mode', choices=['crop', 'label'], default='crop',
+                        help="crop：每行保存横条；label：每张图保存一张标签图")
+    parser.add_argument('--workers', type=int, default=None, help="并行进程数，默认CPU核数")
+    parser.add_argument('--base_name', default='line', help="每行的基础名称")
+    parser.add_argument('--start_num', type=int, default=1, help="起始编号")
+    parser.add_argument('--suffix_digits', type=int, default=0, help="每组行数，不大于1时不分组")
+    for key, value in DEFAULT_PARAMS.items():
+        parser.add_argument(f'--{key}', type=int, default=value)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    batch_split_rows(args.input_dir, args.output_dir, mode=args.mode, workers=args.workers,
+                     base_name=args.base_name, start_num=args.start_num, suffix_digits=args.suffix_digits,
+                     **{key: getattr(args, key) for key in DEFAULT_PARAMS})
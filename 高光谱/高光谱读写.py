@@ -0,0 +1,310 @@
+import os
+
+import numpy as np
+
+
+# ENVI data type 与 numpy 类型的对应关系
+ENVI_DTYPES = {
+    1: np.uint8,
+    2: np.int16,
+    3: np.int32,
+    4: np.float32,
+    5: np.float64,
+    12: np.uint16,
+    13: np.uint32,
+    14: np.int64,
+    15: np.uint64
+}
+
+# 数据文件可能的后缀，按优先级排列
+DATA_EXTENSIONS = ['.dat', '.img', '.raw', '.bil', '.bsq', '.bip', '']
+
+# 这些键的花括号内容按原样保留为字符串，不按逗号拆分
+STRING_BLOCK_KEYS = {'description'}
+
+
+def envi_data_type(dtype):
+    """numpy类型转ENVI data type"""
+    dtype = np.dtype(dtype).newbyteorder('=')
+    for code, np_type in ENVI_DTYPES.items():
+        if np.dtype(np_type) == dtype:
+            return code
+    raise ValueError(f"不支持的数据类型: {dtype}")
+
+
+def parse_envi_header(hdr_path):
+    """
+    解析ENVI头文件
+
+    键统一转为小写；花括号中的多行值解析为字符串列表（description 保留原文）。
+    """
+    with open(hdr_path, 'r', encoding='utf-8', errors='ignore') as f:
+        text = f.read()
+
+    metadata = {}
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        i += 1
+        if not line or line.startswith(';') or '=' not in line:
+            continue
+
+        key, value = line.split('=', 1)
+        key = key.strip().lower()
+        value = value.strip()
+
+        if value.startswith('{'):
+            # 收集直到右花括号的所有行
+            parts = [value]
+            while '}' not in parts[-1] and i < len(lines):
+                parts.append(lines[i].strip())
+                i += 1
+            block = ' '.join(parts)
+            block = block[block.index('{') + 1:block.rindex('}')] if '}' in block else block[1:]
+            if key in STRING_BLOCK_KEYS:
+                metadata[key] = block.strip()
+            else:
+                metadata[key] = [v.strip() for v in block.split(',') if v.strip()]
+        else:
+            metadata[key] = value
+
+    return metadata
+
+
+def format_envi_header(metadata):
+    """把元数据字典格式化为ENVI头文件文本"""
+    out = ['ENVI']
+    for key, value in metadata.items():
+        if isinstance(value, (list, tuple, np.ndarray)):
+            value = '{' + ', '.join(str(v) for v in value) + '}'
+        elif key in STRING_BLOCK_KEYS:
+            value = '{' + str(value) + '}'
+        out.append(f"{key} = {value}")
+    return '\n'.join(out) + '\n'
+
+
+def write_envi_header(hdr_path, metadata):
+    """写出ENVI头文件"""
+    with open(hdr_path, 'w', encoding='utf-8') as f:
+        f.write(format_envi_header(metadata))
+
+
+def find_data_file(hdr_path):
+    """根据头文件路径寻找对应的数据文件"""
+    base = os.path.splitext(hdr_path)[0]
+    for ext in DATA_EXTENSIONS:
+        candidate = base + ext
+        if candidate != hdr_path and os.path.isfile(candidate):
+            return candidate
+    raise FileNotFoundError(f"找不到 {hdr_path} 对应的数据文件")
+
+
+def resolve_hdr_path(path):
+    """由.hdr或数据文件路径得到.hdr路径"""
+    if path.lower().endswith('.hdr'):
+        return path
+    hdr_path = os.path.splitext(path)[0] + '.hdr'
+    if not os.path.exists(hdr_path):
+        raise FileNotFoundError(f"找不到对应的.hdr文件: {hdr_path}")
+    return hdr_path
+
+
+class EnviCube:
+    """
+    以 np.memmap 访问的ENVI高光谱数据
+
+    raw 为按存储顺序排列的内存映射（BSQ: bands×lines×samples，BIL: lines×bands×samples，
+    BIP: lines×samples×bands）；view() 把它转置成统一的 (lines, samples, bands) 视图，
+    不复制数据。所有按波段、按行的读取都只触及需要的部分。
+    """
+
+    def __init__(self, data_path, metadata, hdr_path=None, mode='r'):
+        self.data_path = data_path
+        self.hdr_path = hdr_path
+        self.metadata = metadata
+
+        self.lines = int(metadata['lines'])
+        self.samples = int(metadata['samples'])
+        self.bands = int(metadata['bands'])
+        self.interleave = str(metadata.get('interleave', 'bsq')).strip().lower()
+        self.offset = int(metadata.get('header offset', 0))
+
+        data_type = int(metadata.get('data type', 4))
+        if data_type not in ENVI_DTYPES:
+            raise ValueError(f"不支持的ENVI数据类型: {data_type}")
+        byte_order = int(metadata.get('byte order', 0))
+        self.dtype = np.dtype(ENVI_DTYPES[data_type]).newbyteorder('>' if byte_order == 1 else '<')
+
+        if self.interleave == 'bsq':
+            storage_shape = (self.bands, self.lines, self.samples)
+        elif self.interleave == 'bil':
+            storage_shape = (self.lines, self.bands, self.samples)
+        elif self.interleave == 'bip':
+            storage_shape = (self.lines, self.samples, self.bands)
+        else:
+            raise ValueError(f"不支持的交错格式: {self.interleave}")
+
+        if mode == 'r':
+            expected = self.offset + int(np.prod(storage_shape)) * self.dtype.itemsize
+            actual = os.path.getsize(data_path)
+            if actual < expected:
+                raise ValueError(f"数据文件大小 ({actual}) 小于头文件描述的大小 ({expected}): {data_path}")
+
+        self.raw = np.memmap(data_path, dtype=self.dtype, mode=mode,
+                             offset=self.offset, shape=storage_shape)
+
+    @classmethod
+    def from_raw(cls, data_path, lines, samples, bands, dtype, interleave='bsq', byte_order=0, offset=0):
+        """没有头文件时，根据手动给定的参数打开原始数据文件"""
+        metadata = {
+            'samples': samples,
+            'lines': lines,
+            'bands': bands,
+            'data type': envi_data_type(dtype),
+            'interleave': interleave,
+            'byte order': byte_order,
+            'header offset': offset
+        }
+        return cls(data_path, metadata)
+
+    @property
+    def shape(self):
+        return self.lines, self.samples, self.bands
+
+    @property
+    def wavelengths(self):
+        values = self.metadata.get('wavelength')
+        if not values:
+            return None
+        return np.array([float(v) for v in values])
+
+    def view(self):
+        """(lines, samples, bands) 视图，零拷贝"""
+        if self.interleave == 'bsq':
+            return self.raw.transpose(1, 2, 0)
+        if self.interleave == 'bil':
+            return self.raw.transpose(0, 2, 1)
+        return self.raw
+
+    def load(self):
+        """兼容 spectral 图像对象的接口，返回内存映射视图而非整块读入"""
+        return self.view()
+
+    def __getitem__(self, key):
+        return self.view()[key]
+
+    def read_band(self, band):
+        """读取单个波段 (lines, samples)，BSQ下为连续视图"""
+        if self.interleave == 'bsq':
+            return self.raw[band]
+        if self.interleave == 'bil':
+            return self.raw[:, band, :]
+        return self.raw[:, :, band]
+
+    def read_bands(self, bands):
+        """读取若干波段，返回 (lines, samples, len(bands)) 数组"""
+        return np.stack([np.asarray(self.read_band(b)) for b in bands], axis=-1)
+
+    def read_lines(self, start, stop):
+        """读取 [start, stop) 行的 (n, samples, bands) 视图"""
+        return self.view()[start:stop]
+
+    def iter_line_blocks(self, block_lines=256):
+        """按行块遍历，产出 (start, stop, 行块视图)"""
+        for start in range(0, self.lines, block_lines):
+            stop = min(start + block_lines, self.lines)
+            yield start, stop, self.read_lines(start, stop)
+
+    def band_index(self, wavelength):
+        """返回最接近给定波长的波段号"""
+        wavelengths = self.wavelengths
+        if wavelengths is None:
+            raise ValueError("头文件中没有波长信息")
+        return int(np.argmin(np.abs(wavelengths - wavelength)))
+
+    def flush(self):
+        self.raw.flush()
+
+    def __repr__(self):
+        return (f"EnviCube({self.data_path}, lines={self.lines}, samples={self.samples}, "
+                f"bands={self.bands}, interleave={self.interleave}, dtype={self.dtype})")
+
+
+def open_envi(path, data_path=None):
+    """打开ENVI数据，path 可以是.hdr或数据文件"""
+    hdr_path = resolve_hdr_path(path)
+    if data_path is None:
+        data_path = path if not path.lower().endswith('.hdr') and os.path.isfile(path) else find_data_file(hdr_path)
+    return EnviCube(data_path, parse_envi_header(hdr_path), hdr_path=hdr_path)
+
+
+def create_envi(hdr_path, lines, samples, bands, dtype=np.float32, interleave='bsq', metadata=None, ext='.dat'):
+    """
+    创建可写的ENVI文件并返回 EnviCube
+
+    metadata 中与数据布局有关的键会被覆盖，其余键（波长等）原样写入头文件。
+    """
+    header = {k: v for k, v in (metadata or {}).items()}
+    header.update({
+        'samples': samples,
+        'lines': lines,
+        'bands': bands,
+        'header offset': 0,
+        'file type': 'ENVI Standard',
+        'data type': envi_data_type(dtype),
+        'interleave': interleave,
+        'byte order': 0
+    })
+    hdr_path = hdr_path if hdr_path.lower().endswith('.hdr') else hdr_path + '.hdr'
+    out_dir = os.path.dirname(hdr_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    write_envi_header(hdr_path, header)
+    data_path = os.path.splitext(hdr_path)[0] + ext
+    return EnviCube(data_path, header, hdr_path=hdr_path, mode='w+')
+
+
+def roi_metadata(metadata, x0, y0, x1, y1):
+    """
+    裁剪区域 [y0:y1, x0:x1] 的头文件元数据
+
+    保留波长等其余键；更新行列数，x start / y start 在原值上加偏移，
+    map info 的参考像元同样平移，使裁剪结果的地理坐标保持不变。
+    """
+    header = dict(metadata)
+    header['samples'] = x1 - x0
+    header['lines'] = y1 - y0
+    header['x start'] = int(float(metadata.get('x start', 0))) + x0
+    header['y start'] = int(float(metadata.get('y start', 0))) + y0
+    map_info = metadata.get('map info')
+    if isinstance(map_info, (list, tuple)) and len(map_info) >= 3:
+        map_info = list(map_info)
+        map_info[1] = f"{float(map_info[1]) - x0:g}"
+        map_info[2] = f"{float(map_info[2]) - y0:g}"
+        header['map info'] = map_info
+    return header
+
+
+def write_roi(cube, hdr_path, x0, y0, x1, y1, interleave=None, block_lines=256, ext='.dat'):
+    """
+    把 cube 的 [y0:y1, x0:x1] 区域写成ENVI文件，返回输出的头文件路径
+
+    输出以 np.memmap 创建，按行块把源数据的映射视图直接赋值到输出视图，
+    由 numpy 在拷贝时完成交错格式的转换，不在内存中生成整个区域的副本。
+    interleave 默认与源数据相同；大端数据按小端写出。
+    """
+    lines, samples = y1 - y0, x1 - x0
+    if not (0 <= x0 < x1 <= cube.samples and 0 <= y0 < y1 <= cube.lines):
+        raise ValueError(f"区域 ({x0}, {y0}, {x1}, {y1}) 超出数据范围 "
+                         f"({cube.samples} x {cube.lines}) 或为空")
+    out = create_envi(hdr_path, lines, samples, cube.bands, dtype=cube.dtype,
+                      interleave=interleave or cube.interleave,
+                      metadata=roi_metadata(cube.metadata, x0, y0, x1, y1), ext=ext)
+    src = cube.view()
+    dst = out.view()
+    for start in range(0, lines, block_lines):
+        stop = min(start + block_lines, lines)
+        dst[start:stop] = src[y0 + start:y0 + stop, x0:x1]
+    out.flush()
+    return out.hdr_path